@@ -0,0 +1,77 @@
+"""Compare the speed of the BeautifulSoup parsers on a large index page.
+
+Run from the same directory as the setup.py file:
+
+    $ python benchmarks/parsers.py [chapters] [repeats]
+"""
+import os
+import sys
+import timeit
+
+from bs4.builder import builder_registry
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from manga_saver.mangasource import MangaSource  # noqa: E402
+from manga_saver.scraper import Scraper  # noqa: E402
+from manga_saver.seriescache import SeriesCache  # noqa: E402
+from manga_saver.transport import Transport  # noqa: E402
+
+
+PARSERS = ('html.parser', 'lxml', 'html5lib')
+
+ROW = '''
+<tr>
+    <td><a href="/r/test_series/{0}/{1}/1">{0} - The Chapter Title {0}</a></td>
+    <td>May 11th, 2018</td>
+</tr>'''
+
+NOISE = '''
+<div class="ad"><script>var slot = {0};</script><!-- ad {0} -->
+<p>Related series <a href="/other/{0}">Other Series {0}</a></p></div>'''
+
+
+class OfflineTransport(Transport):
+    """Transport that never reaches the network."""
+
+    def head(self, url, **kwargs):
+        raise requests.exceptions.ConnectionError
+
+
+def make_index(chapters):
+    """Make an index page with a table of the given number of chapters."""
+    rows = ''.join(ROW.format(n, 5000 + n) for n in range(chapters, 0, -1))
+    noise = ''.join(NOISE.format(n) for n in range(chapters))
+    return (f'<html><body>{noise}<table class="table"><tbody>{rows}'
+            f'</tbody></table>{noise}</body></html>')
+
+
+def main(chapters=1000, repeats=5):
+    """Time parsing the chapter list of a large index with each parser."""
+    index = make_index(chapters)
+    print(f'Index page: {chapters} chapters, {len(index) / 1e6:.2f} MB')
+
+    for parser in PARSERS:
+        if not builder_registry.lookup(parser):
+            print(f'{parser:>12}: not installed')
+            continue
+
+        source = MangaSource('bench', 'http://bench.example', '_',
+                             index_attrs={'class': 'table'},
+                             transport=OfflineTransport(), parser=parser)
+        series = SeriesCache('test series')
+        series.set_index(source, index)
+
+        def parse():
+            return Scraper._parse_chapter_list(index, series, source)
+
+        assert len(parse()) == chapters
+
+        best = min(timeit.repeat(parse, number=1, repeat=repeats))
+        print(f'{parser:>12}: {best * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
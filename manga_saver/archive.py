@@ -0,0 +1,115 @@
+"""Comic book archives written straight from the pages of a chapter."""
+import os
+import zipfile
+
+
+class CBZWriter(object):
+    """Writer that appends page images to a CBZ archive as they arrive.
+
+    Page images are already compressed, so they are stored as they are.
+    The archive is written to <path>.part and moved into place once it
+    is closed, so an interrupted chapter never leaves a broken archive.
+
+    Attributes:
+        path: The path to the finished archive.
+        pages: The number of pages written so far.
+
+    """
+
+    def __init__(self, path):
+        """Start a new archive at the given path.
+
+        Raises:
+            TypeError: For a non-string path.
+            ValueError: For an empty path.
+
+        """
+        if type(path) is not str:
+            raise TypeError('path must be a string.')
+        if not path:
+            raise ValueError('path cannot be an empty string.')
+
+        self.path = path
+        self.pages = 0
+
+        self._part_path = path + '.part'
+        self._member = None
+        self._zip = zipfile.ZipFile(self._part_path, 'w',
+                                    compression=zipfile.ZIP_STORED)
+
+    def __repr__(self):
+        """Display the path and page count of the archive."""
+        return f'<CBZWriter: {self.path}, {self.pages} pages>'
+
+    def __enter__(self):
+        """Use the writer as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        """Finish the archive, or throw it away after an error."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @staticmethod
+    def page_name(number, ext):
+        """Get the name of the archive member for a page."""
+        return f'{number:03}.{ext}'
+
+    def add_page(self, data, ext):
+        """Append the image data for the next page to the archive.
+
+        Returns:
+            The name of the archive member for the page.
+
+        """
+        self.pages += 1
+        name = self.page_name(self.pages, ext)
+        self._zip.writestr(name, data)
+        return name
+
+    def sink(self, number, ext):
+        """Open the archive member for a page, to use as a stream sink.
+
+        Only one member can be written at a time, so this sink must be
+        used without a downloader.
+
+        Returns:
+            A writable file object for the page.
+
+        """
+        self.pages += 1
+        self._member = self._zip.open(self.page_name(number, ext), 'w')
+        return self._member
+
+    def close(self):
+        """Finish the archive and move it into place."""
+        self._zip.close()
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        """Throw away the unfinished archive."""
+        if self._member is not None:
+            self._member.close()
+        self._zip.close()
+        os.remove(self._part_path)
+
+
+def write_cbz(pages, path):
+    """Write the pages for a chapter to a CBZ archive as they arrive.
+
+    Args:
+        pages: An iterable of tuples of the page image data and file
+            extension, like the generator from Scraper.chapter_pages.
+        path: The path to write the archive to.
+
+    Returns:
+        The number of pages written.
+
+    """
+    with CBZWriter(path) as writer:
+        for data, ext in pages:
+            writer.add_page(data, ext)
+
+    return writer.pages
@@ -0,0 +1,436 @@
+"""Scraper to pull chapter images from a source on an asyncio event loop.
+
+Requires the optional aiohttp dependency, installed with the `async`
+set of dependancies.
+"""
+import asyncio
+from collections import deque
+
+import aiohttp
+
+from manga_saver.mangasource import MangaSource
+from manga_saver.scraper import PageRequestError
+from manga_saver.scraper import Scraper
+from manga_saver.seriescache import SeriesCache
+from manga_saver.throttle import retry_after_seconds
+
+
+class AsyncResponse(object):
+    """The body and details of a completed aiohttp request.
+
+    Mirrors the parts of a requests Response the scrapers use.
+
+    Attributes:
+        url: The URL that was requested.
+        status_code: The HTTP status code of the response.
+        headers: The headers of the response.
+        content: The body of the response in a byte-string.
+        encoding: The encoding used to decode the body to text.
+
+    """
+
+    def __init__(self, url, status_code, headers, content, encoding):
+        """Store the details of a response."""
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        """Get the body of the response decoded as a string."""
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class AsyncTransport(object):
+    """HTTP transport for asyncio that keeps connections to hosts alive.
+
+    The aiohttp session is opened on the first request, so it belongs
+    to the event loop that made that request.
+
+    Attributes:
+        limit: Number of connections open at once.
+        limit_per_host: Number of connections open at once to any
+            single host.
+        retries: Number of times to retry a request that failed to
+            connect or read.
+        backoff_factor: Factor for the sleep between retries, which
+            doubles after each attempt.
+        timeout: Seconds to wait on a request before giving up.
+
+    """
+
+    def __init__(self, limit=100, limit_per_host=8, retries=3,
+                 backoff_factor=0.3, timeout=30):
+        """Set up a new transport.
+
+        Raises:
+            TypeError: For non-numeric arguments.
+            ValueError: For negative or empty limits and timeouts.
+
+        """
+        if not all(type(arg) is int for arg in
+                   (limit, limit_per_host, retries)):
+            raise TypeError('Limits and retries must be integers.')
+        if not all(type(arg) in (int, float) for arg in
+                   (backoff_factor, timeout)):
+            raise TypeError('Backoff and timeout must be numbers.')
+
+        if limit < 1 or limit_per_host < 1:
+            raise ValueError('Connection limits must be at least 1.')
+        if retries < 0 or backoff_factor < 0:
+            raise ValueError('Retries and backoff cannot be negative.')
+        if timeout <= 0:
+            raise ValueError('Timeout must be positive.')
+
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+
+        self._session = None
+
+    def __repr__(self):
+        """Display the connection limits for the transport."""
+        return (f'<AsyncTransport: {self.limit} connections, '
+                f'{self.limit_per_host} per host>')
+
+    async def __aenter__(self):
+        """Use the transport as an async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close the transport on leaving the context."""
+        await self.close()
+
+    def _get_session(self):
+        """Get the aiohttp session, opening it if needed."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+        return self._session
+
+    async def get(self, url, **kwargs):
+        """Send a GET request over a pooled connection.
+
+        Takes the same keyword arguments as aiohttp's ClientSession.get.
+
+        Returns:
+            An AsyncResponse with the full body of the response.
+
+        Raises:
+            aiohttp.ClientError: For a request that failed on every try.
+            asyncio.TimeoutError: For a request that timed out on
+                every try.
+
+        """
+        session = self._get_session()
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.get(url, **kwargs) as res:
+                    content = await res.read()
+                    encoding = res.get_encoding()
+                    return AsyncResponse(url, res.status, res.headers,
+                                         content, encoding)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+
+    async def close(self):
+        """Close all the connections held by the transport."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncScraper(object):
+    """Scraper that pulls page images from a source with asyncio.
+
+    Parses pages the same way as the Scraper, but every request is
+    made on the event loop, so one loop can scrape many series and
+    sources at once. Parsing runs on the default executor of the loop,
+    so a large page does not hold up the other requests.
+
+    Attributes:
+        transport: The AsyncTransport used for every request.
+        window: Number of page images that can download at once
+            for each chapter.
+
+    """
+
+    def __init__(self, transport=None, window=16):
+        """Set up a new scraper.
+
+        Args:
+            transport: (optional) The AsyncTransport to make requests
+                with. A new one is made if none is given.
+            window: (optional) Number of page images that can download
+                at once for each chapter.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For a window less than 1.
+
+        """
+        if transport is not None and not isinstance(
+                transport, AsyncTransport):
+            raise TypeError('transport must be an AsyncTransport.')
+        if type(window) is not int:
+            raise TypeError('window must be an integer.')
+        if window < 1:
+            raise ValueError('window must be at least 1.')
+
+        self.transport = transport if transport else AsyncTransport()
+        self.window = window
+
+    def __repr__(self):
+        """Display the transport for the scraper."""
+        return f'<AsyncScraper: {self.transport!r}>'
+
+    async def __aenter__(self):
+        """Use the scraper as an async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close the transport on leaving the context."""
+        await self.transport.close()
+
+    async def chapter_list(self, series, source, index_url=None):
+        """Get a dict of chapter numbers and links to the first, or only page.
+
+        Args:
+            series: The SeriesCache of the series for the chapter.
+            source: The MangaSource to get the chapter from.
+            index_url: (optional) A custom URL for the index of the series.
+
+        Returns:
+            A dictionary of the chapter number as a string and the link.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For a source that is missing the index element.
+
+        """
+        if not isinstance(series, SeriesCache):
+            raise TypeError('Given series must be a SeriesCache.')
+        if not isinstance(source, MangaSource):
+            raise TypeError('Given source must be a MangaSource.')
+        if index_url and type(index_url) is not str:
+            raise TypeError('URL must be a string.')
+
+        chapters = series.get_chapter_list(source)
+        if chapters is not None:
+            return chapters
+
+        if series.needs_update(source, index_url):
+            url, headers = series.prepare_index_request(source, index_url)
+            res = await self.transport.get(url, headers=headers)
+            series.store_index_response(source, res.status_code, res.text,
+                                        res.headers)
+
+        index_html = series.stored_index(source)
+
+        chapters = series.get_chapter_list(source)
+        if chapters is not None:
+            return chapters
+
+        return await self._in_executor(
+            Scraper._parse_chapter_list, index_html, series, source)
+
+    async def chapter_pages(self, chapter, series, source):
+        """Generate the pages for a chapter of the series from a source.
+
+        Page images download concurrently, up to the window of the
+        scraper, but are still generated in order.
+
+        Args:
+            chapter: The chapter number as a string.
+            series: The SeriesCache of the series for the chapter.
+            source: The MangaSource to get the chapter from.
+
+        Yields:
+            A tuple of the page image data and file extension.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For en empty chapter number.
+            KeyError: For a chapter that is not available.
+
+        """
+        if type(chapter) is not str:
+            raise TypeError('Chapter URL must be a string.')
+        if not isinstance(series, SeriesCache):
+            raise TypeError('Given series must be a SeriesCache.')
+        if not isinstance(source, MangaSource):
+            raise TypeError('Given source must be a MangaSource.')
+        if not chapter:
+            raise ValueError('Cannot use an empty string for chapter.')
+
+        chapter_urls = await self.chapter_list(series, source)
+
+        try:
+            chapter_url = chapter_urls[chapter]
+        except KeyError:
+            raise KeyError(f'Chapter {chapter} not available from {source}.')
+
+        if source.is_multipage:
+            links = self._multipage_links(chapter_url, source)
+        else:
+            links = self._singlepage_links(chapter_url, source)
+
+        async for page in self._download_pages(links):
+            yield page
+
+    async def _multipage_links(self, url, source):
+        """Generate the page image links for the pages of a multipage source.
+
+        Yields:
+            A tuple of the page image URL and file extension.
+
+        """
+        base_url = Scraper._chapter_base_url(url)
+
+        while base_url in url:
+            try:
+                img_link, ext, url, _ = await self._get_page(url, source)
+            except PageRequestError:
+                raise
+            except ValueError:
+                break
+            yield img_link, ext
+
+    async def _singlepage_links(self, url, source):
+        """Generate the page image links for the pages of a singlepage source.
+
+        Yields:
+            A tuple of the page image URL and file extension.
+
+        """
+        page_html = await self._request_page(url, source)
+        links = await self._in_executor(
+            lambda: list(Scraper._page_image_links(page_html, source)))
+        for link in links:
+            yield link
+
+    async def _download_pages(self, links):
+        """Generate the image data for page image links, in order.
+
+        Images download in the background while more links are found,
+        keeping up to the window of the scraper in flight.
+
+        Args:
+            links: An async iterable of tuples of the page image URL and
+                the file extension for that image.
+
+        Yields:
+            A tuple of the page image data and file extension.
+
+        """
+        pending = deque()
+        try:
+            async for img_link, ext in links:
+                task = asyncio.ensure_future(self._download_image(img_link))
+                pending.append((task, ext))
+
+                if len(pending) >= self.window:
+                    task, ext = pending.popleft()
+                    yield await task, ext
+
+            while pending:
+                task, ext = pending.popleft()
+                yield await task, ext
+        finally:
+            for task, _ in pending:
+                task.cancel()
+
+    async def _get_page(self, url, source):
+        """Get and parse a page of a chapter without downloading the image.
+
+        Works for both multipage and singlepage sources.
+
+        Args:
+            url: The link to the page, or only page, of the chapter.
+            source: The MangaSource this link came from.
+
+        Returns:
+            A tuple of the page image URL, the file extention for that
+            image, the URL for the next page, and the BeautifulSoup of
+            the current page.
+
+        Raises:
+            TypeError: For improperly typed arguments
+            ValueError: For an invlid URL.
+
+        """
+        if type(url) is not str:
+            raise TypeError('Given URL must be a string.')
+        if not isinstance(source, MangaSource):
+            raise TypeError('Given source must be a MangaSource.')
+
+        page_html = await self._request_page(url, source)
+        return await self._in_executor(
+            Scraper._parse_page, url, page_html, source)
+
+    async def _request_page(self, url, source):
+        """Get the HTML of a page of a chapter as a string.
+
+        A page the server cannot give right now is retried the same way
+        as by the Scraper.
+
+        Raises:
+            ValueError: For an invlid URL.
+            PageRequestError: For a page that was still unavailable
+                after every retry.
+
+        """
+        retries = 0
+        while True:
+            try:
+                res = await self.transport.get(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                raise ValueError('Invalid URL given for page.')
+
+            if res.status_code != 429 and res.status_code < 500:
+                return res.text
+
+            error = PageRequestError(
+                f'Page {url} is unavailable ({res.status_code}).',
+                retry_after_seconds(res.headers.get('Retry-After')))
+            retries = await self._retry(error, retries)
+
+    async def _download_image(self, img_link):
+        """Download the image data for a page image link.
+
+        Error responses are retried or raised the same way as by the
+        Scraper, so they are never taken as the image.
+        """
+        retries = 0
+        while True:
+            res = await self.transport.get(img_link)
+            error = Scraper._image_error(res, img_link)
+            if error is None:
+                return res.content
+            retries = await self._retry(error, retries)
+
+    async def _retry(self, error, retries):
+        """Wait on the loop to retry a failed request, or raise its error.
+
+        Returns:
+            The number of retries made, counting the one about to be.
+
+        """
+        await asyncio.sleep(Scraper._retry_delay(error, retries))
+        return retries + 1
+
+    async def _in_executor(self, func, *args):
+        """Run a blocking function on the default executor of the loop."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
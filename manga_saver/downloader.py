@@ -0,0 +1,242 @@
+"""Thread pool that downloads page images concurrently."""
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import urllib.parse
+
+
+_ITEM, _ERROR, _DONE = range(3)
+
+
+def prefetch(iterable, depth=1):
+    """Generate the items of an iterable that is advanced on its own thread.
+
+    The thread starts pulling items once the first one is requested
+    and keeps up to depth items ready ahead of the caller. Any error
+    from the iterable is raised to the caller in its place.
+
+    Args:
+        iterable: The iterable to pull items from.
+        depth: (optional) Number of items to keep ready ahead.
+
+    Yields:
+        The items of the iterable, in order.
+
+    Raises:
+        TypeError: For a non-integer depth.
+        ValueError: For a depth less than 1.
+
+    """
+    if type(depth) is not int:
+        raise TypeError('Prefetch depth must be an integer.')
+    if depth < 1:
+        raise ValueError('Prefetch depth must be at least 1.')
+
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                ready.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((_ITEM, item)):
+                    return
+        except Exception as err:
+            put((_ERROR, err))
+        else:
+            put((_DONE, None))
+
+    def gen():
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                kind, value = ready.get()
+                if kind == _DONE:
+                    return
+                if kind == _ERROR:
+                    raise value
+                yield value
+        finally:
+            stop.set()
+    return gen()
+
+
+class ImageDownloader(object):
+    """Bounded thread pool for downloading page images.
+
+    A downloader can be shared between chapters, in which case its
+    limits apply to all of them together. Downloads from a host that
+    is at its limit wait in a queue for that host, not on the pool, so
+    they never keep a worker from downloading from another host.
+
+    Attributes:
+        max_workers: Number of images that can download at once.
+        per_host: Number of images that can download at once from
+            any single host.
+
+    """
+
+    def __init__(self, max_workers=8, per_host=4):
+        """Set up a new thread pool.
+
+        Args:
+            max_workers: (optional) Number of images that can download
+                at once.
+            per_host: (optional) Number of images that can download at
+                once from any single host.
+
+        Raises:
+            TypeError: For non-integer arguments.
+            ValueError: For arguments less than 1.
+
+        """
+        if type(max_workers) is not int or type(per_host) is not int:
+            raise TypeError('Worker limits must be integers.')
+        if max_workers < 1 or per_host < 1:
+            raise ValueError('Worker limits must be at least 1.')
+
+        self.max_workers = max_workers
+        self.per_host = per_host
+
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._active = {}
+        self._queued = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def __repr__(self):
+        """Display the limits for the downloader."""
+        return (f'<ImageDownloader: {self.max_workers} workers, '
+                f'{self.per_host} per host>')
+
+    def __enter__(self):
+        """Use the downloader as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Shut down the thread pool on leaving the context."""
+        self.shutdown()
+
+    def submit(self, fetch, url, *args):
+        """Schedule fetch(url, *args) on the pool within the host limit.
+
+        A download from a host at its limit is held until one of the
+        downloads from that host finishes.
+
+        Returns:
+            A Future for the result of fetch.
+
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        future = Future()
+        entry = (future, fetch, url, args)
+
+        with self._lock:
+            if self._active.get(host, 0) >= self.per_host:
+                self._queued.setdefault(host, deque()).append(entry)
+                return future
+            self._active[host] = self._active.get(host, 0) + 1
+
+        self._start(host, *entry)
+        return future
+
+    def _start(self, host, future, fetch, url, args):
+        """Run a download on the pool, then start the next for its host."""
+        def task():
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fetch(url, *args)
+                    except BaseException as err:
+                        future.set_exception(err)
+                    else:
+                        future.set_result(result)
+            finally:
+                self._release(host)
+
+        self._executor.submit(task)
+
+    def _release(self, host):
+        """Free a download slot for a host, or pass it to a held download."""
+        with self._lock:
+            queued = self._queued.get(host)
+            if not queued:
+                self._queued.pop(host, None)
+                self._active[host] -= 1
+                if not self._active[host]:
+                    del self._active[host]
+                    self._idle.notify_all()
+                return
+            entry = queued.popleft()
+
+        self._start(host, *entry)
+
+    def map(self, fetch, links):
+        """Generate the fetched data for each page image link, in order.
+
+        Links are pulled from the iterable while earlier images are
+        still downloading, keeping up to twice max_workers in flight.
+        Images that have finished are generated before the next link is
+        pulled, so a slow iterable of links does not hold them back.
+
+        Args:
+            fetch: A function that takes an image URL and returns
+                the image data.
+            links: An iterable of tuples of the page image URL and the
+                file extension for that image. Anything after the file
+                extension is passed on to fetch after the URL.
+
+        Yields:
+            A tuple of the page image data and file extension.
+
+        """
+        def gen():
+            pending = deque()
+            try:
+                for url, ext, *args in links:
+                    pending.append((self.submit(fetch, url, *args), ext))
+
+                    while pending and (
+                            pending[0][0].done() or
+                            len(pending) >= self.max_workers * 2):
+                        future, ext = pending.popleft()
+                        yield future.result(), ext
+
+                while pending:
+                    future, ext = pending.popleft()
+                    yield future.result(), ext
+            finally:
+                for future, _ in pending:
+                    future.cancel()
+        return gen()
+
+    def shutdown(self, wait=True):
+        """Stop the thread pool once queued downloads finish.
+
+        Without wait, downloads still held for their host are cancelled.
+        """
+        with self._lock:
+            if wait:
+                while self._active:
+                    self._idle.wait()
+            else:
+                held = [entry[0] for queued in self._queued.values()
+                        for entry in queued]
+                self._queued.clear()
+
+        if not wait:
+            for future in held:
+                if future.cancel():
+                    future.set_running_or_notify_cancel()
+
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,159 @@
+"""Plans for parsing only the parts of a page the scraper needs."""
+import html
+import re
+
+from bs4 import SoupStrainer
+
+
+MULTI_VALUED_ATTRS = {'class', 'rel', 'rev', 'accept-charset', 'headers',
+                      'accesskey', 'dropzone'}
+
+
+def _attr_matcher(name, value):
+    """Make a strainer value that keeps every tag find would match.
+
+    While parsing, a strainer sees multi-valued attributes like class
+    as one string, so a single class name is matched against each of
+    the names in it.
+    """
+    if name not in MULTI_VALUED_ATTRS or type(value) is not str:
+        return value
+
+    def matches(attr):
+        if attr is None:
+            return False
+        if isinstance(attr, list):
+            attr = ' '.join(attr)
+        return attr == value or value in attr.split()
+
+    return matches
+
+
+def _strainer_attrs(attrs):
+    """Get strainer attributes that keep every tag find would match."""
+    return {name: _attr_matcher(name, value) for name, value in attrs.items()}
+
+
+class ExtractionPlan(object):
+    """What to keep while parsing the pages of a source.
+
+    Everything else, like scripts, comments, and ads, is skipped by the
+    parser and never becomes part of the BeautifulSoup. Parsers that
+    cannot skip markup, like html5lib, build the full tree instead.
+
+    Attributes:
+        index: SoupStrainer for the element holding the table of
+            contents on an index page.
+        page: SoupStrainer for the page images on a chapter page,
+            along with the anchor tags around them for a multipage
+            source.
+
+    """
+
+    def __init__(self, source):
+        """Build the plan for the current settings of a MangaSource."""
+        self.index = SoupStrainer(
+            source.index_tag, attrs=_strainer_attrs(source.index_attrs))
+
+        if source.is_multipage:
+            self.page = SoupStrainer(['a', 'img'])
+        else:
+            self.page = SoupStrainer(
+                'img', attrs=_strainer_attrs(source.pg_img_attrs))
+
+    def __repr__(self):
+        """Display the strainers of the plan."""
+        return f'<ExtractionPlan: index {self.index}, page {self.page}>'
+
+    @staticmethod
+    def key(source):
+        """Get the settings of a MangaSource that a plan depends on."""
+        return (source.is_multipage, source.index_tag,
+                repr(sorted(source.index_attrs.items())),
+                repr(sorted(source.pg_img_attrs.items())))
+
+
+class FastPath(object):
+    """Regular expressions that read a multipage source's pages as text.
+
+    For sources with stable markup, the page image link and the next
+    page link can be taken from the raw HTML without building a soup.
+    Each expression must capture the link in a group named url, or in
+    its first group. Results that do not look like links are rejected,
+    so the scraper can fall back to parsing the page.
+
+    Attributes:
+        image: Compiled expression that captures the page image link.
+        next_page: Compiled expression that captures the next page link.
+
+    """
+
+    def __init__(self, image, next_page):
+        """Compile the expressions for a new fast path.
+
+        Args:
+            image: Expression, as a string or compiled, that captures
+                the page image link.
+            next_page: Expression, as a string or compiled, that captures
+                the next page link.
+
+        Raises:
+            TypeError: For expressions that are not strings or compiled.
+            ValueError: For expressions without a group to capture with.
+
+        """
+        if not all(isinstance(arg, (str, type(re.compile(''))))
+                   for arg in (image, next_page)):
+            raise TypeError('Fast path expressions must be strings.')
+
+        self.image = re.compile(image)
+        self.next_page = re.compile(next_page)
+
+        if not self.image.groups or not self.next_page.groups:
+            raise ValueError('Fast path expressions must capture the link.')
+
+    def __repr__(self):
+        """Display the expressions of the fast path."""
+        return (f'<FastPath: image {self.image.pattern!r}, '
+                f'next {self.next_page.pattern!r}>')
+
+    @staticmethod
+    def _capture(pattern, text):
+        """Get the unescaped link captured by an expression, or None."""
+        match = pattern.search(text)
+        if not match:
+            return None
+
+        group = 'url' if 'url' in pattern.groupindex else 1
+        link = html.unescape(match.group(group) or '').strip()
+
+        if not link or re.search(r'[\s"\'<>]', link):
+            return None
+
+        return link
+
+    def extract(self, page_html):
+        """Read the page image and next page links from the raw HTML.
+
+        Returns:
+            A tuple of the page image URL, the file extension for that
+            image, and the next page link as written in the page. None
+            when either link is missing or does not look like a link.
+
+        """
+        img_link = self._capture(self.image, page_html)
+        next_page = self._capture(self.next_page, page_html)
+
+        if img_link is None or next_page is None:
+            return None
+
+        if img_link.startswith('//'):
+            img_link = 'http:' + img_link
+        if not re.match(r'^https?://', img_link, flags=re.I):
+            return None
+
+        ext = img_link.rsplit('.', 1)[-1]
+        if not re.fullmatch(r'[0-9a-zA-Z]{1,5}', ext):
+            return None
+
+        return img_link, ext, next_page
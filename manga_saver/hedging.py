@@ -0,0 +1,163 @@
+"""Hedged requests that race a slow request with a second one."""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+import math
+import threading
+import time
+
+
+class HedgePolicy(object):
+    """When to send a second copy of a slow request, and how often.
+
+    Requests are run on a thread pool. Once a request has taken longer
+    than the given percentile of recent request times, the same request
+    is sent again and whichever answers first is used. Only a share of
+    all requests can be hedged, so a slow host is never sent much more
+    than it would have been.
+
+    Attributes:
+        percentile: Percentile of recent request times after which a
+            request is hedged, from 50 to 100.
+        max_extra: Most hedged requests as a share of all requests.
+        min_samples: Number of requests to time before any are hedged.
+        window: Number of recent request times kept.
+        max_workers: Number of requests that can run at once, counting
+            hedged requests.
+
+    """
+
+    def __init__(self, percentile=95, max_extra=0.05, min_samples=20,
+                 window=200, max_workers=32):
+        """Set up a new policy.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For a percentile outside of 50 to 100, a share
+                outside of 0 to 1, or sizes less than 1.
+
+        """
+        if not all(type(arg) in (int, float) for arg in
+                   (percentile, max_extra)):
+            raise TypeError('Percentile and max_extra must be numbers.')
+        if not all(type(arg) is int for arg in
+                   (min_samples, window, max_workers)):
+            raise TypeError('Sample and worker counts must be integers.')
+
+        if not 50 <= percentile <= 100:
+            raise ValueError('Percentile must be from 50 to 100.')
+        if not 0 <= max_extra <= 1:
+            raise ValueError('max_extra must be from 0 to 1.')
+        if min(min_samples, window, max_workers) < 1:
+            raise ValueError('Sample and worker counts must be at least 1.')
+
+        self.percentile = percentile
+        self.max_extra = max_extra
+        self.min_samples = min_samples
+        self.window = window
+        self.max_workers = max_workers
+
+        self.requests = 0
+        self.hedged = 0
+
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __repr__(self):
+        """Display the percentile and extra load of the policy."""
+        return (f'<HedgePolicy: after p{self.percentile}, '
+                f'{self.max_extra:.0%} extra>')
+
+    def __enter__(self):
+        """Use the policy as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Shut down the thread pool on leaving the context."""
+        self.shutdown()
+
+    def threshold(self):
+        """Get the seconds after which a request is hedged.
+
+        Returns:
+            The percentile of recent request times, or None until enough
+            requests have been timed.
+
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+
+        rank = math.ceil(self.percentile / 100 * len(latencies))
+        return latencies[max(rank, 1) - 1]
+
+    def record(self, latency):
+        """Add the time a single request took to the recent times."""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _take_hedge(self):
+        """Count a hedged request, if the share of extra load allows it."""
+        with self._lock:
+            if self.hedged + 1 > self.max_extra * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def _submit(self, fn, args):
+        """Run a request on the pool, timing it once it succeeds."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+            executor = self._executor
+
+        def timed():
+            started = time.monotonic()
+            result = fn(*args)
+            self.record(time.monotonic() - started)
+            return result
+
+        return executor.submit(timed)
+
+    def call(self, fn, *args):
+        """Call fn(*args), racing it with a second call if it is slow.
+
+        Returns:
+            The result of whichever call succeeds first.
+
+        Raises:
+            The error from the first call, if every call fails.
+
+        """
+        with self._lock:
+            self.requests += 1
+
+        delay = self.threshold()
+        first = self._submit(fn, args)
+
+        if delay is None:
+            return first.result()
+
+        wait([first], timeout=delay)
+        if first.done() or not self._take_hedge():
+            return first.result()
+
+        pending = {first, self._submit(fn, args)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+
+        return first.result()
+
+    def shutdown(self, wait=True):
+        """Stop the thread pool once running requests finish."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=wait)
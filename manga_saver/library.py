@@ -0,0 +1,256 @@
+"""Library of downloaded chapters kept on disk."""
+import json
+import os
+import tempfile
+import urllib.parse
+
+from manga_saver.downloader import ImageDownloader
+from manga_saver.mangasource import MangaSource
+from manga_saver.pagestore import PageStore
+from manga_saver.scraper import Scraper
+from manga_saver.seriescache import SeriesCache
+
+
+class Library(object):
+    """Folder of downloaded chapters that can be synced with a source.
+
+    Pages are laid out as <path>/<series>/<chapter>/<page>.<ext>, with
+    the series and chapter quoted to be safe as file names. Each chapter
+    folder has a manifest of the pages saved so far and whether the
+    chapter is complete. Files are replaced atomically, so a chapter
+    that was interrupted picks up at the first page it is missing.
+
+    With a PageStore, page images are kept in the store instead, and
+    the manifest refers to each page by the hash of its data. Pages that
+    are the same in many chapters are then only kept once.
+
+    Attributes:
+        path: The path to the directory holding the library.
+        downloader: The ImageDownloader used for page images, if any.
+        store: The PageStore that page images are kept in, if any.
+
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, path, downloader=None, store=None):
+        """Use the directory at the given path, creating it if needed.
+
+        Args:
+            path: The path to the directory holding the library.
+            downloader: (optional) An ImageDownloader to fetch the page
+                images of each chapter concurrently.
+            store: (optional) A PageStore to keep the page images in.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For an empty path.
+
+        """
+        if type(path) is not str:
+            raise TypeError('path must be a string.')
+        if not path:
+            raise ValueError('path cannot be an empty string.')
+        if downloader is not None and not isinstance(
+                downloader, ImageDownloader):
+            raise TypeError('downloader must be an ImageDownloader.')
+        if store is not None and not isinstance(store, PageStore):
+            raise TypeError('store must be a PageStore.')
+
+        self.path = path
+        self.downloader = downloader
+        self.store = store
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        """Display the path of the library."""
+        return f'<Library: {self.path}>'
+
+    def chapter_path(self, series, chapter):
+        """Get the path to the folder for a chapter of a series."""
+        if not isinstance(series, SeriesCache):
+            raise TypeError('Given series must be a SeriesCache.')
+        if type(chapter) is not str:
+            raise TypeError('Chapter must be a string.')
+
+        return os.path.join(self.path,
+                            urllib.parse.quote(series.title, safe=''),
+                            urllib.parse.quote(chapter, safe=''))
+
+    def manifest(self, series, chapter):
+        """Get the manifest for a chapter of a series.
+
+        Returns:
+            A dict with the source the chapter came from, whether it is
+            complete, and the pages saved so far by page number as a
+            string. None for a chapter that has not been started.
+
+        """
+        path = os.path.join(self.chapter_path(series, chapter), self.MANIFEST)
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def is_complete(self, series, chapter):
+        """Check if every page of a chapter of a series has been saved."""
+        manifest = self.manifest(series, chapter)
+        return bool(manifest and manifest['complete'])
+
+    def page_paths(self, series, chapter):
+        """Get the paths to the saved page images of a chapter, in order.
+
+        Pages kept in a PageStore give the path to their blob.
+        """
+        manifest = self.manifest(series, chapter)
+        if not manifest:
+            return []
+
+        folder = self.chapter_path(series, chapter)
+        pages = sorted(manifest['pages'].items(), key=lambda p: int(p[0]))
+        return [self._page_path(folder, page) for _, page in pages]
+
+    def _page_path(self, folder, page):
+        """Get the path to the image for a page in a manifest."""
+        if 'hash' in page:
+            return self.store.blob_path(page['hash'])
+        return os.path.join(folder, page['file'])
+
+    def save_chapter(self, series, source, chapter):
+        """Save every page of a chapter of a series that is not on disk.
+
+        A complete chapter is skipped without any requests. Otherwise,
+        a multipage chapter picks up from its checkpoint, and only the
+        page images that are missing are downloaded. A checkpoint past
+        the first page missing from the manifest is not used.
+
+        Args:
+            series: The SeriesCache of the series for the chapter.
+            source: The MangaSource to get the chapter from.
+            chapter: The chapter number as a string.
+
+        Returns:
+            The manifest for the chapter.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For en empty chapter number.
+            KeyError: For a chapter that is not available.
+
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('Given source must be a MangaSource.')
+
+        folder = self.chapter_path(series, chapter)
+        manifest = self.manifest(series, chapter)
+
+        if manifest and manifest['complete']:
+            return manifest
+
+        resume = bool(manifest) and manifest['source'] == source.name
+        if not resume:
+            manifest = {'chapter': chapter, 'source': source.name,
+                        'complete': False, 'pages': {}}
+
+        os.makedirs(folder, exist_ok=True)
+        self._remove_partial_files(folder)
+
+        checkpoint = series.get_checkpoint(source, chapter)
+        if checkpoint and checkpoint[1] > self._first_missing(
+                folder, manifest):
+            series.clear_checkpoint(source, chapter)
+
+        def sink(number, ext):
+            page = manifest['pages'].get(str(number))
+            if page and self._is_saved(folder, page):
+                return None
+            if self.store is not None:
+                return self.store
+            return tempfile.NamedTemporaryFile(
+                dir=folder, suffix='.part', delete=False)
+
+        records = Scraper.stream_chapter_pages(
+            chapter, series, source, sink, self.downloader, resume=True)
+
+        for record in records:
+            if record.size is None:
+                continue
+
+            page = {'url': record.url, 'ext': record.ext,
+                    'size': record.size}
+            if self.store is not None:
+                page['hash'] = record.target
+            else:
+                page['file'] = f'{record.number:03}.{record.ext}'
+                os.replace(record.target, os.path.join(folder, page['file']))
+
+            manifest['pages'][str(record.number)] = page
+            self._write_manifest(folder, manifest)
+
+        manifest['complete'] = True
+        self._write_manifest(folder, manifest)
+
+        return manifest
+
+    def _first_missing(self, folder, manifest):
+        """Get the number of the first page not saved for a manifest."""
+        number = 1
+        while True:
+            page = manifest['pages'].get(str(number))
+            if not page or not self._is_saved(folder, page):
+                return number
+            number += 1
+
+    def sync(self, series, source, chapters=None):
+        """Save every chapter of a series that is not complete on disk.
+
+        Args:
+            series: The SeriesCache of the series to save.
+            source: The MangaSource to get the chapters from.
+            chapters: (optional) An iterable of the chapter numbers to
+                save. Defaults to every chapter available on the source.
+
+        Returns:
+            A dict of the chapter number to the manifest for every
+            chapter that was not already complete.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For a source that is missing the index element.
+            KeyError: For a chapter that is not available.
+
+        """
+        if chapters is None:
+            chapters = Scraper.chapter_list(series, source)
+
+        return {
+            chapter: self.save_chapter(series, source, chapter)
+            for chapter in chapters
+            if not self.is_complete(series, chapter)
+        }
+
+    def _is_saved(self, folder, page):
+        """Check if the image for a page in a manifest is on disk."""
+        if 'hash' in page:
+            return self.store is not None and page['hash'] in self.store
+        return os.path.exists(os.path.join(folder, page['file']))
+
+    @staticmethod
+    def _remove_partial_files(folder):
+        """Remove pages left half written by an interrupted download."""
+        for name in os.listdir(folder):
+            if name.endswith('.part'):
+                os.remove(os.path.join(folder, name))
+
+    def _write_manifest(self, folder, manifest):
+        """Replace the manifest for a chapter atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, os.path.join(folder, self.MANIFEST))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
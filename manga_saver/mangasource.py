@@ -1,9 +1,18 @@
 """A source website from which to pull manga."""
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 import re
+import time
 import urllib
 
+from bs4.builder import builder_registry
 import requests
 
+from manga_saver.extraction import ExtractionPlan
+from manga_saver.extraction import FastPath
+from manga_saver.transport import DEFAULT_TRANSPORT
+from manga_saver.transport import Transport
+
 
 class MangaSource(object):
     """Details for a source website.
@@ -21,11 +30,20 @@ class MangaSource(object):
             the index page for a series.
         index_attrs: Additional attributes on the HTML tag that contains
             the table of contents on the index page for a series.
+        transport: The Transport used to make requests to the source.
+        parser: The name of the BeautifulSoup parser for pages from the
+            source, or None to use the parser of the Scraper.
+        fast_path: The FastPath that reads pages of a multipage source
+            without parsing them, if any.
+        health_ttl: Seconds that the result of a ping is trusted for.
 
     """
 
+    health_ttl = 300
+
     def __init__(self, name, root_url, slug_filler, is_multipage=True,
-                 pg_img_attrs=None, index_tag='table', index_attrs=None):
+                 pg_img_attrs=None, index_tag='table', index_attrs=None,
+                 transport=None, parser=None, fast_path=None):
         """Set up details for a new source.
 
         Args:
@@ -42,10 +60,19 @@ class MangaSource(object):
             index_attrs: (optional) Additional attributes on the HTML tag
                 that contains the table of contents on the index page
                 for a series. Must be provided in a dict.
+            transport: (optional) The Transport used to make requests to
+                the source. Defaults to the shared transport.
+            parser: (optional) The name of the BeautifulSoup parser for
+                pages from the source, like 'lxml' or 'html.parser'.
+                Defaults to the parser of the Scraper.
+            fast_path: (optional) A FastPath that reads the page image
+                and next page links from the text of a page from a
+                multipage source. Pages it cannot read are parsed.
 
         Raises:
             TypeError: For non-string arguments.
-            ValueError: For empty name or root_url and for invalid root_url.
+            ValueError: For empty name or root_url, for invalid root_url,
+                and for a parser that is not installed.
 
         """
         if not all(type(arg) is str for arg in
@@ -61,6 +88,18 @@ class MangaSource(object):
         if index_attrs is not None and type(index_attrs) is not dict:
             raise TypeError('Tag attributes must be given as a dict.')
 
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be a Transport.')
+
+        if parser is not None and type(parser) is not str:
+            raise TypeError('parser must be a string.')
+
+        if fast_path is not None and not isinstance(fast_path, FastPath):
+            raise TypeError('fast_path must be a FastPath.')
+
+        if parser is not None and not builder_registry.lookup(parser):
+            raise ValueError(f'The {parser} parser is not installed.')
+
         # Fundamental source identifiers
         self.name = name
 
@@ -75,7 +114,8 @@ class MangaSource(object):
             raise ValueError(f'{root_url} if not a valid url.')
 
         self.root_url = root_url
-        self._verified = self.ping()
+        self.transport = transport if transport else DEFAULT_TRANSPORT
+        self._health = None
 
         self.slug_filler = slug_filler
 
@@ -87,6 +127,12 @@ class MangaSource(object):
         self.index_tag = index_tag
         self.index_attrs = index_attrs if index_attrs else {}
 
+        self.parser = parser
+        self.fast_path = fast_path
+
+        self._plan = None
+        self._plan_key = None
+
     def __repr__(self):
         """Display the name and url for the source."""
         return f'<MangaSource: {self.name} @ {self.root_url}>'
@@ -95,6 +141,19 @@ class MangaSource(object):
         """Display the name of the source."""
         return self.name
 
+    @property
+    def extraction_plan(self):
+        """Get the ExtractionPlan for parsing pages from the source.
+
+        The plan is only rebuilt when the parsing details change.
+        """
+        key = ExtractionPlan.key(self)
+        if self._plan_key != key:
+            self._plan = ExtractionPlan(self)
+            self._plan_key = key
+
+        return self._plan
+
     def _slugify(self, s):
         """Get the slug of the given string for the URL."""
         if type(s) is not str:
@@ -111,21 +170,136 @@ class MangaSource(object):
         slug = self._slugify(title)
         return urllib.parse.urljoin(self.root_url, slug)
 
-    def ping(self):
+    @property
+    def _verified(self):
+        """Check if the source is online, pinging it only when needed."""
+        return self.is_online()
+
+    def health(self, max_age=None):
+        """Get the result of the last ping, if it is recent enough.
+
+        Args:
+            max_age: (optional) Seconds old the result can be. Defaults
+                to the health_ttl of the source.
+
+        Returns:
+            True or False for the last ping, or None if the source has
+            not been pinged within max_age seconds.
+
+        """
+        if max_age is None:
+            max_age = self.health_ttl
+
+        if self._health is None:
+            return None
+
+        online, checked = self._health
+        if time.monotonic() - checked > max_age:
+            return None
+
+        return online
+
+    def is_online(self, max_age=None):
+        """Check if the source is online, pinging it if the result is stale.
+
+        Args:
+            max_age: (optional) Seconds old the last ping can be before
+                the source is pinged again. Defaults to the health_ttl
+                of the source.
+
+        """
+        online = self.health(max_age)
+        if online is None:
+            online = self.ping()
+        return online
+
+    def ping(self, timeout=None, retry=True):
         """Ping the source website to verify it is online.
 
+        The result is kept as the health of the source.
+
+        Args:
+            timeout: (optional) Seconds to wait on the source. Defaults
+                to the timeout of the transport.
+            retry: (optional) Whether the transport can retry a ping
+                that fails, as it does for other requests.
+
         Returns:
             True for 200 and 300 level status codes.
             False for 400 and 500 level status codes and for
             timeout or other errors.
 
         """
+        options = {} if timeout is None else {'timeout': timeout}
+
         try:
-            response = requests.head(self.root_url)
+            response = self.transport.head(self.root_url, retry=retry,
+                                           **options)
         except requests.exceptions.RequestException:
-            return False
+            online = False
+        else:
+            online = response.status_code < 400
+
+        self._health = (online, time.monotonic())
+        return online
+
+
+def ping_sources(sources, timeout=5, max_workers=16, max_age=None):
+    """Check if many sources are online, pinging them concurrently.
 
-        if response.status_code >= 400:
-            return False
+    Sources with a recent enough ping are not pinged again. Each source
+    is pinged once, without retries, so a dead host only holds up its
+    worker for about the timeout. A source that is still being pinged
+    once every ping could have timed out counts as offline, without
+    waiting on it any longer. A source whose ping never got to start
+    by then is given as None, since it was not checked.
 
-        return True
+    Args:
+        sources: An iterable of MangaSources to check.
+        timeout: (optional) Seconds to wait on each source.
+        max_workers: (optional) Number of sources pinged at once.
+        max_age: (optional) Seconds old a ping can be before the source
+            is pinged again. Defaults to the health_ttl of each source.
+
+    Returns:
+        A dict of each source to whether it is online, or None for a
+        source that was not checked.
+
+    Raises:
+        TypeError: For improperly typed arguments.
+        ValueError: For a timeout or max_workers less than 1.
+
+    """
+    sources = list(sources)
+    if not all(isinstance(source, MangaSource) for source in sources):
+        raise TypeError('Can only ping MangaSources.')
+    if type(timeout) not in (int, float) or type(max_workers) is not int:
+        raise TypeError('timeout must be a number and max_workers an int.')
+    if max_age is not None and type(max_age) not in (int, float):
+        raise TypeError('max_age must be a number.')
+    if timeout <= 0 or max_workers < 1:
+        raise ValueError('timeout and max_workers must be positive.')
+
+    results = {source: source.health(max_age) for source in sources}
+    stale = [source for source, online in results.items() if online is None]
+    if not stale:
+        return results
+
+    pool = ThreadPoolExecutor(min(max_workers, len(stale)))
+    try:
+        futures = {pool.submit(source.ping, timeout, False): source
+                   for source in stale}
+        # A ping can wait the timeout to connect and again to read.
+        rounds = -(-len(stale) // max_workers)
+        done, not_done = wait(futures, timeout=2 * timeout * rounds)
+        unchecked = {future for future in not_done if future.cancel()}
+    finally:
+        pool.shutdown(wait=False)
+
+    for future, source in futures.items():
+        if future in done:
+            results[source] = future.result()
+        else:
+            results[source] = None if future in unchecked else False
+
+    return results
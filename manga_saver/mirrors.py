@@ -0,0 +1,380 @@
+"""Sources for one series, picked by how well each has been doing."""
+from concurrent.futures import ThreadPoolExecutor
+import io
+import threading
+import time
+
+import requests
+
+from manga_saver.downloader import ImageDownloader
+from manga_saver.mangasource import MangaSource
+from manga_saver.scraper import Scraper
+from manga_saver.seriescache import SeriesCache
+
+
+class SourceStats(object):
+    """How a source has been doing, as moving averages of its pages.
+
+    Attributes:
+        latency: Seconds taken for each page, or None before any page.
+        throughput: Bytes of page image downloaded each second, or None
+            before any page.
+        error_rate: Share of recent requests that failed, from 0 to 1.
+        pages: Number of pages taken from the source.
+        errors: Number of times the source failed.
+
+    """
+
+    def __init__(self):
+        self.latency = None
+        self.throughput = None
+        self.error_rate = 0.0
+        self.pages = 0
+        self.errors = 0
+
+    def __repr__(self):
+        """Display the latency and error rate of the source."""
+        return (f'<SourceStats: {self.latency}s per page, '
+                f'{self.error_rate:.0%} errors>')
+
+
+class _PageBuffer(io.BytesIO):
+    """Page image held in memory, which keeps its data once closed."""
+
+    def close(self):
+        """Leave the data readable after the sink is done writing."""
+
+
+class MirrorSet(object):
+    """Several sources for a series, used as one source.
+
+    Each chapter is taken from the fastest healthy source that has it.
+    A source that fails part way through a chapter, or becomes much
+    slower than another source with the chapter, is left for the next
+    best source, which picks up at the next page. Sources that have not
+    been used yet are tried first, so that every source gets measured.
+
+    Attributes:
+        series: The SeriesCache of the series.
+        sources: The list of MangaSources for the series.
+        max_error_rate: Share of failed requests above which a source
+            is no longer healthy.
+        failover_factor: How many times slower than another source with
+            the chapter a source can be before it is left.
+
+    """
+
+    _WEIGHT = 0.2
+
+    def __init__(self, series, sources, max_error_rate=0.5,
+                 failover_factor=3.0):
+        """Set up a new set of sources for a series.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For no sources, an error rate outside of 0 to 1
+                or a failover factor of 1 or less.
+
+        """
+        if not isinstance(series, SeriesCache):
+            raise TypeError('Given series must be a SeriesCache.')
+        sources = list(sources)
+        if not all(isinstance(source, MangaSource) for source in sources):
+            raise TypeError('Given sources must be MangaSources.')
+        if not all(type(arg) in (int, float) for arg in
+                   (max_error_rate, failover_factor)):
+            raise TypeError('Error rate and failover factor must be numbers.')
+
+        if not sources:
+            raise ValueError('Must give at least one source.')
+        if not 0 <= max_error_rate <= 1:
+            raise ValueError('Error rate must be from 0 to 1.')
+        if failover_factor <= 1:
+            raise ValueError('Failover factor must be more than 1.')
+
+        self.series = series
+        self.sources = sources
+        self.max_error_rate = max_error_rate
+        self.failover_factor = failover_factor
+
+        self._stats = {source: SourceStats() for source in sources}
+        self._unreadable = set()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """Display the series and number of sources."""
+        return (f'<MirrorSet: {self.series.title} from '
+                f'{len(self.sources)} sources>')
+
+    def stats(self, source):
+        """Get the SourceStats for one of the sources.
+
+        Raises:
+            KeyError: For a source that is not in the set.
+
+        """
+        return self._stats[source]
+
+    def record(self, source, elapsed, size=None, error=False):
+        """Add a page or a failure to the stats for a source.
+
+        Args:
+            source: The MangaSource the request went to.
+            elapsed: Seconds the request took.
+            size: (optional) Bytes of page image downloaded.
+            error: (optional) Whether the request failed.
+
+        """
+        stats = self._stats[source]
+
+        with self._lock:
+            stats.error_rate += self._WEIGHT * (error - stats.error_rate)
+            if error:
+                stats.errors += 1
+                return
+
+            stats.pages += 1
+            stats.latency = self._average(stats.latency, elapsed)
+            if size is not None and elapsed > 0:
+                stats.throughput = self._average(stats.throughput,
+                                                 size / elapsed)
+
+    def _average(self, average, value):
+        """Move an average towards a new value."""
+        if average is None:
+            return value
+        return average + self._WEIGHT * (value - average)
+
+    def is_healthy(self, source):
+        """Check if a source is failing few requests and was last online.
+
+        Sources are not pinged to check, only their last ping is used.
+        """
+        stats = self._stats[source]
+        return (stats.error_rate <= self.max_error_rate and
+                source.health() is not False)
+
+    def _rank(self, source):
+        """Get the sort key of a source, with the best source first.
+
+        Untried sources come before measured ones, so that every source
+        gets measured, and sources that have only failed come after.
+        """
+        stats = self._stats[source]
+        if stats.latency is not None:
+            tried = 1
+        else:
+            tried = 2 if stats.errors else 0
+        return (not self.is_healthy(source), tried, stats.latency or 0.0,
+                -(stats.throughput or 0.0))
+
+    def sources_for(self, chapter):
+        """Get the sources that have a chapter, best first.
+
+        Healthy sources come first, by how long they take for each page
+        and then by how fast they send page images. A source whose
+        chapter list cannot be read counts as a failure, and is left out
+        until the next refresh.
+
+        Raises:
+            TypeError: For a non-string chapter number.
+
+        """
+        if type(chapter) is not str:
+            raise TypeError('Chapter must be a string.')
+
+        found = [source for source in self.sources
+                 if source not in self._unreadable and
+                 chapter in (self._chapter_list(source) or ())]
+        return sorted(found, key=self._rank)
+
+    def _chapter_list(self, source, update=False):
+        """Get the chapter list at a source, or None if it cannot be read.
+
+        With update, the index page is requested again first, which is
+        a conditional request for an index that was stored with one.
+        """
+        chapters = None if update else self.series.get_chapter_list(source)
+        if chapters is None:
+            started = time.monotonic()
+            try:
+                if update:
+                    self.series.update_index(source)
+                chapters = Scraper.chapter_list(self.series, source)
+            except (ValueError, requests.exceptions.RequestException):
+                self.record(source, time.monotonic() - started, error=True)
+                with self._lock:
+                    self._unreadable.add(source)
+                return None
+
+        with self._lock:
+            self._unreadable.discard(source)
+        return chapters
+
+    def refresh(self, update=False, max_workers=None):
+        """Get the chapter lists at every source at once and merge them.
+
+        Each source gets its chapter list on its own thread, so the
+        slowest source sets how long a refresh takes, rather than all
+        of them together. Sources that fail are left out, and sources
+        that failed before are tried again.
+
+        Args:
+            update: (optional) Whether to request the index of every
+                source again, even if the cache is not outdated.
+            max_workers: (optional) Number of sources requested at once.
+                Defaults to every source at once.
+
+        Returns:
+            A dict of each chapter number to the list of sources that
+            have it, best first.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For max_workers less than 1.
+
+        """
+        if type(update) is not bool:
+            raise TypeError('update must be a boolean.')
+        if max_workers is not None and type(max_workers) is not int:
+            raise TypeError('max_workers must be an integer.')
+        if max_workers is not None and max_workers < 1:
+            raise ValueError('max_workers must be at least 1.')
+
+        workers = min(max_workers or len(self.sources), len(self.sources))
+        with ThreadPoolExecutor(workers) as pool:
+            lists = list(pool.map(
+                lambda source: self._chapter_list(source, update),
+                self.sources))
+
+        available = {}
+        for source, chapters in zip(self.sources, lists):
+            for chapter in chapters or ():
+                available.setdefault(chapter, []).append(source)
+
+        for sources in available.values():
+            sources.sort(key=self._rank)
+
+        return available
+
+    def chapter_pages(self, chapter, downloader=None):
+        """Generate the pages for a chapter from the best of the sources.
+
+        Args:
+            chapter: The chapter number as a string.
+            downloader: (optional) An ImageDownloader to fetch the page
+                images concurrently. Pages are still generated in order.
+
+        Yields:
+            A tuple of the page image data and file extension.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For an empty chapter number.
+            KeyError: For a chapter that no source has.
+            PageRequestError: For a page that failed on every source.
+
+        """
+        if type(chapter) is not str:
+            raise TypeError('Chapter must be a string.')
+        if not chapter:
+            raise ValueError('Cannot use an empty string for chapter.')
+        if downloader is not None and not isinstance(
+                downloader, ImageDownloader):
+            raise TypeError('downloader must be an ImageDownloader.')
+
+        def gen():
+            taken = 0
+            used = set()
+            failed = set()
+            error = None
+            found = self.sources_for(chapter)
+
+            while True:
+                ranked = sorted((source for source in found
+                                 if source not in failed), key=self._rank)
+                if not ranked:
+                    if error is not None:
+                        raise error
+                    raise KeyError(f'Chapter {chapter} not available from '
+                                   f'any source.')
+
+                fresh = [source for source in ranked if source not in used]
+                source = fresh[0] if fresh else ranked[0]
+                used.add(source)
+
+                pages = self._pages_from(source, chapter, taken, downloader)
+                try:
+                    for page in pages:
+                        yield page
+                        taken += 1
+                        if self._should_leave(source, found, used):
+                            break
+                    else:
+                        return
+                except (ValueError,
+                        requests.exceptions.RequestException) as err:
+                    failed.add(source)
+                    error = err
+                finally:
+                    pages.close()
+        return gen()
+
+    def _should_leave(self, source, found, used):
+        """Check if an unused source with the chapter would do better."""
+        others = sorted((other for other in found if other not in used),
+                        key=self._rank)
+        if not others:
+            return False
+        if not self.is_healthy(source):
+            return True
+
+        best = others[0]
+        latency = self._stats[source].latency
+        best_latency = self._stats[best].latency
+        return (self.is_healthy(best) and best_latency is not None and
+                latency > best_latency * self.failover_factor)
+
+    def _pages_from(self, source, chapter, skip, downloader=None):
+        """Generate the pages of a chapter from one source, timing each.
+
+        The first pages up to skip are found, but their images are not
+        requested. Failures are added to the stats of the source.
+        """
+        store = Scraper.page_store
+        buffers = {}
+
+        def sink(number, ext):
+            if number <= skip:
+                return None
+            if store is not None:
+                return store
+            buffers[number] = _PageBuffer()
+            return buffers[number]
+
+        records = Scraper.stream_chapter_pages(
+            chapter, self.series, source, sink, downloader)
+
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    record = next(records)
+                except StopIteration:
+                    return
+                except (ValueError, requests.exceptions.RequestException):
+                    self.record(source, time.monotonic() - started,
+                                error=True)
+                    raise
+
+                if record.size is None:
+                    continue
+
+                self.record(source, time.monotonic() - started, record.size)
+                if store is not None:
+                    data = store.read(record.target)
+                else:
+                    data = buffers.pop(record.number).getvalue()
+                yield data, record.ext
+        finally:
+            records.close()
@@ -0,0 +1,143 @@
+"""Content-addressed store that keeps each distinct page image once."""
+from collections.abc import MutableMapping
+import hashlib
+import os
+import tempfile
+
+from manga_saver.storage import SQLiteStorage
+
+
+class PageStore(object):
+    """Folder of page images named by the SHA-256 hash of their data.
+
+    Pages that are the same in many chapters, like credits pages, or
+    on many mirrors, are only kept once. The store also remembers the
+    hash for each image URL it has saved, so those images never need
+    to be downloaded again.
+
+    Blobs are laid out as <path>/<hash[:2]>/<hash> and written
+    atomically.
+
+    Attributes:
+        path: The path to the directory holding the store.
+        urls: The mapping of image URLs to the hash of their data.
+
+    """
+
+    def __init__(self, path, urls=None):
+        """Use the directory at the given path, creating it if needed.
+
+        Args:
+            path: The path to the directory holding the store.
+            urls: (optional) A MutableMapping to remember the hash for
+                each image URL in, like a table from a Storage. Defaults
+                to a table in an SQLite database in the store directory.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For an empty path.
+
+        """
+        if type(path) is not str:
+            raise TypeError('path must be a string.')
+        if not path:
+            raise ValueError('path cannot be an empty string.')
+        if urls is not None and not isinstance(urls, MutableMapping):
+            raise TypeError('urls must be a MutableMapping.')
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        if urls is None:
+            storage = SQLiteStorage(os.path.join(path, 'urls.db'))
+            urls = storage.table('', 'image_urls')
+        self.urls = urls
+
+    def __repr__(self):
+        """Display the path of the store."""
+        return f'<PageStore: {self.path}>'
+
+    def __contains__(self, digest):
+        """Check if the store has the blob for a hash."""
+        return os.path.exists(self.blob_path(digest))
+
+    def blob_path(self, digest):
+        """Get the path to the blob for a hash."""
+        return os.path.join(self.path, digest[:2], digest)
+
+    def lookup(self, url):
+        """Get the hash of a saved image URL, or None if it is not saved."""
+        digest = self.urls.get(url)
+        if digest is None or digest not in self:
+            return None
+        return digest
+
+    def add(self, chunks):
+        """Add the data for an image to the store, written in chunks.
+
+        Data that is already in the store is not written again.
+
+        Args:
+            chunks: An iterable of byte-strings of the image data.
+
+        Returns:
+            The hash of the image data.
+
+        """
+        sha = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    sha.update(chunk)
+                    f.write(chunk)
+
+            digest = sha.hexdigest()
+            if digest in self:
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(self.blob_path(digest)),
+                            exist_ok=True)
+                os.replace(tmp_path, self.blob_path(digest))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return digest
+
+    def save(self, url, chunks):
+        """Add the image at a URL to the store, unless it is saved already.
+
+        Args:
+            url: The link the image data comes from.
+            chunks: An iterable of byte-strings of the image data, which
+                is only read if the URL has not been saved. Pass a
+                generator to put off downloading the image until then.
+
+        Returns:
+            The hash of the image data.
+
+        """
+        digest = self.lookup(url)
+        if digest is None:
+            digest = self.add(chunks)
+            self.urls[url] = digest
+        return digest
+
+    def read(self, digest):
+        """Get the data for the blob with a hash.
+
+        Raises:
+            KeyError: For a hash that is not in the store.
+
+        """
+        try:
+            with open(self.blob_path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(digest)
+
+    def size(self, digest):
+        """Get the number of bytes in the blob with a hash."""
+        return os.path.getsize(self.blob_path(digest))
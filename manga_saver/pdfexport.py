@@ -0,0 +1,277 @@
+"""PDF export that writes each page of a chapter or volume as it arrives."""
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+import io
+import itertools
+import os
+
+from PIL import Image
+
+
+JPEG_QUALITY = 90
+
+_COLOR_SPACES = {'L': '/DeviceGray', 'RGB': '/DeviceRGB'}
+
+
+def _read_jpeg(data):
+    """Get the size and mode of a JPEG that can be embedded as it is.
+
+    Only the header of the image is read. Gives None for other images,
+    which need to be converted first.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.format == 'JPEG' and img.mode in _COLOR_SPACES:
+                return img.size, img.mode
+    except OSError:
+        pass
+    return None
+
+
+def _convert_to_jpeg(data):
+    """Re-encode image data as a JPEG that can be embedded in a PDF.
+
+    Transparent images are flattened onto white. Runs in a worker
+    process, so it must stay a module level function.
+
+    Returns:
+        A tuple of the JPEG data, its size and its mode.
+
+    Raises:
+        ValueError: For data that is not an image.
+
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except OSError:
+        raise ValueError('Page image data is not an image.')
+
+    if img.mode in ('1', 'I', 'F') or img.mode.startswith('I;'):
+        img = img.convert('L')
+    elif img.mode in ('LA', 'RGBA', 'PA') or 'transparency' in img.info:
+        img = img.convert('RGBA')
+        flat = Image.new('RGB', img.size, 'white')
+        flat.paste(img, mask=img.split()[-1])
+        img = flat
+    elif img.mode not in _COLOR_SPACES:
+        img = img.convert('RGB')
+
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=JPEG_QUALITY)
+    return out.getvalue(), img.size, img.mode
+
+
+class PDFWriter(object):
+    """Writer that appends JPEG pages to a PDF file as they arrive.
+
+    Each page is written out as soon as it is added, and only the file
+    offsets of its objects are kept, so memory use does not grow with
+    the number of pages. The file is written to <path>.part and moved
+    into place once it is closed.
+
+    Attributes:
+        path: The path to the finished PDF.
+        pages: The number of pages written so far.
+
+    """
+
+    def __init__(self, path):
+        """Start a new PDF at the given path.
+
+        Raises:
+            TypeError: For a non-string path.
+            ValueError: For an empty path.
+
+        """
+        if type(path) is not str:
+            raise TypeError('path must be a string.')
+        if not path:
+            raise ValueError('path cannot be an empty string.')
+
+        self.path = path
+        self.pages = 0
+
+        self._part_path = path + '.part'
+        self._file = open(self._part_path, 'wb')
+        self._offsets = {}
+        self._page_ids = []
+
+        # Objects 1 and 2 are the catalog and page tree, written last.
+        self._next_id = 3
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def __repr__(self):
+        """Display the path and page count of the PDF."""
+        return f'<PDFWriter: {self.path}, {self.pages} pages>'
+
+    def __enter__(self):
+        """Use the writer as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        """Finish the PDF, or throw it away after an error."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_object(self, obj_id, body, stream=None):
+        """Write an object, with an optional stream, at the end of the file."""
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(f'{obj_id} 0 obj\n'.encode() + body)
+        if stream is not None:
+            self._file.write(b'\nstream\n')
+            self._file.write(stream)
+            self._file.write(b'\nendstream')
+        self._file.write(b'\nendobj\n')
+
+    def add_jpeg(self, data, size, mode):
+        """Append a page holding a JPEG image, without re-encoding it.
+
+        Args:
+            data: The JPEG data in a byte-string.
+            size: A tuple of the width and height of the image.
+            mode: The mode of the image, 'L' or 'RGB'.
+
+        Raises:
+            ValueError: For a mode that cannot be embedded as it is.
+
+        """
+        if mode not in _COLOR_SPACES:
+            raise ValueError(f'Cannot embed a JPEG in {mode} mode.')
+
+        width, height = size
+        image_id, content_id, page_id = range(self._next_id,
+                                              self._next_id + 3)
+        self._next_id += 3
+
+        self._write_object(image_id, (
+            f'<< /Type /XObject /Subtype /Image /Width {width} '
+            f'/Height {height} /ColorSpace {_COLOR_SPACES[mode]} '
+            f'/BitsPerComponent 8 /Filter /DCTDecode '
+            f'/Length {len(data)} >>').encode(), data)
+
+        content = f'q {width} 0 0 {height} 0 0 cm /Im0 Do Q'.encode()
+        self._write_object(content_id, (
+            f'<< /Length {len(content)} >>').encode(), content)
+
+        self._write_object(page_id, (
+            f'<< /Type /Page /Parent 2 0 R '
+            f'/MediaBox [0 0 {width} {height}] '
+            f'/Resources << /XObject << /Im0 {image_id} 0 R >> >> '
+            f'/Contents {content_id} 0 R >>').encode())
+
+        self._page_ids.append(page_id)
+        self.pages += 1
+
+    def add_page(self, data):
+        """Append a page image of any format Pillow can read.
+
+        JPEGs are embedded as they are, and other images are converted.
+        """
+        jpeg = _read_jpeg(data)
+        if jpeg is None:
+            data, *jpeg = _convert_to_jpeg(data)
+        self.add_jpeg(data, *jpeg)
+
+    def close(self):
+        """Write the page tree and cross-reference table, then finish."""
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(2, (
+            f'<< /Type /Pages /Kids [{kids}] '
+            f'/Count {len(self._page_ids)} >>').encode())
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_offset = self._file.tell()
+        self._file.write(f'xref\n0 {self._next_id}\n'.encode())
+        self._file.write(b'0000000000 65535 f \n')
+        for obj_id in range(1, self._next_id):
+            offset = self._offsets[obj_id]
+            self._file.write(f'{offset:010} 00000 n \n'.encode())
+        self._file.write((
+            f'trailer\n<< /Size {self._next_id} /Root 1 0 R >>\n'
+            f'startxref\n{xref_offset}\n%%EOF\n').encode())
+
+        self._file.close()
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        """Throw away the unfinished PDF."""
+        self._file.close()
+        os.remove(self._part_path)
+
+
+def write_pdf(pages, path, max_workers=None):
+    """Write the pages for a chapter to a PDF as they arrive.
+
+    JPEG pages are embedded without re-encoding. Other pages are
+    converted on a pool of worker processes, with at most twice as many
+    pages held in memory as there are workers.
+
+    Args:
+        pages: An iterable of tuples of the page image data and file
+            extension, like the generator from Scraper.chapter_pages.
+        path: The path to write the PDF to.
+        max_workers: (optional) Number of processes that convert pages
+            at once. Defaults to the number of processors.
+
+    Returns:
+        The number of pages written.
+
+    Raises:
+        TypeError: For a non-integer number of workers.
+        ValueError: For pages that are not images.
+
+    """
+    if max_workers is not None and type(max_workers) is not int:
+        raise TypeError('max_workers must be an integer.')
+
+    window = (max_workers if max_workers else os.cpu_count() or 1) * 2
+    pool = None
+    pending = deque()
+
+    try:
+        with PDFWriter(path) as writer:
+            for data, _ in pages:
+                jpeg = _read_jpeg(data)
+                if jpeg is None:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers)
+                    future = pool.submit(_convert_to_jpeg, data)
+                else:
+                    future = Future()
+                    future.set_result((data,) + jpeg)
+                pending.append(future)
+
+                while pending and (pending[0].done() or
+                                   len(pending) >= window):
+                    writer.add_jpeg(*pending.popleft().result())
+
+            while pending:
+                writer.add_jpeg(*pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown()
+
+    return writer.pages
+
+
+def write_volume_pdf(chapters, path, max_workers=None):
+    """Write the pages for several chapters to one PDF, in order.
+
+    Args:
+        chapters: An iterable of the page generators for each chapter.
+        path: The path to write the PDF to.
+        max_workers: (optional) Number of processes that convert pages
+            at once.
+
+    Returns:
+        The number of pages written.
+
+    """
+    return write_pdf(itertools.chain.from_iterable(chapters), path,
+                     max_workers)
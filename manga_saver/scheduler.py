@@ -0,0 +1,252 @@
+"""Scheduler to download many chapters of a series at once."""
+import itertools
+import threading
+
+from manga_saver.downloader import ImageDownloader
+from manga_saver.mangasource import MangaSource
+from manga_saver.scraper import Scraper
+from manga_saver.seriescache import SeriesCache
+
+
+class ChapterScheduler(object):
+    """Scheduler that downloads chapters on a pool of worker threads.
+
+    Chapters wait in a queue ordered newest first and are started as
+    soon as both a worker and a slot for their source are free. A
+    scheduler can be shared between threads, in which case its limits
+    apply to all of their downloads together.
+
+    Attributes:
+        max_chapters: Number of chapters that can download at once.
+        per_source: Number of chapters that can download at once
+            from any single source.
+        downloader: The ImageDownloader used for page images, if any.
+
+    """
+
+    def __init__(self, max_chapters=4, per_source=2, downloader=None):
+        """Set up a new scheduler.
+
+        Args:
+            max_chapters: (optional) Number of chapters that can download
+                at once.
+            per_source: (optional) Number of chapters that can download
+                at once from any single source.
+            downloader: (optional) An ImageDownloader to fetch the page
+                images of each chapter concurrently.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For limits less than 1.
+
+        """
+        if type(max_chapters) is not int or type(per_source) is not int:
+            raise TypeError('Chapter limits must be integers.')
+        if max_chapters < 1 or per_source < 1:
+            raise ValueError('Chapter limits must be at least 1.')
+        if downloader is not None and not isinstance(
+                downloader, ImageDownloader):
+            raise TypeError('downloader must be an ImageDownloader.')
+
+        self.max_chapters = max_chapters
+        self.per_source = per_source
+        self.downloader = downloader
+
+        self._jobs = []
+        self._running = {}
+        self._order = itertools.count()
+        self._workers = []
+        self._cond = threading.Condition()
+
+    def __repr__(self):
+        """Display the limits for the scheduler."""
+        return (f'<ChapterScheduler: {self.max_chapters} chapters, '
+                f'{self.per_source} per source>')
+
+    @staticmethod
+    def _chapter_key(chapter):
+        """Get the number of a chapter for sorting and comparing."""
+        return float(chapter)
+
+    def select_chapters(self, chapters, first=None, last=None, skip=()):
+        """Pick the chapters to download, newest first.
+
+        Args:
+            chapters: An iterable of chapter numbers as strings.
+            first: (optional) The lowest chapter number to include.
+            last: (optional) The highest chapter number to include.
+            skip: (optional) Chapter numbers to leave out, such as those
+                already downloaded.
+
+        Returns:
+            A list of chapter numbers as strings, newest first.
+
+        Raises:
+            TypeError: For non-numeric first or last chapter numbers.
+
+        """
+        if not all(bound is None or type(bound) in (int, float, str)
+                   for bound in (first, last)):
+            raise TypeError('Chapter range must be given as numbers.')
+
+        first = float('-inf') if first is None else float(first)
+        last = float('inf') if last is None else float(last)
+        skip = {str(chapter) for chapter in skip}
+
+        selected = [
+            chapter for chapter in chapters
+            if chapter not in skip and
+            first <= self._chapter_key(chapter) <= last
+        ]
+
+        return sorted(selected, key=self._chapter_key, reverse=True)
+
+    def download(self, series, source, on_page, first=None, last=None,
+                 skip=(), progress=None):
+        """Download a range of chapters of a series from a source.
+
+        Blocks until every selected chapter has finished or failed.
+        Without a range, every chapter not in skip is downloaded.
+
+        Args:
+            series: The SeriesCache of the series to download.
+            source: The MangaSource to download from.
+            on_page: A function called with the chapter number, the page
+                number, the page image data and the file extension for
+                every page. Called from the worker threads.
+            first: (optional) The lowest chapter number to download.
+            last: (optional) The highest chapter number to download.
+            skip: (optional) Chapter numbers to leave out, such as those
+                already downloaded.
+            progress: (optional) A function called with the chapter
+                number, the error it failed with or None, the number of
+                chapters finished and the total number of chapters,
+                each time a chapter finishes.
+
+        Returns:
+            A dict of the chapter number to the number of pages for
+            every chapter that finished without an error.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For a source that is missing the index element.
+            Exception: The first error raised by progress, once every
+                chapter has finished.
+
+        """
+        if not isinstance(series, SeriesCache):
+            raise TypeError('Given series must be a SeriesCache.')
+        if not isinstance(source, MangaSource):
+            raise TypeError('Given source must be a MangaSource.')
+        if not callable(on_page):
+            raise TypeError('on_page must be callable.')
+        if progress is not None and not callable(progress):
+            raise TypeError('progress must be callable.')
+
+        available = Scraper.chapter_list(series, source)
+        chapters = self.select_chapters(available, first, last, skip)
+
+        results = {}
+        finished = threading.Event()
+        state = {'done': 0}
+
+        if not chapters:
+            return results
+
+        def run(chapter):
+            pages = Scraper.chapter_pages(
+                chapter, series, source, self.downloader)
+            count = 0
+            for count, (data, ext) in enumerate(pages, 1):
+                on_page(chapter, count, data, ext)
+            return count
+
+        def report(chapter, count, error):
+            with self._cond:
+                state['done'] += 1
+                done = state['done']
+                if error is None:
+                    results[chapter] = count
+            try:
+                if progress is not None:
+                    progress(chapter, error, done, len(chapters))
+            except Exception as err:
+                state.setdefault('error', err)
+            finally:
+                if done == len(chapters):
+                    finished.set()
+
+        for chapter in chapters:
+            self._put(chapter, repr(source), run, report)
+
+        finished.wait()
+
+        if 'error' in state:
+            raise state['error']
+
+        return results
+
+    def _put(self, chapter, source_key, run, report):
+        """Queue a chapter job and make sure the workers are running."""
+        priority = (-self._chapter_key(chapter), next(self._order))
+
+        with self._cond:
+            self._jobs.append((priority, chapter, source_key, run, report))
+
+            if len(self._workers) < self.max_chapters:
+                worker = threading.Thread(target=self._work, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+            self._cond.notify()
+
+    def _next_job(self):
+        """Take the highest priority job whose source has a free slot."""
+        ready = [job for job in self._jobs
+                 if self._running.get(job[2], 0) < self.per_source]
+
+        if not ready:
+            return None
+
+        job = min(ready, key=lambda job: job[0])
+        self._jobs.remove(job)
+        self._running[job[2]] = self._running.get(job[2], 0) + 1
+
+        return job
+
+    def _work(self):
+        """Run queued chapter jobs until the queue is empty.
+
+        A worker leaves the list of workers while still holding the lock,
+        so a job queued as it exits always starts a new worker.
+        """
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if not self._jobs:
+                        self._workers.remove(threading.current_thread())
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+
+            try:
+                self._run_job(*job[1:])
+            except BaseException:
+                with self._cond:
+                    self._workers.remove(threading.current_thread())
+                raise
+
+    def _run_job(self, chapter, source_key, run, report):
+        """Run a single chapter job and report how it went."""
+        count, error = 0, None
+        try:
+            count = run(chapter)
+        except Exception as err:
+            error = err
+        finally:
+            with self._cond:
+                self._running[source_key] -= 1
+                self._cond.notify_all()
+
+        report(chapter, count, error)
@@ -1,16 +1,109 @@
 """Scraper to pull chapter images from a source."""
+from collections import deque
+from contextlib import contextmanager
+import itertools
 import re
+import time
 import urllib
 
 from bs4 import BeautifulSoup
 import requests
 
+from manga_saver.downloader import ImageDownloader
+from manga_saver.downloader import prefetch
 from manga_saver.mangasource import MangaSource
+from manga_saver.pagestore import PageStore
 from manga_saver.seriescache import SeriesCache
+from manga_saver.sinks import CHUNK_SIZE
+from manga_saver.sinks import PageRecord
+from manga_saver.sinks import write_chunks
+from manga_saver.throttle import retry_after_seconds
+
+
+class PageRequestError(ValueError):
+    """Error for a page that could not be requested, but may be later.
+
+    Attributes:
+        retry_after: Seconds the server asked to wait before trying
+            again, or None if it did not say.
+
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class Scraper(object):
-    """Scraper that pulls page images from a source."""
+    """Scraper that pulls page images from a source.
+
+    Attributes:
+        transport: The Transport used for page and image requests.
+            When None, each source's own transport is used.
+        parser: The name of the BeautifulSoup parser used for sources
+            that do not set their own, like 'lxml' or 'html.parser'.
+        page_store: The PageStore that downloaded page images are kept
+            in, if any. Images it has saved are read from it instead of
+            being downloaded again.
+        page_retries: Number of times to retry a page of a multipage
+            chapter or a page image that could not be requested.
+        retry_backoff: Seconds to sleep before the first retry of a
+            page, which doubles after each attempt. A longer Retry-After
+            from the server is waited out instead.
+        limiter: The AdaptiveLimiter that page and image requests wait
+            on, if any, to find how many requests each host can take.
+        hedging: The HedgePolicy that image downloads are sent with, if
+            any, to race an image that is slow to arrive with a second
+            request. Images streamed to a sink are not hedged.
+
+    """
+
+    transport = None
+    parser = 'html.parser'
+    page_store = None
+    page_retries = 3
+    retry_backoff = 0.5
+    limiter = None
+    hedging = None
+
+    @classmethod
+    def _transport_for(cls, source):
+        """Get the transport to use for requests to the given source."""
+        return cls.transport if cls.transport else source.transport
+
+    @classmethod
+    @contextmanager
+    def _requesting(cls, url, source, kind='page', **kwargs):
+        """Request a URL from a source, within the limit for its host.
+
+        With a limiter, a slot for the host is held until the context is
+        left, so reading a streamed body counts against the limit. The
+        kind of request, 'page' or 'image', is timed on its own.
+
+        Yields:
+            The response to the request.
+
+        """
+        transport = cls._transport_for(source)
+
+        if cls.limiter is None:
+            yield transport.get(url, **kwargs)
+            return
+
+        with cls.limiter.slot(url, kind) as slot:
+            res = transport.get(url, **kwargs)
+            slot.record(res)
+            yield res
+
+    @classmethod
+    def _make_soup(cls, markup, source, parse_only=None):
+        """Parse HTML from a source with the parser chosen for it.
+
+        Provide a SoupStrainer as parse_only to only keep the parts
+        of the HTML it matches.
+        """
+        parser = source.parser if source.parser else cls.parser
+        return BeautifulSoup(markup, parser, parse_only=parse_only)
 
     @classmethod
     def chapter_list(cls, series, source, index_url=None):
@@ -41,7 +134,33 @@ class Scraper(object):
             return chapters
 
         index_html = series.get_index(source, index_url)
-        index_html = BeautifulSoup(index_html, 'html.parser')
+
+        chapters = series.get_chapter_list(source)
+        if chapters is not None:
+            return chapters
+
+        return cls._parse_chapter_list(index_html, series, source)
+
+    @classmethod
+    def _parse_chapter_list(cls, index_html, series, source):
+        """Parse the chapter list from the HTML of an index page.
+
+        The parsed chapter list is stored in the series cache.
+
+        Args:
+            index_html: The HTML of the index page as a string.
+            series: The SeriesCache of the series for the index.
+            source: The MangaSource the index came from.
+
+        Returns:
+            A dictionary of the chapter number as a string and the link.
+
+        Raises:
+            ValueError: For a source that is missing the index element.
+
+        """
+        index_html = cls._make_soup(
+            index_html, source, source.extraction_plan.index)
         index_html = index_html.find(
             source.index_tag, attrs=source.index_attrs)
 
@@ -103,12 +222,25 @@ class Scraper(object):
         return chapter_number
 
     @classmethod
-    def chapter_pages(cls, chapter, series, source):
+    def chapter_pages(cls, chapter, series, source, downloader=None,
+                      resume=False):
         """Generate the pages for a chapter of the series from a source.
 
+        Pages of a multipage chapter that cannot be requested are
+        retried before giving up. With resume, the series keeps a
+        checkpoint of where the chapter is up to as each page is taken,
+        until the chapter is finished.
+
         Args:
             chapter_url: The URL of the first or only page of the chapter.
             source: The MangaSource to get the chapter from.
+            downloader: (optional) An ImageDownloader to fetch the page
+                images concurrently while the page links are found.
+                Pages are still generated in order.
+            resume: (optional) Whether to pick up a multipage chapter
+                from its checkpoint, after the last page that was taken,
+                and keep its checkpoint up to date. Without it, the
+                checkpoint is neither used nor changed.
 
         Yields:
             A tuple of the page image data and file extension.
@@ -117,14 +249,71 @@ class Scraper(object):
             TypeError: For improperly typed arguments.
             ValueError: For en empty chapter number.
             KeyError: For a chapter that is not available.
+            PageRequestError: For a page that failed on every try.
 
         """
+        return cls._chapter_pages(chapter, series, source, downloader,
+                                  resume=resume)
+
+    @classmethod
+    def stream_chapter_pages(cls, chapter, series, source, sink,
+                             downloader=None, resume=False):
+        """Stream the pages for a chapter of the series to a sink.
+
+        Each page image is written to the sink in chunks as it
+        downloads, so whole images are never held in memory.
+
+        Args:
+            chapter: The chapter number as a string.
+            series: The SeriesCache of the series for the chapter.
+            source: The MangaSource to get the chapter from.
+            sink: A function called with the page number and the file
+                extension for each page, which returns the path to write
+                the image to, or a writable binary file object, like an
+                archive member. File objects are closed once written.
+                It can also return a PageStore to keep the page in,
+                which only requests images it has not saved. Returning
+                None skips a page, like one that is already saved,
+                without requesting its image.
+                With a downloader, it is called from the worker threads
+                and pages can be written out of order.
+            downloader: (optional) An ImageDownloader to stream the page
+                images concurrently while the page links are found.
+                Records are still generated in order.
+            resume: (optional) Whether to pick up a multipage chapter
+                from its checkpoint, as with chapter_pages.
+
+        Yields:
+            A PageRecord for each page once it has been written. Pages
+            kept in a PageStore have the hash of their data as the
+            target. Skipped pages have a size and target of None.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For en empty chapter number.
+            KeyError: For a chapter that is not available.
+            PageRequestError: For a page that failed on every try.
+
+        """
+        if not callable(sink):
+            raise TypeError('sink must be callable.')
+
+        return cls._chapter_pages(chapter, series, source, downloader, sink,
+                                  resume)
+
+    @classmethod
+    def _chapter_pages(cls, chapter, series, source, downloader=None,
+                       sink=None, resume=False):
+        """Generate the pages for a chapter, or their records with a sink."""
         if type(chapter) is not str:
             raise TypeError('Chapter URL must be a string.')
         if not isinstance(series, SeriesCache):
             raise TypeError('Given series must be a SeriesCache.')
         if not isinstance(source, MangaSource):
             raise TypeError('Given source must be a MangaSource.')
+        if downloader is not None and not isinstance(
+                downloader, ImageDownloader):
+            raise TypeError('downloader must be an ImageDownloader.')
         if not chapter:
             raise ValueError('Cannot use an empty string for chapter.')
 
@@ -137,86 +326,236 @@ class Scraper(object):
         except KeyError:
             raise KeyError(f'Chapter {chapter} not available from {source}.')
 
+        crawled = deque() if resume else None
+
         if source.is_multipage:
-            pages = cls._generate_multipage_chapter(chapter_url, source)
+            start = series.get_checkpoint(source, chapter) if resume else None
+            pages = cls._generate_multipage_chapter(
+                chapter_url, source, downloader, sink, start, crawled)
         else:
-            pages = cls._generate_singlepage_chapter(chapter_url, source)
+            pages = cls._generate_singlepage_chapter(
+                chapter_url, source, downloader, sink)
 
         def gen(pages):
             for page in pages:
                 yield page
+                if crawled:
+                    series.set_checkpoint(source, chapter, *crawled.popleft())
+
+            if source.is_multipage and resume:
+                series.clear_checkpoint(source, chapter)
 
         return gen(pages)
 
     @classmethod
-    def _generate_multipage_chapter(cls, url, source):
+    def _generate_multipage_chapter(cls, url, source, downloader=None,
+                                    sink=None, start=None, crawled=None):
         """Generate all the image data for the pages of a multipage source.
 
         Args:
             url: The link to the first page of the chapter.
             source: The MangaSource this link came from.
+            downloader: (optional) An ImageDownloader to fetch the page
+                images concurrently. With one, the pages are crawled on
+                their own thread, so the next page is requested as soon
+                as its link is found, while earlier images download.
+            sink: (optional) A sink to stream the page images to, as
+                given to stream_chapter_pages.
+            start: (optional) A tuple of the link to a later page of the
+                chapter to start from, and its page number.
+            crawled: (optional) A deque to append a tuple of the link to
+                the next page and its page number to, as each page is
+                found.
 
         Yields:
-            A tuple of the page image data and file extension.
+            A tuple of the page image data and file extension, or a
+            PageRecord for each page with a sink.
 
         Raises:
             TypeError: For improperly typed arguments.
             ValueError: For empty chapter or url.
+            PageRequestError: For a page that failed on every try.
 
         """
         if type(url) is not str:
             raise TypeError('URL must be a string.')
         if not isinstance(source, MangaSource):
             raise TypeError('Given source must be a MangaSource.')
+        if downloader is not None and not isinstance(
+                downloader, ImageDownloader):
+            raise TypeError('downloader must be an ImageDownloader.')
         if not url:
             raise ValueError('Cannot use an empty strings for URL.')
 
-        def gen(url):
-            base_url, end = url.rstrip('/').rsplit('/', 1)
+        base_url = cls._chapter_base_url(url)
+        number = 1
+        if start is not None and base_url in start[0]:
+            url, number = start
 
-            dashed_number = re.match(r'^\d*(-|_)\d*$', end)
-            if dashed_number:
-                base_end = end.split(dashed_number.groups()[0])[0]
-                base_url += f'/{base_end}'
+        def links(url, number):
+            retries = 0
 
             while base_url in url:
                 try:
-                    data, ext, url, _ = cls._get_page(url, source)
+                    img_link, ext, next_url, _ = cls._find_page(url, source)
+                except PageRequestError as err:
+                    time.sleep(cls._retry_delay(err, retries))
+                    retries += 1
+                    continue
                 except ValueError:
                     break
-                yield data, ext
-        return gen(url)
+
+                retries = 0
+                if crawled is not None:
+                    crawled.append((next_url, number + 1))
+                yield img_link, ext
+
+                url, number = next_url, number + 1
+
+        pages = links(url, number)
+        if downloader is not None:
+            pages = prefetch(pages, downloader.max_workers)
+
+        return cls._download_pages(pages, source, downloader, sink, number)
 
     @classmethod
-    def _generate_singlepage_chapter(cls, url, source):
+    def _chapter_base_url(cls, url):
+        """Get the part of a page URL shared by every page of its chapter.
+
+        A multipage chapter ends once the next page link leaves this URL.
+        """
+        base_url, end = url.rstrip('/').rsplit('/', 1)
+
+        dashed_number = re.match(r'^\d*(-|_)\d*$', end)
+        if dashed_number:
+            base_end = end.split(dashed_number.groups()[0])[0]
+            base_url += f'/{base_end}'
+
+        return base_url
+
+    @classmethod
+    def _generate_singlepage_chapter(cls, url, source, downloader=None,
+                                     sink=None):
         """Generate all the image data for the pages of a singlepage source.
 
         Args:
             url: The link to the chapter page with page images.
             source: The MangaSource this link came from.
+            downloader: (optional) An ImageDownloader to fetch the page
+                images concurrently.
+            sink: (optional) A sink to stream the page images to, as
+                given to stream_chapter_pages.
 
         Yields:
-            A tuple of the page image data and file extension.
+            A tuple of the page image data and file extension, or a
+            PageRecord for each page with a sink.
 
         Raises:
             TypeError: For improperly typed arguments.
             ValueError: For empty chapter or url.
+            PageRequestError: For a page that failed on every try.
 
         """
         if type(url) is not str:
             raise TypeError('URL must be a string.')
         if not isinstance(source, MangaSource):
             raise TypeError('Given source must be a MangaSource.')
+        if downloader is not None and not isinstance(
+                downloader, ImageDownloader):
+            raise TypeError('downloader must be an ImageDownloader.')
         if not url:
             raise ValueError('Cannot use an empty strings for URL.')
 
-        def gen():
-            data, ext, _, html = cls._get_page(url, source)
-            yield data, ext
+        def links():
+            page_html = cls._request_page(url, source)
+            yield from cls._page_image_links(page_html, source)
+        return cls._download_pages(links(), source, downloader, sink)
+
+    @classmethod
+    def _page_image_links(cls, page_html, source):
+        """Generate the link and file extension for every page image.
+
+        Every image is found in a single pass over the page, without
+        changing the soup, so long chapters are parsed in linear time.
+
+        Raises:
+            ValueError: For a page with no page image, or a page image
+                with no source.
+
+        """
+        html = cls._make_soup(page_html, source, source.extraction_plan.page)
+
+        for img_tag in cls._page_images(html, source):
+            yield cls._image_link(img_tag)
+
+    @classmethod
+    def _download_pages(cls, links, source, downloader=None, sink=None,
+                        first=1):
+        """Generate the image data for page image links, in order.
+
+        Args:
+            links: An iterable of tuples of the page image URL and the
+                file extension for that image.
+            source: The MangaSource these links came from.
+            downloader: (optional) An ImageDownloader to fetch the page
+                images concurrently. Images are fetched one at a time
+                without one.
+            sink: (optional) A sink to stream the page images to, as
+                given to stream_chapter_pages.
+            first: (optional) The page number of the first link.
+
+        Yields:
+            A tuple of the page image data and file extension, or a
+            PageRecord for each page with a sink.
+
+        """
+        if sink is not None:
+            return cls._stream_pages(links, source, sink, downloader, first)
+
+        def fetch(img_link):
+            return cls._download_image(img_link, source)
+
+        if downloader is None:
+            return ((fetch(img_link), ext) for img_link, ext in links)
+
+        return downloader.map(fetch, links)
+
+    @classmethod
+    def _stream_pages(cls, links, source, sink, downloader=None, first=1):
+        """Generate a record for each page image streamed to a sink, in order.
+
+        Args:
+            links: An iterable of tuples of the page image URL and the
+                file extension for that image.
+            source: The MangaSource these links came from.
+            sink: A sink to stream the page images to, as given to
+                stream_chapter_pages.
+            downloader: (optional) An ImageDownloader to stream the page
+                images concurrently.
+            first: (optional) The page number of the first link.
+
+        Yields:
+            A PageRecord for each page.
+
+        """
+        def fetch(img_link, ext, number):
+            target = sink(number, ext)
+            if target is None:
+                return PageRecord(number, img_link, ext, None, None)
+
+            size, target = cls._stream_image(img_link, source, target)
+            return PageRecord(number, img_link, ext, size, target)
+
+        numbered = ((img_link, ext, number)
+                    for number, (img_link, ext) in enumerate(links, first))
+
+        if downloader is None:
+            return (fetch(*link) for link in numbered)
 
-            while html.find('img', attrs=source.pg_img_attrs):
-                yield cls._pull_page_image(html, source)[:2]
-        return gen()
+        # The downloader passes on everything after the extension.
+        return (record for record, _ in downloader.map(
+            fetch, ((img_link, ext, ext, number)
+                    for img_link, ext, number in numbered)))
 
     @classmethod
     def _get_page(cls, url, source):
@@ -237,20 +576,100 @@ class Scraper(object):
             TypeError: For improperly typed arguments
             ValueError: For an invlid URL.
 
+        """
+        img_link, ext, next_page, html = cls._find_page(url, source)
+        data = cls._download_image(img_link, source)
+
+        return data, ext, next_page, html
+
+    @classmethod
+    def _find_page(cls, url, source):
+        """Get and parse a page of a chapter without downloading the image.
+
+        Works for both multipage and singlepage sources.
+
+        Args:
+            url: The link to the page, or only page, of the chapter.
+            source: The MangaSource this link came from.
+
+        Returns:
+            A tuple of the page image URL, the file extention for that
+            image, the URL for the next page, and the BeautifulSoup of
+            the current page.
+
+        Raises:
+            TypeError: For improperly typed arguments
+            ValueError: For an invlid URL.
+            PageRequestError: For a page that could not be reached, or
+                that the server could not give right now.
+
         """
         if type(url) is not str:
             raise TypeError('Given URL must be a string.')
         if not isinstance(source, MangaSource):
             raise TypeError('Given source must be a MangaSource.')
 
+        return cls._parse_page(url, cls._request_page(url, source), source)
+
+    @classmethod
+    def _request_page(cls, url, source):
+        """Get the HTML of a page of a chapter as a string.
+
+        Raises:
+            ValueError: For an invlid URL.
+            PageRequestError: For a page that could not be reached, or
+                that the server could not give right now.
+
+        """
         try:
-            res = requests.get(url)
+            with cls._requesting(url, source) as res:
+                page_html = res.text
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            raise PageRequestError(f'Could not reach page {url}.')
         except requests.exceptions.RequestException:
             raise ValueError('Invalid URL given for page.')
 
-        html = BeautifulSoup(res.text, 'html.parser')
+        if res.status_code == 429 or res.status_code >= 500:
+            raise PageRequestError(
+                f'Page {url} is unavailable ({res.status_code}).',
+                retry_after_seconds(
+                    getattr(res, 'headers', {}).get('Retry-After')))
+
+        return page_html
 
-        data, ext, tag = cls._pull_page_image(html, source)
+    @classmethod
+    def _parse_page(cls, url, page_html, source):
+        """Parse the page image and next page link from a page of a chapter.
+
+        Args:
+            url: The link the page came from.
+            page_html: The HTML of the page as a string.
+            source: The MangaSource this page came from.
+
+        Pages from a multipage source with a fast path are read from
+        the text when possible, without building a BeautifulSoup.
+
+        Returns:
+            A tuple of the page image URL, the file extention for that
+            image, the URL for the next page, and the BeautifulSoup of
+            the current page, or None if the fast path read the page.
+
+        Raises:
+            ValueError: For a page with no usable page image.
+
+        """
+        if source.fast_path and source.is_multipage:
+            found = source.fast_path.extract(page_html)
+            if found:
+                img_link, ext, next_page = found
+                next_page = urllib.parse.urljoin(url, next_page)
+                return img_link, ext, next_page, None
+
+        html = cls._make_soup(
+            page_html, source, source.extraction_plan.page)
+
+        img_link, ext, tag = cls._find_page_image(html, source)
 
         try:
             next_page = tag['href']
@@ -258,7 +677,7 @@ class Scraper(object):
         except KeyError:
             next_page = ''
 
-        return data, ext, next_page, html
+        return img_link, ext, next_page, html
 
     @classmethod
     def _pull_page_image(cls, html, source):
@@ -282,19 +701,73 @@ class Scraper(object):
             ValueError: For HTML that has no page image or the page
                 image has no source to get image data from.
 
+        """
+        img_link, ext, img_tag = cls._find_page_image(html, source)
+        image_data = cls._download_image(img_link, source)
+
+        return image_data, ext, img_tag
+
+    @classmethod
+    def _find_page_image(cls, html, source):
+        """Find the link to the page image in the given HTML.
+
+        Note that the image element returned by this method is
+        removed from the BeautifulSoup passed in as html.
+
+        Args:
+            html: A BeautifulSoup of the HTML to search.
+            source: The MangaSource this HTML came from.
+
+        Returns:
+            A tuple of the image URL, the file extension for the image
+            as a string, and the BeautifulSoup element that held the
+            page image. This element will be the anchor tag around the
+            image tag for a multipage source.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For HTML that has no page image or the page
+                image has no source to get image data from.
+
         """
         if not isinstance(html, BeautifulSoup):
             raise TypeError('link must be a string.')
         if not isinstance(source, MangaSource):
             raise TypeError('source must be a MangaSource.')
 
+        img_tag = cls._page_images(html, source)[0]
+        img_link, ext = cls._image_link(img_tag)
+
+        if source.is_multipage and img_tag.find_parent('a'):
+            img_tag = img_tag.find_parent('a')
+
+        img_tag = img_tag.extract()
+
+        return img_link, ext, img_tag
+
+    @classmethod
+    def _page_images(cls, html, source):
+        """Find every page image tag in the given HTML, in one pass.
+
+        Raises:
+            ValueError: For HTML that has no page image.
+
+        """
         imgs = html.findAll('img', attrs=source.pg_img_attrs)
 
         if not imgs:
             raise ValueError('Webpage has no page image.')
 
-        img_tag = imgs[0]
+        return imgs
+
+    @staticmethod
+    def _image_link(img_tag):
+        """Get the link and file extension for a page image tag.
 
+        Raises:
+            ValueError: For a page image with no source.
+
+        """
         try:
             img_link = img_tag['src']
         except KeyError:
@@ -305,11 +778,158 @@ class Scraper(object):
 
         ext = img_link.rsplit('.', 1)[-1]
 
-        image_data = requests.get(img_link).content
+        return img_link, ext
 
-        if source.is_multipage and img_tag.find_parent('a'):
-            img_tag = img_tag.find_parent('a')
+    @classmethod
+    def _download_image(cls, img_link, source):
+        """Download the image data for a page image link.
 
-        img_tag = img_tag.extract()
+        With a page store, images it has saved are read from it, and
+        others are saved to it.
+        """
+        if cls.page_store is None:
+            return cls._image_content(img_link, source)
 
-        return image_data, ext, img_tag
+        if cls.hedging is None:
+            chunks = cls._image_chunks(img_link, source)
+        else:
+            chunks = cls._hedged_chunks(img_link, source)
+
+        digest = cls.page_store.save(img_link, chunks)
+        return cls.page_store.read(digest)
+
+    @classmethod
+    def _image_content(cls, img_link, source):
+        """Download the whole image data for a page image link.
+
+        With hedging, a request that is slow to arrive is raced by a
+        second one. Only single requests are hedged, never the wait
+        before a retry.
+        """
+        def fetch():
+            with cls._requesting(img_link, source, 'image') as res:
+                data = res.content
+            error = cls._image_error(res, img_link)
+            if error is not None:
+                raise error
+            return data
+
+        retries = 0
+        while True:
+            try:
+                if cls.hedging is None:
+                    return fetch()
+                return cls.hedging.call(fetch)
+            except ValueError as error:
+                retries = cls._retry_image(error, retries)
+
+    @classmethod
+    def _hedged_chunks(cls, img_link, source):
+        """Generate the whole image data for a link as a single chunk.
+
+        The image is not requested until the chunk is.
+        """
+        yield cls._image_content(img_link, source)
+
+    @classmethod
+    def _image_chunks(cls, img_link, source):
+        """Generate the image data for a page image link in chunks.
+
+        The image is not requested until the first chunk is.
+        """
+        retries = 0
+        while True:
+            with cls._requesting(img_link, source, 'image',
+                                 stream=True) as res:
+                try:
+                    error = cls._image_error(res, img_link)
+                    if error is None:
+                        yield from res.iter_content(CHUNK_SIZE)
+                finally:
+                    res.close()
+
+            if error is None:
+                return
+            retries = cls._retry_image(error, retries)
+
+    @classmethod
+    def _image_error(cls, res, img_link):
+        """Get the error for a response that does not hold its image.
+
+        Returns:
+            A PageRequestError for an image the server could not give
+            right now, a ValueError for any other response that is not
+            a success, or None for a success.
+
+        """
+        status_code = res.status_code
+        if status_code == 429 or status_code >= 500:
+            retry_after = retry_after_seconds(
+                getattr(res, 'headers', {}).get('Retry-After'))
+            return PageRequestError(
+                f'Image {img_link} is unavailable ({status_code}).',
+                retry_after)
+        if not 200 <= status_code < 300:
+            return ValueError(
+                f'Image {img_link} could not be found ({status_code}).')
+        return None
+
+    @classmethod
+    def _retry_image(cls, error, retries):
+        """Wait to retry an image request that failed, or raise its error.
+
+        Returns:
+            The number of retries made, counting the one about to be.
+
+        Raises:
+            The error, if it cannot be retried or the retries are used up.
+
+        """
+        time.sleep(cls._retry_delay(error, retries))
+        return retries + 1
+
+    @classmethod
+    def _retry_delay(cls, error, retries):
+        """Get the seconds to wait before retrying a failed request.
+
+        Waits at least as long as the server asked to.
+
+        Raises:
+            The error, if it cannot be retried or the retries are used up.
+
+        """
+        if not isinstance(error, PageRequestError) or (
+                retries == cls.page_retries):
+            raise error
+
+        return max(cls.retry_backoff * 2 ** retries, error.retry_after or 0)
+
+    @classmethod
+    def _stream_image(cls, img_link, source, target):
+        """Stream the image data for a page image link to a file in chunks.
+
+        A PageStore as the target only requests images it has not saved.
+
+        Returns:
+            A tuple of the number of bytes written and the path or name
+            of the file that was written, or the hash of the image data
+            for a PageStore.
+
+        """
+        chunks = cls._image_chunks(img_link, source)
+
+        if isinstance(target, PageStore):
+            digest = target.save(img_link, chunks)
+            return target.size(digest), digest
+
+        # Request the image before the target is written, so a failed
+        # request never leaves an error page in its place, and close an
+        # opened target so it is not left open either.
+        chunks = iter(chunks)
+        try:
+            first = next(chunks, b'')
+        except BaseException:
+            if callable(getattr(target, 'close', None)):
+                target.close()
+            raise
+        return write_chunks(itertools.chain([first], chunks), target)
@@ -1,10 +1,12 @@
 """Model for a single series of manga to allow caching of index pages."""
 from datetime import datetime
+import hashlib
 import re
 
 from manga_saver.mangasource import MangaSource
-
-import requests
+from manga_saver.storage import Storage
+from manga_saver.transport import DEFAULT_TRANSPORT
+from manga_saver.transport import Transport
 
 
 class SeriesCache(object):
@@ -12,14 +14,27 @@ class SeriesCache(object):
 
     Attributes:
         title: The title of the series.
+        transport: The Transport used to request index pages.
+        storage: The Storage that keeps the cache between runs, if any.
 
     """
 
-    def __init__(self, title, update_interval=21600):
+    _VALIDATOR_HEADERS = {'etag': 'ETag', 'last_modified': 'Last-Modified'}
+    _MAX_CHAPTER_CHANGES = 100
+
+    def __init__(self, title, update_interval=21600, transport=None,
+                 storage=None):
         """Set up a new empty cache.
 
         Update interval is used to determine when a cache is outdated.
         Default is 21600 seconds, or 6 hours.
+
+        Index pages are requested with the given transport, or the
+        shared transport if none is given.
+
+        With a storage backend, the cache is kept there instead of in
+        memory, so it starts with whatever an earlier run stored for
+        the same title. Values are only loaded when they are needed.
         """
         if type(title) is not str:
             raise TypeError('title must be a string.')
@@ -29,14 +44,32 @@ class SeriesCache(object):
             raise TypeError('Update interval must be an integer.')
         if update_interval < 0:
             raise ValueError('Update interval cannot be negative.')
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be a Transport.')
+        if storage is not None and not isinstance(storage, Storage):
+            raise TypeError('storage must be a Storage.')
 
         self.title = title
         self._update_interval = update_interval
-
-        self._index_pages = {}
-        self._chapter_lists = {}
-        self._custom_urls = {}
-        self._last_updated = {}
+        self.transport = transport if transport else DEFAULT_TRANSPORT
+        self.storage = storage
+
+        self._index_pages = self._table('index_pages')
+        self._chapter_lists = self._table('chapter_lists')
+        self._custom_urls = self._table('custom_urls')
+        self._last_updated = self._table('last_updated')
+        self._validators = self._table('validators')
+        self._index_digests = self._table('index_digests')
+        self._known_chapters = self._table('known_chapters')
+        self._chapter_changes = self._table('chapter_changes')
+        self._checkpoints = self._table('checkpoints')
+
+    def _table(self, name):
+        """Get the mapping that holds one kind of cached data."""
+        if self.storage is None:
+            return {}
+
+        return self.storage.table(self.title, name)
 
     def __repr__(self):
         """Display the name and cache size of the series."""
@@ -64,14 +97,50 @@ class SeriesCache(object):
         last_update = self._last_updated[repr(source)] if source in self else 0
         return now - last_update > self._update_interval
 
-    def update_index(self, source, index_url=None):
-        """Store the html for the index page at a source.
+    def needs_update(self, source, index_url=None):
+        """Check if the index page at a source must be fetched again.
 
-        Provide a index_url to set a custom URL for this source.
-        Only necessary if the generated URL for this series fails.
+        True when the cache is outdated or a new custom URL is given.
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+        if index_url is not None and type(index_url) is not str:
+            raise TypeError('URL must be a string.')
+
+        custom_url = self._custom_urls.get(repr(source))
+        is_new_url = index_url and custom_url != index_url
+
+        return bool(is_new_url) or self.has_outdated_cache(source)
+
+    def index_url_for(self, source):
+        """Get the URL of the index page at a source.
+
+        Uses the custom URL for the source if one has been set.
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+
+        src_name = repr(source)
+
+        if src_name in self._custom_urls:
+            return self._custom_urls[src_name]
+
+        return source.index_url(self.title)
+
+    def set_index(self, source, html, index_url=None, validators=None):
+        """Store html for the index page at a source fetched elsewhere.
+
+        Provide the index_url it came from to set a custom URL for
+        this source. Provide the headers of the response as validators
+        to revalidate the page with a conditional request next time.
+
+        The chapter list for the source is dropped if the html is not
+        the same as what was stored before, since it may no longer match.
         """
         if not isinstance(source, MangaSource):
             raise TypeError('source must be a MangaSource.')
+        if type(html) is not str:
+            raise TypeError('html must be a string.')
         if index_url is not None and type(index_url) is not str:
             raise TypeError('URL must be a string.')
 
@@ -80,16 +149,92 @@ class SeriesCache(object):
         if index_url:
             self._custom_urls[src_name] = index_url
 
-        elif src_name in self._custom_urls:
-            index_url = self._custom_urls[src_name]
+        digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        if self._index_digests.get(src_name) != digest:
+            self._chapter_lists.pop(src_name, None)
+
+        self._index_pages[src_name] = html
+        self._index_digests[src_name] = digest
+        self._last_updated[src_name] = datetime.utcnow().timestamp()
 
+        saved = {
+            name: validators[header]
+            for name, header in self._VALIDATOR_HEADERS.items()
+            if validators and validators.get(header)
+        }
+        if saved:
+            self._validators[src_name] = saved
         else:
-            index_url = source.index_url(self.title)
+            self._validators.pop(src_name, None)
 
-        res = requests.get(index_url)
+    def prepare_index_request(self, source, index_url=None):
+        """Get the URL and headers to request the index page at a source.
 
-        self._index_pages[src_name] = res.text
-        self._last_updated[src_name] = datetime.utcnow().timestamp()
+        Provide a index_url to set a custom URL for this source. The
+        headers make the request conditional on the page having changed
+        since it was stored, unless the custom URL is new.
+
+        Returns:
+            A tuple of the URL and a dict of request headers.
+
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+        if index_url is not None and type(index_url) is not str:
+            raise TypeError('URL must be a string.')
+
+        src_name = repr(source)
+
+        if index_url and self._custom_urls.get(src_name) != index_url:
+            self._custom_urls[src_name] = index_url
+            self._validators.pop(src_name, None)
+
+        headers = {}
+        if source in self:
+            saved = self._validators.get(src_name, {})
+            if 'etag' in saved:
+                headers['If-None-Match'] = saved['etag']
+            if 'last_modified' in saved:
+                headers['If-Modified-Since'] = saved['last_modified']
+
+        return self.index_url_for(source), headers
+
+    def store_index_response(self, source, status_code, html, headers=None):
+        """Store the response to a request for the index page at a source.
+
+        A 304 Not Modified response only marks the stored html and the
+        chapter list parsed from it as up to date. Any other response
+        replaces the stored html.
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+
+        if status_code == 304 and source in self:
+            self._last_updated[repr(source)] = datetime.utcnow().timestamp()
+            return
+
+        self.set_index(source, html, validators=headers)
+
+    def update_index(self, source, index_url=None):
+        """Store the html for the index page at a source.
+
+        Provide a index_url to set a custom URL for this source.
+        Only necessary if the generated URL for this series fails.
+
+        Sends a conditional request when the page was stored with an
+        ETag or Last-Modified header, so an unchanged page is not
+        downloaded again.
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+        if index_url is not None and type(index_url) is not str:
+            raise TypeError('URL must be a string.')
+
+        url, headers = self.prepare_index_request(source, index_url)
+        res = self.transport.get(url, headers=headers)
+
+        self.store_index_response(source, res.status_code, res.text,
+                                  res.headers)
 
     def get_index(self, source, index_url=None):
         """Get the html for the index page at a source.
@@ -102,13 +247,25 @@ class SeriesCache(object):
         if index_url is not None and type(index_url) is not str:
             raise TypeError('URL must be a string.')
 
-        is_new_url = index_url and self._custom_urls[repr(source)] != index_url
-
-        if is_new_url or self.has_outdated_cache(source):
+        if self.needs_update(source, index_url):
             self.update_index(source, index_url)
 
         return self._index_pages[repr(source)]
 
+    def stored_index(self, source):
+        """Get the stored html for the index page at a source.
+
+        Never requests the page, even if the cache is outdated.
+
+        Returns:
+            The html of the index page, or None if none is stored.
+
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+
+        return self._index_pages.get(repr(source))
+
     def set_chapter_list(self, source, chapter_list):
         """Store the chapter list at a source.
 
@@ -132,7 +289,123 @@ class SeriesCache(object):
                    for val in (chapter_list.values() if chapter_list else [])):
             raise ValueError('Improperly formatted chapter URLs.')
 
-        self._chapter_lists[repr(source)] = chapter_list
+        src_name = repr(source)
+        self._chapter_lists[src_name] = chapter_list
+
+        if chapter_list is not None:
+            self._record_chapter_changes(src_name, chapter_list)
+
+    def _record_chapter_changes(self, src_name, chapter_list):
+        """Record how a chapter list differs from the last one stored."""
+        known = self._known_chapters.get(src_name, {})
+
+        change = {
+            'updated': datetime.utcnow().timestamp(),
+            'added': {num: url for num, url in chapter_list.items()
+                      if num not in known},
+            'removed': {num: url for num, url in known.items()
+                        if num not in chapter_list},
+            'changed': {num: url for num, url in chapter_list.items()
+                        if num in known and known[num] != url},
+        }
+
+        if not any((change['added'], change['removed'], change['changed'])):
+            return
+
+        changes = self._chapter_changes.get(src_name, [])
+        changes = changes[-(self._MAX_CHAPTER_CHANGES - 1):] + [change]
+
+        self._chapter_changes[src_name] = changes
+        self._known_chapters[src_name] = dict(chapter_list)
+
+    def get_chapter_changes(self, source, since=None):
+        """Get the changes to the chapter list at a source, oldest first.
+
+        Each change is a dict with the timestamp it was found as
+        'updated', and dicts of chapter number to URL for the chapters
+        'added', 'removed', and 'changed' to a new URL. The first list
+        stored for a source counts every chapter as added. Only the
+        last 100 changes are kept.
+
+        Provide a timestamp as since to only get the changes found
+        after that time.
+        """
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+        if since is not None and type(since) not in (int, float):
+            raise TypeError('since must be a timestamp.')
+
+        changes = self._chapter_changes.get(repr(source), [])
+
+        if since is None:
+            return changes
+
+        return [change for change in changes if change['updated'] > since]
+
+    def new_chapters(self, source, since=None):
+        """Get the chapters added at a source that are still available.
+
+        Provide a timestamp as since to only get the chapters added
+        after that time.
+
+        Returns:
+            A dict of the chapter number to the URL for the chapter.
+
+        """
+        new = {}
+        for change in self.get_chapter_changes(source, since):
+            for num in change['removed']:
+                new.pop(num, None)
+            new.update(change['added'])
+            new.update({num: url for num, url in change['changed'].items()
+                        if num in new})
+
+        return new
+
+    @staticmethod
+    def _checkpoint_key(source, chapter):
+        """Get the key for the checkpoint of a chapter from a source."""
+        if not isinstance(source, MangaSource):
+            raise TypeError('source must be a MangaSource.')
+        if type(chapter) is not str:
+            raise TypeError('chapter must be a string.')
+
+        return f'{source!r} {chapter}'
+
+    def set_checkpoint(self, source, chapter, url, page):
+        """Remember where to pick up a chapter that was cut short.
+
+        Args:
+            source: The MangaSource the chapter is from.
+            chapter: The chapter number as a string.
+            url: The link to the next page of the chapter to get.
+            page: The page number of that page.
+
+        """
+        if type(url) is not str or type(page) is not int:
+            raise TypeError('Checkpoint must be a URL and a page number.')
+
+        key = self._checkpoint_key(source, chapter)
+        self._checkpoints[key] = {'url': url, 'page': page}
+
+    def get_checkpoint(self, source, chapter):
+        """Get where to pick up a chapter that was cut short.
+
+        Returns:
+            A tuple of the link to the next page of the chapter and its
+            page number, or None if there is no checkpoint.
+
+        """
+        checkpoint = self._checkpoints.get(
+            self._checkpoint_key(source, chapter))
+        if checkpoint is None:
+            return None
+
+        return checkpoint['url'], checkpoint['page']
+
+    def clear_checkpoint(self, source, chapter):
+        """Forget the checkpoint for a chapter, once it is finished."""
+        self._checkpoints.pop(self._checkpoint_key(source, chapter), None)
 
     def get_chapter_list(self, source):
         """Get the chapter list at a source.
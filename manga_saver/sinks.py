@@ -0,0 +1,58 @@
+"""Destinations that page images are streamed to while they download."""
+from collections import namedtuple
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+PageRecord = namedtuple('PageRecord', ['number', 'url', 'ext', 'size',
+                                       'target'])
+PageRecord.__doc__ = """Details of a page image written to a sink.
+
+Attributes:
+    number: The page number, starting at 1.
+    url: The link the page image was downloaded from.
+    ext: The file extension for the image.
+    size: The number of bytes written.
+    target: The path the image was written to, or the name of the
+        file object it was written to, if it has one.
+
+"""
+
+
+def write_chunks(chunks, target):
+    """Write chunks of data to a file path or a writable binary file.
+
+    A file object is closed once every chunk is written, which also
+    finishes an archive member opened for writing.
+
+    Args:
+        chunks: An iterable of byte-strings.
+        target: The path of the file to write, or a writable binary
+            file object.
+
+    Returns:
+        A tuple of the number of bytes written and the path or name of
+        the file that was written.
+
+    Raises:
+        TypeError: For a target that is not a path or writable file.
+
+    """
+    if isinstance(target, str):
+        out = open(target, 'wb')
+        name = target
+    elif callable(getattr(target, 'write', None)):
+        out = target
+        name = getattr(target, 'name', None)
+    else:
+        raise TypeError('A sink must give a file path or a writable file.')
+
+    size = 0
+    with out:
+        for chunk in chunks:
+            if chunk:
+                out.write(chunk)
+                size += len(chunk)
+
+    return size, name
@@ -0,0 +1,215 @@
+"""Persistent storage backends for the SeriesCache."""
+from abc import ABC
+from abc import abstractmethod
+from collections.abc import MutableMapping
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import urllib.parse
+
+
+class Storage(ABC):
+    """Base for a backend that keeps cached series data between runs.
+
+    A backend hands out tables, which are mappings for a single kind of
+    data on a single series, such as the index pages of every source.
+    Values are loaded from the backend only when they are looked up.
+    """
+
+    @abstractmethod
+    def table(self, series_title, name):
+        """Get the mapping that stores one kind of data for a series.
+
+        Args:
+            series_title: The title of the series the data is for.
+            name: The name of the kind of data, like 'index_pages'.
+
+        Returns:
+            A MutableMapping of string keys to JSON serializable values.
+
+        """
+
+
+class SQLiteStorage(Storage):
+    """Storage backend that keeps every series in one SQLite database.
+
+    Attributes:
+        path: The path to the database file.
+
+    """
+
+    def __init__(self, path):
+        """Open the database at the given path, creating it if needed.
+
+        Raises:
+            TypeError: For a non-string path.
+            ValueError: For an empty path.
+
+        """
+        if type(path) is not str:
+            raise TypeError('path must be a string.')
+        if not path:
+            raise ValueError('path cannot be an empty string.')
+
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'series TEXT, name TEXT, key TEXT, value TEXT, '
+                'PRIMARY KEY (series, name, key))')
+
+    def __repr__(self):
+        """Display the path of the database."""
+        return f'<SQLiteStorage: {self.path}>'
+
+    def table(self, series_title, name):
+        """Get the mapping that stores one kind of data for a series."""
+        return _SQLiteTable(self, series_title, name)
+
+    def _execute(self, sql, params):
+        """Run a statement on the database and get all of its rows."""
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """Close the connection to the database."""
+        self._conn.close()
+
+
+class _SQLiteTable(MutableMapping):
+    """Mapping over the rows of one kind of data for one series."""
+
+    def __init__(self, storage, series_title, name):
+        self._storage = storage
+        self._scope = (series_title, name)
+
+    def __getitem__(self, key):
+        rows = self._storage._execute(
+            'SELECT value FROM cache WHERE series=? AND name=? AND key=?',
+            self._scope + (key,))
+        if not rows:
+            raise KeyError(key)
+        return json.loads(rows[0][0])
+
+    def __setitem__(self, key, value):
+        self._storage._execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+            self._scope + (key, json.dumps(value)))
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._storage._execute(
+            'DELETE FROM cache WHERE series=? AND name=? AND key=?',
+            self._scope + (key,))
+
+    def __contains__(self, key):
+        rows = self._storage._execute(
+            'SELECT 1 FROM cache WHERE series=? AND name=? AND key=?',
+            self._scope + (key,))
+        return bool(rows)
+
+    def __iter__(self):
+        rows = self._storage._execute(
+            'SELECT key FROM cache WHERE series=? AND name=?', self._scope)
+        return iter([row[0] for row in rows])
+
+    def __len__(self):
+        rows = self._storage._execute(
+            'SELECT COUNT(*) FROM cache WHERE series=? AND name=?',
+            self._scope)
+        return rows[0][0]
+
+
+class DirectoryStorage(Storage):
+    """Storage backend that keeps each cached value in its own file.
+
+    Files are laid out as <path>/<series>/<name>/<key>.json, with the
+    series and key quoted to be safe as file names. Files are replaced
+    atomically, so a crash never leaves a value half written.
+
+    Attributes:
+        path: The path to the directory holding the cache.
+
+    """
+
+    def __init__(self, path):
+        """Use the directory at the given path, creating it if needed.
+
+        Raises:
+            TypeError: For a non-string path.
+            ValueError: For an empty path.
+
+        """
+        if type(path) is not str:
+            raise TypeError('path must be a string.')
+        if not path:
+            raise ValueError('path cannot be an empty string.')
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        """Display the path of the directory."""
+        return f'<DirectoryStorage: {self.path}>'
+
+    def table(self, series_title, name):
+        """Get the mapping that stores one kind of data for a series."""
+        folder = os.path.join(
+            self.path, urllib.parse.quote(series_title, safe=''), name)
+        return _DirectoryTable(folder)
+
+
+class _DirectoryTable(MutableMapping):
+    """Mapping over the files in one folder of a DirectoryStorage."""
+
+    def __init__(self, folder):
+        self._folder = folder
+
+    def _file(self, key):
+        name = urllib.parse.quote(key, safe='') + '.json'
+        return os.path.join(self._folder, name)
+
+    def __getitem__(self, key):
+        try:
+            with open(self._file(key), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        os.makedirs(self._folder, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self._folder, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._file(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def __delitem__(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return os.path.exists(self._file(key))
+
+    def __iter__(self):
+        try:
+            names = os.listdir(self._folder)
+        except FileNotFoundError:
+            names = []
+        return iter([urllib.parse.unquote(name[:-len('.json')])
+                     for name in names if name.endswith('.json')])
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -0,0 +1,232 @@
+"""Concurrency limits for each host that adapt to how the host responds."""
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+import threading
+import time
+import urllib.parse
+
+import requests
+
+
+# Errors raised while holding a slot that mean the host could not keep up.
+_OVERLOAD_ERRORS = (ConnectionError, TimeoutError,
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout)
+
+
+def retry_after_seconds(value):
+    """Get the number of seconds to wait from a Retry-After header.
+
+    Returns:
+        The seconds to wait as a float, or None for a missing or
+        unreadable header.
+
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+
+    return max(0.0, when.timestamp() - time.time())
+
+
+class _HostState(object):
+    """How many requests a host is taking and how it is coping."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.latency = {}
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+
+
+class AdaptiveLimiter(object):
+    """Limits on concurrent requests to each host, adjusted as they respond.
+
+    Each host starts at the initial limit. Every healthy response adds
+    a little to it, about one more request per round of requests, up to
+    the maximum. A host that answers 429 or 503, fails to answer, or
+    answers much slower than usual has its limit cut by the backoff
+    factor, at most once for each round of requests. A Retry-After
+    header holds back new requests to the host until it has passed.
+
+    Attributes:
+        initial: Number of requests a new host can take at once.
+        maximum: Most requests any host can take at once.
+        minimum: Fewest requests any host can take at once.
+        latency_factor: How many times slower than usual a response
+            can be before the host counts as overloaded.
+        backoff: Factor the limit is multiplied by when overloaded.
+
+    """
+
+    OVERLOADED_STATUSES = (429, 503)
+    _LATENCY_SLACK = 0.05
+    _LATENCY_WEIGHT = 0.2
+
+    def __init__(self, initial=2, maximum=16, minimum=1, latency_factor=2.0,
+                 backoff=0.5):
+        """Set up a new limiter.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For limits out of order, a latency factor of 1
+                or less, or a backoff that is not between 0 and 1.
+
+        """
+        if not all(type(arg) is int for arg in (initial, maximum, minimum)):
+            raise TypeError('Limits must be integers.')
+        if not all(type(arg) in (int, float) for arg in
+                   (latency_factor, backoff)):
+            raise TypeError('Latency factor and backoff must be numbers.')
+
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError('Limits must be at least 1 and in order.')
+        if latency_factor <= 1:
+            raise ValueError('Latency factor must be more than 1.')
+        if not 0 < backoff < 1:
+            raise ValueError('Backoff must be between 0 and 1.')
+
+        self.initial = initial
+        self.maximum = maximum
+        self.minimum = minimum
+        self.latency_factor = latency_factor
+        self.backoff = backoff
+
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def __repr__(self):
+        """Display the limits for the limiter."""
+        return (f'<AdaptiveLimiter: {self.minimum} to {self.maximum} '
+                f'per host>')
+
+    def _state(self, host):
+        """Get the state for a host, starting it if needed."""
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self.initial)
+        return self._hosts[host]
+
+    def limit(self, url):
+        """Get the number of requests the host of a URL can take at once."""
+        with self._cond:
+            return int(self._state(urllib.parse.urlsplit(url).netloc).limit)
+
+    def _acquire(self, host):
+        """Wait for a free request slot for a host and take it."""
+        with self._cond:
+            while True:
+                state = self._state(host)
+                now = time.monotonic()
+
+                if now < state.blocked_until:
+                    self._cond.wait(state.blocked_until - now)
+                elif state.active < int(state.limit):
+                    state.active += 1
+                    return now
+                else:
+                    self._cond.wait()
+
+    def _release(self, host, started, overloaded, retry_after=None,
+                 kind=None, answered=None):
+        """Give back a request slot and adjust the limit for a host.
+
+        Latency is averaged separately for each kind of request, from
+        the start of the request until it was answered, if known.
+        """
+        now = time.monotonic()
+        latency = (answered if answered is not None else now) - started
+
+        with self._cond:
+            state = self._state(host)
+            state.active -= 1
+            average = state.latency.get(kind)
+
+            if average is not None and overloaded is False:
+                slow = average * self.latency_factor + self._LATENCY_SLACK
+                overloaded = latency > slow
+
+            if overloaded:
+                if started >= state.last_decrease:
+                    state.limit = max(self.minimum,
+                                      state.limit * self.backoff)
+                    state.last_decrease = now
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until,
+                                              now + retry_after)
+            elif overloaded is False:
+                if average is None:
+                    state.latency[kind] = latency
+                else:
+                    state.latency[kind] = average + self._LATENCY_WEIGHT * (
+                        latency - average)
+                state.limit = min(self.maximum,
+                                  state.limit + 1 / state.limit)
+
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url, kind=None):
+        """Hold a request slot for the host of a URL while in the context.
+
+        Call record on the slot with the response to adjust the limit
+        for the host. A connection error or timeout raised in the context
+        counts as the host being overloaded. The request is timed until
+        it is recorded, so reading a streamed body does not count as the
+        host being slow.
+
+        Args:
+            url: The URL to be requested.
+            kind: (optional) The kind of request, like 'page' or
+                'image'. Each kind is compared to its own usual latency,
+                so large images are not mistaken for a slow host.
+
+        Yields:
+            A slot with a record method that takes the response.
+
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        slot = _Slot()
+        started = self._acquire(host)
+
+        try:
+            yield slot
+        except _OVERLOAD_ERRORS:
+            self._release(host, started, True, kind=kind)
+            raise
+        except BaseException:
+            self._release(host, started, None, kind=kind)
+            raise
+        else:
+            self._release(host, started, slot.overloaded, slot.retry_after,
+                          kind, slot.answered)
+
+
+class _Slot(object):
+    """A held request slot, which is told how the request went."""
+
+    def __init__(self):
+        self.overloaded = None
+        self.retry_after = None
+        self.answered = None
+
+    def record(self, response):
+        """Note whether a response shows that its host is overloaded."""
+        self.answered = time.monotonic()
+        status_code = response.status_code
+        self.overloaded = status_code in AdaptiveLimiter.OVERLOADED_STATUSES
+
+        if self.overloaded:
+            self.retry_after = retry_after_seconds(
+                response.headers.get('Retry-After'))
@@ -0,0 +1,157 @@
+"""Resize and re-encode page images for the devices they are read on."""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+
+from PIL import Image
+
+from manga_saver.downloader import prefetch
+
+
+class DeviceProfile(object):
+    """Size, color and encoding for the pages sent to a device.
+
+    Attributes:
+        width: Widest a page can be, in pixels, or None for any width.
+        height: Tallest a page can be, in pixels, or None for any height.
+        grayscale: Whether pages are converted to grayscale.
+        fmt: The Pillow format pages are saved in, like 'JPEG' or 'WEBP'.
+        quality: The quality pages are saved with, from 1 to 100.
+
+    """
+
+    EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png'}
+
+    def __init__(self, width=None, height=None, grayscale=False,
+                 fmt='JPEG', quality=85):
+        """Set up a new profile.
+
+        Pages are only ever shrunk to fit, keeping their proportions.
+
+        Raises:
+            TypeError: For improperly typed arguments.
+            ValueError: For sizes less than 1, an unknown format or a
+                quality outside of 1 to 100.
+
+        """
+        if not all(size is None or type(size) is int
+                   for size in (width, height)):
+            raise TypeError('Page sizes must be integers.')
+        if type(grayscale) is not bool:
+            raise TypeError('grayscale must be a boolean.')
+        if type(fmt) is not str or type(quality) is not int:
+            raise TypeError('Format must be a string and quality an integer.')
+
+        if any(size is not None and size < 1 for size in (width, height)):
+            raise ValueError('Page sizes must be at least 1.')
+        if fmt.upper() not in self.EXTENSIONS:
+            raise ValueError(f'Cannot save pages as {fmt}.')
+        if not 1 <= quality <= 100:
+            raise ValueError('Quality must be from 1 to 100.')
+
+        self.width = width
+        self.height = height
+        self.grayscale = grayscale
+        self.fmt = fmt.upper()
+        self.quality = quality
+
+    def __repr__(self):
+        """Display the size and format of the profile."""
+        return (f'<DeviceProfile: {self.width}x{self.height} '
+                f'{self.fmt} @ {self.quality}>')
+
+    @property
+    def ext(self):
+        """Get the file extension for pages saved with this profile."""
+        return self.EXTENSIONS[self.fmt]
+
+
+def _transcode(data, profile):
+    """Resize and re-encode the data for a page image to fit a profile.
+
+    Runs in a worker process, so it must stay a module level function.
+
+    Returns:
+        A tuple of the new image data and file extension.
+
+    Raises:
+        ValueError: For data that is not an image.
+
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except OSError:
+        raise ValueError('Page image data is not an image.')
+
+    keep_alpha = profile.fmt != 'JPEG' and not profile.grayscale
+    if img.mode in ('LA', 'RGBA', 'PA') or 'transparency' in img.info:
+        img = img.convert('RGBA')
+        if not keep_alpha:
+            flat = Image.new('RGB', img.size, 'white')
+            flat.paste(img, mask=img.split()[-1])
+            img = flat
+
+    if profile.grayscale:
+        img = img.convert('L')
+    elif img.mode not in ('L', 'RGB', 'RGBA'):
+        img = img.convert('RGB')
+
+    if profile.width or profile.height:
+        bounds = (profile.width or img.width, profile.height or img.height)
+        img.thumbnail(bounds, Image.LANCZOS)
+
+    out = io.BytesIO()
+    img.save(out, profile.fmt, quality=profile.quality)
+    return out.getvalue(), profile.ext
+
+
+def transcode_pages(pages, profile, max_workers=None):
+    """Generate the pages for a chapter transcoded to fit a profile.
+
+    Pages are pulled from the iterable on their own thread, so they keep
+    downloading while earlier pages are transcoded on a pool of worker
+    processes. Pages are still generated in order.
+
+    Args:
+        pages: An iterable of tuples of the page image data and file
+            extension, like the generator from Scraper.chapter_pages.
+        profile: The DeviceProfile to transcode the pages for.
+        max_workers: (optional) Number of processes that transcode pages
+            at once. Defaults to the number of processors.
+
+    Yields:
+        A tuple of the transcoded page image data and file extension.
+
+    Raises:
+        TypeError: For improperly typed arguments.
+        ValueError: For pages that are not images.
+
+    """
+    if not isinstance(profile, DeviceProfile):
+        raise TypeError('profile must be a DeviceProfile.')
+    if max_workers is not None and type(max_workers) is not int:
+        raise TypeError('max_workers must be an integer.')
+
+    window = (max_workers if max_workers else os.cpu_count() or 1) * 2
+
+    def gen():
+        pending = deque()
+        downloads = prefetch(pages, window)
+
+        with ProcessPoolExecutor(max_workers) as pool:
+            try:
+                for data, _ in downloads:
+                    pending.append(pool.submit(_transcode, data, profile))
+
+                    if len(pending) >= window:
+                        yield pending.popleft().result()
+
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                downloads.close()
+                for future in pending:
+                    future.cancel()
+    return gen()
@@ -0,0 +1,104 @@
+"""Pooled HTTP transport shared by the scraper and models."""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class Transport(object):
+    """HTTP transport that keeps connections to each host alive.
+
+    Wraps a requests Session so that every page, image and index
+    request to the same host reuses an open connection, instead of
+    paying for a new TCP and TLS handshake each time.
+
+    Attributes:
+        timeout: Seconds to wait on a server before giving up.
+        session: The requests Session holding the connection pools.
+
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, retries=3,
+                 backoff_factor=0.3, timeout=30):
+        """Set up the connection pools for a new transport.
+
+        Args:
+            pool_connections: (optional) Number of hosts to keep
+                connection pools for.
+            pool_maxsize: (optional) Number of connections to keep alive
+                in the pool for each host.
+            retries: (optional) Number of times to retry a request that
+                failed to connect or read.
+            backoff_factor: (optional) Factor for the sleep between
+                retries, which doubles after each attempt.
+            timeout: (optional) Seconds to wait on a server before
+                giving up on a request.
+
+        Raises:
+            TypeError: For non-numeric arguments.
+            ValueError: For negative or empty pool sizes and timeouts.
+
+        """
+        if not all(type(arg) is int for arg in
+                   (pool_connections, pool_maxsize, retries)):
+            raise TypeError('Pool sizes and retries must be integers.')
+        if not all(type(arg) in (int, float) for arg in
+                   (backoff_factor, timeout)):
+            raise TypeError('Backoff and timeout must be numbers.')
+
+        if pool_connections < 1 or pool_maxsize < 1:
+            raise ValueError('Pool sizes must be at least 1.')
+        if retries < 0 or backoff_factor < 0:
+            raise ValueError('Retries and backoff cannot be negative.')
+        if timeout <= 0:
+            raise ValueError('Timeout must be positive.')
+
+        self.timeout = timeout
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        single = HTTPAdapter(pool_connections=pool_connections,
+                             pool_maxsize=pool_maxsize, max_retries=0)
+        self._single_session = requests.Session()
+        self._single_session.mount('http://', single)
+        self._single_session.mount('https://', single)
+
+    def __repr__(self):
+        """Display the timeout for the transport."""
+        return f'<Transport: timeout {self.timeout}s>'
+
+    def get(self, url, **kwargs):
+        """Send a GET request over a pooled connection.
+
+        Takes the same keyword arguments as requests.get. Uses the
+        transport timeout unless one is given.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, retry=True, **kwargs):
+        """Send a HEAD request over a pooled connection.
+
+        Takes the same keyword arguments as requests.head. Uses the
+        transport timeout unless one is given. Without retry, the
+        request is only sent once, so it never takes much longer than
+        the timeout.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session if retry else self._single_session
+        return session.head(url, **kwargs)
+
+    def close(self):
+        """Close all the connections held by the transport."""
+        self.session.close()
+        self._single_session.close()
+
+
+DEFAULT_TRANSPORT = Transport()
@@ -7,7 +7,17 @@ requires = [
     'requests'
 ]
 
+async_requires = [
+    'aiohttp'
+]
+
+lxml_requires = [
+    'lxml'
+]
+
 test_requires = [
+    'aiohttp',
+    'lxml',
     'pytest',
     'pytest-cov',
     'pytest-mock',
@@ -23,6 +33,8 @@ setup(
     packages=find_packages(exclude=('tests')),
     install_requires=requires,
     extras_require={
+        'async': async_requires,
+        'lxml': lxml_requires,
         'testing': test_requires,
     },
 )
@@ -7,6 +7,7 @@ import requests
 
 from .context import mangasource
 from .context import seriescache
+from .context import transport
 
 
 TEST_PAGE = '''
@@ -31,11 +32,14 @@ TEST_PAGE = '''
 
 def requests_patch(**kwargs):
     """Patch for any requests method."""
-    def req(url):
+    def req(url, **options):
         if not url.startswith('http'):
             raise requests.exceptions.MissingSchema
 
         class Response(object):
+            status_code = 200
+            headers = {}
+
             def __init__(self, **kwargs):
                 for key, value in kwargs.items():
                     try:
@@ -54,12 +58,12 @@ def requests_patch(**kwargs):
 
 @pytest.fixture(autouse=True)
 def offline_requests(monkeypatch):
-    """Ensure that no HTTP requests are made when pinging URLs."""
+    """Ensure that no HTTP requests are made through the shared transport."""
     req = requests_patch(status_code=200, text=TEST_PAGE.format,
                          content=b'\x00\x00\x00\x00\x00\x00')
 
-    monkeypatch.setattr(requests, 'head', req)
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
 
 @pytest.fixture
@@ -72,7 +76,7 @@ def dummy_source():
 @pytest.fixture(params=[400, 403, 404, 500, 'error'])
 def fail_response(request):
     """Create a Response with a failing status code or exception."""
-    def req(url):
+    def req(url, **options):
         if request.param == 'error':
             raise requests.exceptions.ConnectionError
 
@@ -87,7 +91,7 @@ def fail_response(request):
 @pytest.fixture(params=[200, 302])
 def conn_response(request):
     """Create a Response with a connected status code."""
-    def req(url):
+    def req(url, **options):
         class Response(object):
             status_code = request.param
 
@@ -8,3 +8,17 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from manga_saver import mangasource  # flake8: noqa
 from manga_saver import scraper  # flake8: noqa
 from manga_saver import seriescache  # flake8: noqa
+from manga_saver import transport  # flake8: noqa
+from manga_saver import downloader  # flake8: noqa
+from manga_saver import scheduler  # flake8: noqa
+from manga_saver import storage  # flake8: noqa
+from manga_saver import extraction  # flake8: noqa
+from manga_saver import sinks  # flake8: noqa
+from manga_saver import library  # flake8: noqa
+from manga_saver import archive  # flake8: noqa
+from manga_saver import pdfexport  # flake8: noqa
+from manga_saver import transcode  # flake8: noqa
+from manga_saver import pagestore  # flake8: noqa
+from manga_saver import throttle  # flake8: noqa
+from manga_saver import mirrors  # flake8: noqa
+from manga_saver import hedging  # flake8: noqa
@@ -0,0 +1,116 @@
+"""Tests for the archive module."""
+import os
+import zipfile
+
+import pytest
+
+from .context import archive
+
+
+@pytest.mark.parametrize('value', [None, 5, ['path']])
+def test_constructor_raises_type_error_for_non_string_path(value):
+    """Test that constructor raises a TypeError for non-string paths."""
+    with pytest.raises(TypeError):
+        archive.CBZWriter(value)
+
+
+def test_constructor_raises_value_error_for_empty_path():
+    """Test that constructor raises a ValueError for an empty path."""
+    with pytest.raises(ValueError):
+        archive.CBZWriter('')
+
+
+def test_write_cbz_stores_pages_in_order_without_compression(tmpdir):
+    """Test that write_cbz stores each page as it is, in order."""
+    path = str(tmpdir.join('ch.cbz'))
+    pages = ((bytes([n]) * 100, 'png') for n in range(3))
+
+    assert archive.write_cbz(pages, path) == 3
+
+    with zipfile.ZipFile(path) as cbz:
+        infos = cbz.infolist()
+        assert [info.filename for info in infos] == [
+            '001.png', '002.png', '003.png']
+        assert all(info.compress_type == zipfile.ZIP_STORED
+                   for info in infos)
+        assert cbz.read('002.png') == b'\x01' * 100
+
+
+def test_write_cbz_appends_each_page_as_it_arrives(tmpdir):
+    """Test that a page is in the archive before the next is pulled."""
+    path = str(tmpdir.join('ch.cbz'))
+    sizes = []
+
+    def pages():
+        for n in range(3):
+            sizes.append(os.path.getsize(path + '.part'))
+            yield b'\x00' * 1000, 'jpg'
+
+    archive.write_cbz(pages(), path)
+    assert sizes[0] < sizes[1] < sizes[2]
+
+
+def test_write_cbz_leaves_nothing_behind_on_error(tmpdir):
+    """Test that an interrupted chapter does not leave an archive."""
+    path = str(tmpdir.join('ch.cbz'))
+
+    def pages():
+        yield b'\x00', 'png'
+        raise ValueError('Page went missing.')
+
+    with pytest.raises(ValueError):
+        archive.write_cbz(pages(), path)
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_sink_streams_pages_into_archive(tmpdir):
+    """Test that the writer can be used as a sink for streamed pages."""
+    from .context import sinks
+    path = str(tmpdir.join('ch.cbz'))
+
+    with archive.CBZWriter(path) as writer:
+        for number in (1, 2):
+            sinks.write_chunks([b'a', b'b'], writer.sink(number, 'gif'))
+
+    with zipfile.ZipFile(path) as cbz:
+        assert cbz.namelist() == ['001.gif', '002.gif']
+        assert cbz.read('001.gif') == b'ab'
+    assert writer.pages == 2
+
+
+def test_abort_closes_open_page(tmpdir):
+    """Test that a page still being written does not stop an abort."""
+    path = str(tmpdir.join('ch.cbz'))
+    writer = archive.CBZWriter(path)
+    writer.sink(1, 'png').write(b'a')
+    writer.abort()
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_sink_leaves_nothing_behind_when_image_fails(tmpdir, dummy_source,
+                                                     monkeypatch):
+    """Test that a failed image request does not leave an archive."""
+    from .context import scraper, transport
+
+    def get(url, **kwargs):
+        class Response(object):
+            status_code = 404 if url.endswith('2.png') else 200
+            headers = {}
+
+            def iter_content(self, chunk_size):
+                return iter([url.encode()])
+
+            def close(self):
+                pass
+        return Response()
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    path = str(tmpdir.join('ch.cbz'))
+    links = [('http://f.co/1.png', 'png'), ('http://f.co/2.png', 'png')]
+
+    with pytest.raises(ValueError, match='could not be found'):
+        with archive.CBZWriter(path) as writer:
+            for _ in scraper.Scraper._stream_pages(links, dummy_source,
+                                                   writer.sink):
+                pass
+    assert os.listdir(str(tmpdir)) == []
@@ -0,0 +1,305 @@
+"""Tests for the asyncscraper module."""
+import asyncio
+
+import pytest
+
+from .conftest import TEST_PAGE
+from .context import scraper
+
+pytest.importorskip('aiohttp')
+
+from manga_saver import asyncscraper as ascr  # noqa: E402
+
+
+def run(coro):
+    """Run a coroutine to completion on a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def fake_get(pages, images=None):
+    """Make an AsyncTransport.get that serves the given pages by URL."""
+    async def get(self, url, **kwargs):
+        await asyncio.sleep(0)
+        if not url.startswith('http'):
+            raise ValueError('bad url')
+
+        if url.endswith('.png'):
+            content = images(url) if images else b'\x00' * 6
+        else:
+            content = (pages(url) if callable(pages) else pages).encode()
+
+        return ascr.AsyncResponse(url, 200, {}, content, 'utf-8')
+    return get
+
+
+async def collect(pages):
+    """Gather every item from an async generator."""
+    return [page async for page in pages]
+
+
+@pytest.fixture
+def offline_async(monkeypatch):
+    """Serve the test page from every AsyncTransport request."""
+    monkeypatch.setattr(ascr.AsyncTransport, 'get',
+                        fake_get(TEST_PAGE.format('')))
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'limit': '5'}, {'limit_per_host': 2.1}, {'timeout': None}
+])
+def test_transport_raises_type_error_for_bad_arguments(kwargs):
+    """Test that AsyncTransport raises a TypeError for bad arguments."""
+    with pytest.raises(TypeError):
+        ascr.AsyncTransport(**kwargs)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'limit': 0}, {'limit_per_host': -1}, {'retries': -1}, {'timeout': 0}
+])
+def test_transport_raises_value_error_for_out_of_range_arguments(kwargs):
+    """Test that AsyncTransport raises a ValueError for bad values."""
+    with pytest.raises(ValueError):
+        ascr.AsyncTransport(**kwargs)
+
+
+def test_transport_opens_session_lazily_and_closes_it():
+    """Test that AsyncTransport only opens a session when first needed."""
+    transport = ascr.AsyncTransport(limit=5, limit_per_host=2)
+    assert transport._session is None
+
+    async def use():
+        session = transport._get_session()
+        assert transport._get_session() is session
+        assert session.connector.limit_per_host == 2
+        await transport.close()
+
+    run(use())
+    assert transport._session is None
+
+
+def test_response_text_decodes_content():
+    """Test that AsyncResponse decodes its content as text."""
+    res = ascr.AsyncResponse('http://f.co', 200, {}, 'é'.encode(), 'utf-8')
+    assert res.text == 'é'
+
+
+@pytest.mark.parametrize('value', [500, 'transport', {}])
+def test_scraper_raises_type_error_for_non_transport(value):
+    """Test that AsyncScraper only takes an AsyncTransport."""
+    with pytest.raises(TypeError):
+        ascr.AsyncScraper(value)
+
+
+def test_scraper_raises_value_error_for_window_below_one():
+    """Test that AsyncScraper needs a window of at least 1."""
+    with pytest.raises(ValueError):
+        ascr.AsyncScraper(window=0)
+
+
+def test_chapter_list_fetches_and_caches_index(
+        various_indexes, monkeypatch):
+    """Test that chapter_list fetches an outdated index and parses it."""
+    cache, source = various_indexes
+    index = cache._index_pages[repr(source)]
+    expected = scraper.Scraper.chapter_list(cache, source)
+
+    cache._last_updated[repr(source)] = 0
+    cache._chapter_lists = {}
+    monkeypatch.setattr(ascr.AsyncTransport, 'get', fake_get(index))
+
+    chapters = run(ascr.AsyncScraper().chapter_list(cache, source))
+    assert chapters == expected
+    assert cache.get_chapter_list(source) == expected
+
+
+def test_chapter_list_uses_cache_list_if_available(
+        filled_cache, dummy_source):
+    """Test that chapter_list returns the cached list when available."""
+    chapters = filled_cache._chapter_lists[repr(dummy_source)]
+    result = run(ascr.AsyncScraper().chapter_list(filled_cache, dummy_source))
+    assert result is chapters
+
+
+def test_chapter_pages_raises_key_error_for_missing_chapter(
+        filled_cache, dummy_source):
+    """Test that chapter_pages raises a KeyError for unknown chapters."""
+    pages = ascr.AsyncScraper().chapter_pages('99', filled_cache, dummy_source)
+    with pytest.raises(KeyError):
+        run(collect(pages))
+
+
+def test_chapter_pages_yields_multipage_chapter_in_order(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that chapter_pages walks a multipage chapter in order."""
+    def pages(url):
+        n = int(url.rsplit('/', 1)[1])
+        if n > 5:
+            return ''
+        return f'''<a href="/test_series/1/page/{n + 1}">
+        <img src="http://f.co/{n}.png"></a>'''
+
+    monkeypatch.setattr(ascr.AsyncTransport, 'get',
+                        fake_get(pages, lambda url: url.encode()))
+
+    scraper = ascr.AsyncScraper(window=2)
+    result = run(collect(
+        scraper.chapter_pages('1', filled_cache, dummy_source)))
+    assert result == [(f'http://f.co/{n}.png'.encode(), 'png')
+                      for n in range(1, 6)]
+
+
+def test_chapter_pages_yields_singlepage_chapter_in_order(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that chapter_pages gets every image of a singlepage chapter."""
+    page = ''.join(f'<img src="http://f.co/{n}.png">' for n in range(7))
+    monkeypatch.setattr(ascr.AsyncTransport, 'get',
+                        fake_get(page, lambda url: url.encode()))
+    dummy_source.is_multipage = False
+
+    result = run(collect(ascr.AsyncScraper(window=3).chapter_pages(
+        '1', filled_cache, dummy_source)))
+    assert result == [(f'http://f.co/{n}.png'.encode(), 'png')
+                      for n in range(7)]
+
+
+def test_get_page_raises_value_error_for_invalid_url(
+        dummy_source, offline_async):
+    """Test that _get_page raises a ValueError for an invalid URL."""
+    with pytest.raises(ValueError):
+        run(ascr.AsyncScraper()._get_page('www.test.com', dummy_source))
+
+
+def test_get_page_gets_img_link_extention_and_next_url(
+        dummy_source, offline_async):
+    """Test that _get_page returns the proper values."""
+    img_link, ext, next_page, _ = run(ascr.AsyncScraper()._get_page(
+        'http://www.test.com/001/page/1', dummy_source))
+    assert img_link == 'http://files.co/test.png'
+    assert ext == 'png'
+    assert next_page == 'http://www.test.com/001/page/2'
+
+
+def test_chapter_list_revalidates_index_with_stored_validators(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that chapter_list keeps the chapter list after a 304."""
+    src_name = repr(dummy_source)
+    chapters = filled_cache._chapter_lists[src_name]
+    filled_cache._last_updated[src_name] = 0
+    filled_cache._validators[src_name] = {'etag': '"v1"'}
+    sent = []
+
+    async def get(self, url, **kwargs):
+        sent.append(kwargs['headers'])
+        return ascr.AsyncResponse(url, 304, {}, b'', 'utf-8')
+
+    monkeypatch.setattr(ascr.AsyncTransport, 'get', get)
+
+    result = run(ascr.AsyncScraper().chapter_list(filled_cache, dummy_source))
+    assert result is chapters
+    assert sent == [{'If-None-Match': '"v1"'}]
+    assert filled_cache.needs_update(dummy_source) is False
+
+
+def status_get(statuses, headers=None):
+    """Make an AsyncTransport.get that answers with each status in turn."""
+    statuses = iter(statuses)
+    requested = []
+
+    async def get(self, url, **kwargs):
+        requested.append(url)
+        status = next(statuses)
+        content = b'<html>not found</html>' if status >= 400 else b'image'
+        return ascr.AsyncResponse(url, status, dict(headers or {}),
+                                  content, 'utf-8')
+    return get, requested
+
+
+@pytest.mark.parametrize('status, error', [
+    (404, ValueError), (429, scraper.PageRequestError),
+    (503, scraper.PageRequestError)
+])
+def test_download_image_raises_for_error_status(monkeypatch, status, error):
+    """Test that an error response is never taken as the image."""
+    get, _ = status_get([status])
+    monkeypatch.setattr(ascr.AsyncTransport, 'get', get)
+    monkeypatch.setattr(scraper.Scraper, 'page_retries', 0)
+    with pytest.raises(error):
+        run(ascr.AsyncScraper()._download_image('http://f.co/1.png'))
+
+
+def test_download_image_retries_unavailable_image(monkeypatch):
+    """Test that an image the server could not give is asked for again."""
+    get, requested = status_get([503, 429, 200])
+    monkeypatch.setattr(ascr.AsyncTransport, 'get', get)
+    monkeypatch.setattr(scraper.Scraper, 'retry_backoff', 0)
+    data = run(ascr.AsyncScraper()._download_image('http://f.co/1.png'))
+    assert data == b'image'
+    assert len(requested) == 3
+
+
+def test_request_page_waits_for_retry_after(dummy_source, monkeypatch):
+    """Test that an unavailable page is retried after Retry-After."""
+    get, requested = status_get([503, 200], {'Retry-After': '2'})
+    monkeypatch.setattr(ascr.AsyncTransport, 'get', get)
+    monkeypatch.setattr(scraper.Scraper, 'retry_backoff', 0)
+    slept = []
+
+    async def sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(ascr.asyncio, 'sleep', sleep)
+    run(ascr.AsyncScraper()._request_page('http://t.co/1', dummy_source))
+    assert slept == [2]
+    assert len(requested) == 2
+
+
+def test_chapter_pages_raises_for_unavailable_page(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that a page that stays unavailable does not end the chapter."""
+    get, _ = status_get([503])
+    monkeypatch.setattr(ascr.AsyncTransport, 'get', get)
+    monkeypatch.setattr(scraper.Scraper, 'page_retries', 0)
+    pages = ascr.AsyncScraper().chapter_pages('1', filled_cache, dummy_source)
+    with pytest.raises(scraper.PageRequestError):
+        run(collect(pages))
+
+
+def test_chapter_list_makes_no_blocking_request(various_indexes,
+                                                monkeypatch):
+    """Test that chapter_list only fetches the index on the loop."""
+    from .context import transport
+    cache, source = various_indexes
+    index = cache._index_pages[repr(source)]
+    cache._update_interval = 0
+    cache._chapter_lists = {}
+    blocking = []
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        lambda url, **kwargs: blocking.append(url))
+    monkeypatch.setattr(ascr.AsyncTransport, 'get', fake_get(index))
+
+    chapters = run(ascr.AsyncScraper().chapter_list(cache, source))
+    assert chapters
+    assert blocking == []
+
+
+def test_chapter_list_parses_index_off_the_loop(various_indexes,
+                                                monkeypatch):
+    """Test that the index is parsed on another thread than the loop."""
+    import threading
+    cache, source = various_indexes
+    cache._chapter_lists = {}
+    threads = []
+    parse = scraper.Scraper._parse_chapter_list.__func__
+
+    def parse_chapter_list(cls, index_html, series, source):
+        threads.append(threading.current_thread())
+        return parse(cls, index_html, series, source)
+
+    monkeypatch.setattr(scraper.Scraper, '_parse_chapter_list',
+                        classmethod(parse_chapter_list))
+    run(ascr.AsyncScraper().chapter_list(cache, source))
+    assert threads and threading.main_thread() not in threads
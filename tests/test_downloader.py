@@ -0,0 +1,221 @@
+"""Tests for the downloader module."""
+import threading
+import time
+
+import pytest
+
+from .context import downloader as dl
+
+
+@pytest.mark.parametrize('value', ['5', [], 2.1, None])
+def test_constructor_raises_type_error_for_non_int_limits(value):
+    """Test that constructor raises a TypeError for non-int limits."""
+    with pytest.raises(TypeError):
+        dl.ImageDownloader(max_workers=value)
+    with pytest.raises(TypeError):
+        dl.ImageDownloader(per_host=value)
+
+
+@pytest.mark.parametrize('value', [0, -1])
+def test_constructor_raises_value_error_for_limits_below_one(value):
+    """Test that constructor raises a ValueError for limits less than 1."""
+    with pytest.raises(ValueError):
+        dl.ImageDownloader(max_workers=value)
+    with pytest.raises(ValueError):
+        dl.ImageDownloader(per_host=value)
+
+
+def test_map_yields_data_in_link_order():
+    """Test that map yields fetched data in the order of the links."""
+    def fetch(url):
+        time.sleep(0.01 * (5 - int(url[-1])))
+        return url.encode()
+
+    links = [(f'http://f.co/{n}', 'png') for n in range(5)]
+    with dl.ImageDownloader(max_workers=5) as downloader:
+        pages = list(downloader.map(fetch, links))
+    assert pages == [(f'http://f.co/{n}'.encode(), 'png') for n in range(5)]
+
+
+def test_map_fetches_images_concurrently():
+    """Test that map runs several fetches at the same time."""
+    barrier = threading.Barrier(3, timeout=2)
+
+    def fetch(url):
+        barrier.wait()
+        return b''
+
+    links = [(f'http://f{n}.co/img', 'png') for n in range(3)]
+    with dl.ImageDownloader(max_workers=3) as downloader:
+        assert len(list(downloader.map(fetch, links))) == 3
+
+
+def test_map_limits_fetches_to_a_single_host():
+    """Test that map never runs more fetches per host than per_host."""
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+
+    def fetch(url):
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        time.sleep(0.01)
+        with lock:
+            running['now'] -= 1
+        return b''
+
+    links = [(f'http://f.co/{n}', 'png') for n in range(10)]
+    with dl.ImageDownloader(max_workers=6, per_host=2) as downloader:
+        list(downloader.map(fetch, links))
+    assert running['max'] == 2
+
+
+def test_map_raises_fetch_errors_in_order():
+    """Test that map raises an error from fetch at that page."""
+    def fetch(url):
+        if url.endswith('2'):
+            raise ValueError('bad image')
+        return b''
+
+    links = [(f'http://f.co/{n}', 'png') for n in range(4)]
+    with dl.ImageDownloader() as downloader:
+        pages = downloader.map(fetch, links)
+        next(pages)
+        next(pages)
+        with pytest.raises(ValueError):
+            next(pages)
+
+
+@pytest.mark.parametrize('value', ['5', 2.1, None])
+def test_prefetch_raises_type_error_for_non_int_depth(value):
+    """Test that prefetch raises a TypeError for non-int depth."""
+    with pytest.raises(TypeError):
+        dl.prefetch([], value)
+
+
+def test_prefetch_raises_value_error_for_depth_below_one():
+    """Test that prefetch raises a ValueError for depth less than 1."""
+    with pytest.raises(ValueError):
+        dl.prefetch([], 0)
+
+
+def test_prefetch_yields_all_items_in_order():
+    """Test that prefetch yields the same items as the iterable."""
+    assert list(dl.prefetch(iter(range(50)), 3)) == list(range(50))
+
+
+def test_prefetch_pulls_items_ahead_of_the_caller():
+    """Test that prefetch advances the iterable before it is asked to."""
+    pulled = []
+    third = threading.Event()
+
+    def items():
+        for n in range(3):
+            pulled.append(n)
+            if n == 2:
+                third.set()
+            yield n
+
+    gen = dl.prefetch(items(), 2)
+    assert next(gen) == 0
+    assert third.wait(2)
+    assert pulled == [0, 1, 2]
+
+
+def test_prefetch_raises_iterable_errors_in_place():
+    """Test that prefetch raises an error from the iterable at its place."""
+    def items():
+        yield 1
+        raise KeyError('broken')
+
+    gen = dl.prefetch(items())
+    assert next(gen) == 1
+    with pytest.raises(KeyError):
+        next(gen)
+
+
+def test_prefetch_stops_pulling_once_closed():
+    """Test that prefetch stops advancing the iterable after close."""
+    pulled = []
+
+    def items():
+        for n in range(100):
+            pulled.append(n)
+            yield n
+
+    gen = dl.prefetch(items(), 1)
+    next(gen)
+    gen.close()
+    time.sleep(0.3)
+    assert len(pulled) < 5
+
+
+def test_map_passes_extra_link_items_to_fetch():
+    """Test that map calls fetch with anything after the extension."""
+    links = [(f'http://a.co/{n}', 'png', n, 'x') for n in range(5)]
+    with dl.ImageDownloader(max_workers=2) as pool:
+        pages = list(pool.map(lambda url, n, x: (url, n, x), links))
+    assert pages == [((f'http://a.co/{n}', n, 'x'), 'png') for n in range(5)]
+
+
+def test_map_yields_finished_pages_before_window_fills():
+    """Test that map gives finished pages while links are still slow."""
+    first_taken = threading.Event()
+
+    def links():
+        yield 'http://f.co/0', 'png'
+        time.sleep(0.1)
+        yield 'http://f.co/1', 'png'
+        if not first_taken.wait(2):
+            raise AssertionError('first page was held back')
+        yield 'http://f.co/2', 'png'
+
+    with dl.ImageDownloader(max_workers=8) as downloader:
+        pages = []
+        for data, _ in downloader.map(lambda url: url.encode(), links()):
+            pages.append(data)
+            first_taken.set()
+
+    assert pages == [f'http://f.co/{n}'.encode() for n in range(3)]
+
+
+def test_submit_does_not_park_workers_behind_a_busy_host():
+    """Test that a host at its limit does not hold up other hosts."""
+    release = threading.Event()
+
+    def fetch(url):
+        if 'a.co' in url:
+            release.wait(2)
+        return url
+
+    with dl.ImageDownloader(max_workers=2, per_host=1) as downloader:
+        held = [downloader.submit(fetch, f'http://a.co/{n}')
+                for n in range(2)]
+        other = downloader.submit(fetch, 'http://b.co/0')
+        assert other.result(timeout=0.5) == 'http://b.co/0'
+        assert not held[1].running()
+        release.set()
+        assert [f.result(timeout=2) for f in held] == [
+            'http://a.co/0', 'http://a.co/1']
+
+
+def test_shutdown_waits_for_held_downloads():
+    """Test that shutdown finishes downloads still held for their host."""
+    downloader = dl.ImageDownloader(max_workers=2, per_host=1)
+    futures = [downloader.submit(lambda url: time.sleep(0.01) or url,
+                                 f'http://a.co/{n}') for n in range(4)]
+    downloader.shutdown()
+    assert [f.result(timeout=0) for f in futures] == [
+        f'http://a.co/{n}' for n in range(4)]
+
+
+def test_shutdown_without_wait_cancels_held_downloads():
+    """Test that downloads held for their host are cancelled at once."""
+    release = threading.Event()
+    downloader = dl.ImageDownloader(max_workers=2, per_host=1)
+    first = downloader.submit(lambda url: release.wait(2), 'http://a.co/0')
+    held = downloader.submit(lambda url: url, 'http://a.co/1')
+    downloader.shutdown(wait=False)
+    release.set()
+    assert held.cancelled()
+    assert first.result(timeout=2) is True
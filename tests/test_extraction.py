@@ -0,0 +1,120 @@
+"""Tests for the extraction module."""
+from bs4 import BeautifulSoup, Comment
+import pytest
+
+from .context import extraction as ex
+
+
+PAGE = '''
+<head><script>var ad = 1;</script></head>
+<body>
+<!-- tracking -->
+<div class="ad"><p>Buy now</p></div>
+<table class="table table-striped"><tr><td>
+    <a href="/ch/2">Chapter 2</a>
+</td></tr></table>
+<table class="other"><tr><td>Other</td></tr></table>
+<a href="/page/2"><img src="http://f.co/1.png" class="page"></a>
+<img src="http://f.co/logo.png" class="logo">
+</body>
+'''
+
+
+@pytest.fixture(params=['html.parser', 'lxml'])
+def parser(request):
+    """Run a test with each parser that supports partial parsing."""
+    if request.param == 'lxml':
+        pytest.importorskip('lxml')
+    return request.param
+
+
+def test_index_plan_keeps_only_index_element(dummy_source, parser):
+    """Test that the index plan keeps the index element by one class."""
+    dummy_source.index_attrs = {'class': 'table'}
+    plan = ex.ExtractionPlan(dummy_source)
+    soup = BeautifulSoup(PAGE, parser, parse_only=plan.index)
+
+    assert len(soup.find_all('table')) == 1
+    assert soup.find('table', attrs={'class': 'table'}).a['href'] == '/ch/2'
+    assert not soup.find_all(['script', 'div', 'img'])
+    assert not soup.find_all(string=lambda s: isinstance(s, Comment))
+
+
+def test_index_plan_keeps_index_element_by_full_class(dummy_source, parser):
+    """Test that the index plan matches the whole class attribute too."""
+    dummy_source.index_attrs = {'class': 'table table-striped'}
+    plan = ex.ExtractionPlan(dummy_source)
+    soup = BeautifulSoup(PAGE, parser, parse_only=plan.index)
+    assert soup.find('table', attrs=dummy_source.index_attrs)
+
+
+def test_page_plan_keeps_anchors_and_images_for_multipage(
+        dummy_source, parser):
+    """Test that the multipage plan keeps images and anchors around them."""
+    plan = ex.ExtractionPlan(dummy_source)
+    soup = BeautifulSoup(PAGE, parser, parse_only=plan.page)
+
+    assert soup.find('img').find_parent('a')['href'] == '/page/2'
+    assert len(soup.find_all('img')) == 2
+    assert not soup.find_all(['script', 'table', 'div'])
+
+
+def test_page_plan_keeps_only_page_images_for_singlepage(
+        dummy_source, parser):
+    """Test that the singlepage plan keeps only matching page images."""
+    dummy_source.is_multipage = False
+    dummy_source.pg_img_attrs = {'class': 'page'}
+    plan = ex.ExtractionPlan(dummy_source)
+    soup = BeautifulSoup(PAGE, parser, parse_only=plan.page)
+
+    assert [img['src'] for img in soup.find_all('img')] == [
+        'http://f.co/1.png']
+    assert not soup.find_all('a')
+
+
+def test_source_extraction_plan_is_reused_until_settings_change(
+        dummy_source):
+    """Test that a MangaSource only rebuilds its plan when it changes."""
+    plan = dummy_source.extraction_plan
+    assert dummy_source.extraction_plan is plan
+
+    dummy_source.index_attrs = {'id': 'chapters'}
+    assert dummy_source.extraction_plan is not plan
+
+
+FAST_PAGE = ('<a href="/read/2?a=1&amp;b=2"><img id="page" '
+             'src="//f.co/1.png"></a>')
+
+
+@pytest.mark.parametrize('value', [None, 5, ['a']])
+def test_fast_path_raises_type_error_for_non_string(value):
+    """Test that FastPath raises a TypeError for bad expressions."""
+    with pytest.raises(TypeError):
+        ex.FastPath(value, r'href="(.+?)"')
+
+
+def test_fast_path_raises_value_error_without_group():
+    """Test that FastPath raises a ValueError if nothing is captured."""
+    with pytest.raises(ValueError):
+        ex.FastPath(r'src="[^"]+"', r'href="(.+?)"')
+
+
+def test_fast_path_extract_reads_links_from_text():
+    """Test that extract finds the image and unescaped next page links."""
+    fast = ex.FastPath(r'id="page" src="(?P<url>[^"]+)"',
+                       r'<a href="([^"]+)"><img id="page"')
+    assert fast.extract(FAST_PAGE) == (
+        'http://f.co/1.png', 'png', '/read/2?a=1&b=2')
+
+
+@pytest.mark.parametrize('page', [
+    '<a href="/2"><img id="page" src="/rel/1.png"></a>',
+    '<a href="/2"><img id="page" src="http://f.co/image"></a>',
+    '<a href="/2"><img id="page" src=""></a>',
+    '<img id="page" src="http://f.co/1.png">',
+])
+def test_fast_path_extract_gives_none_for_unusable_links(page):
+    """Test that extract rejects pages it cannot read with confidence."""
+    fast = ex.FastPath(r'id="page" src="([^"]*)"',
+                       r'<a href="([^"]+)"><img id="page"')
+    assert fast.extract(page) is None
@@ -0,0 +1,127 @@
+"""Tests for the hedging module."""
+import threading
+import time
+
+import pytest
+
+from .context import hedging as hd
+
+
+def warmed(latency=0.01, **kwargs):
+    """Create a policy that has timed enough requests to hedge."""
+    kwargs.setdefault('min_samples', 5)
+    policy = hd.HedgePolicy(**kwargs)
+    for _ in range(policy.min_samples):
+        policy.record(latency)
+    policy.requests = 100
+    return policy
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'percentile': '95'}, {'max_extra': None}, {'min_samples': 2.0},
+    {'window': '10'}, {'max_workers': 1.5}
+])
+def test_constructor_raises_type_error(kwargs):
+    """Test that constructor raises a TypeError for bad arguments."""
+    with pytest.raises(TypeError):
+        hd.HedgePolicy(**kwargs)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'percentile': 40}, {'percentile': 101}, {'max_extra': -0.1},
+    {'max_extra': 2}, {'min_samples': 0}, {'window': 0}, {'max_workers': 0}
+])
+def test_constructor_raises_value_error(kwargs):
+    """Test that constructor raises a ValueError for bad limits."""
+    with pytest.raises(ValueError):
+        hd.HedgePolicy(**kwargs)
+
+
+def test_threshold_is_none_before_enough_samples():
+    """Test that threshold waits for min_samples request times."""
+    policy = hd.HedgePolicy(min_samples=3)
+    policy.record(1.0)
+    policy.record(2.0)
+    assert policy.threshold() is None
+
+
+def test_threshold_gives_percentile_of_recent_times():
+    """Test that threshold is the percentile of the request times."""
+    policy = hd.HedgePolicy(percentile=90, min_samples=1)
+    for n in range(1, 101):
+        policy.record(n / 100)
+    assert policy.threshold() == 0.9
+
+
+def test_threshold_only_keeps_window_of_times():
+    """Test that old request times fall out of the window."""
+    policy = hd.HedgePolicy(percentile=100, min_samples=1, window=3)
+    for latency in (5.0, 0.1, 0.2, 0.3):
+        policy.record(latency)
+    assert policy.threshold() == 0.3
+
+
+def test_call_does_not_hedge_fast_request():
+    """Test that a request faster than the threshold is sent once."""
+    calls = []
+    with warmed(latency=1.0) as policy:
+        assert policy.call(lambda: calls.append(1) or 'data') == 'data'
+    assert calls == [1] and policy.hedged == 0
+
+
+def test_call_hedges_slow_request():
+    """Test that a slow request is raced and the first answer wins."""
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return 'slow'
+        return 'fast'
+
+    with warmed() as policy:
+        start = time.monotonic()
+        assert policy.call(fetch) == 'fast'
+        assert time.monotonic() - start < 1
+        release.set()
+    assert policy.hedged == 1
+
+
+def test_call_caps_extra_requests():
+    """Test that no more than max_extra of requests are hedged."""
+    def fetch():
+        time.sleep(0.05)
+        return 'data'
+
+    with warmed(max_extra=0.02, percentile=50, min_samples=20) as policy:
+        for _ in range(5):
+            policy.call(fetch)
+    assert policy.hedged == 2
+
+
+def test_call_uses_other_request_when_one_fails():
+    """Test that a failed request does not win the race."""
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            return 'first'
+        raise ConnectionError('hedge failed')
+
+    with warmed() as policy:
+        assert policy.call(fetch) == 'first'
+
+
+def test_call_raises_when_every_request_fails():
+    """Test that the error is raised once every request has failed."""
+    def fetch():
+        time.sleep(0.05)
+        raise ConnectionError('failed')
+
+    with warmed() as policy:
+        with pytest.raises(ConnectionError):
+            policy.call(fetch)
@@ -0,0 +1,297 @@
+"""Tests for the library module."""
+import json
+import os
+
+import pytest
+import requests
+
+from .context import library as lib
+from .context import scraper
+
+
+PAGE_TEXT = ''.join(f'<img src="http://f.co/{n}.png">' for n in range(4))
+
+
+@pytest.fixture
+def fake_images(dummy_source, monkeypatch):
+    """Serve a singlepage chapter of four images and record requests."""
+    from .context import transport
+    dummy_source.is_multipage = False
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+
+        class Response(object):
+            status_code = 200
+            text = PAGE_TEXT
+
+            def iter_content(self, chunk_size):
+                return iter([url.encode()])
+
+            def close(self):
+                pass
+
+        return Response()
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    return requested
+
+
+@pytest.fixture
+def library(tmpdir):
+    """Create a library in a temporary directory."""
+    return lib.Library(str(tmpdir.join('library')))
+
+
+@pytest.mark.parametrize('value', [None, 5, ['path']])
+def test_constructor_raises_type_error_for_non_string_path(value):
+    """Test that constructor raises a TypeError for non-string paths."""
+    with pytest.raises(TypeError):
+        lib.Library(value)
+
+
+def test_constructor_raises_value_error_for_empty_path():
+    """Test that constructor raises a ValueError for an empty path."""
+    with pytest.raises(ValueError):
+        lib.Library('')
+
+
+@pytest.mark.parametrize('value', ['pool', 5])
+def test_constructor_raises_type_error_for_bad_downloader(value, tmpdir):
+    """Test that constructor raises a TypeError for a non-ImageDownloader."""
+    with pytest.raises(TypeError):
+        lib.Library(str(tmpdir), value)
+
+
+def test_chapter_path_quotes_series_and_chapter(library, filled_cache):
+    """Test that chapter_path makes names safe for the file system."""
+    filled_cache.title = 'a/b'
+    assert library.chapter_path(filled_cache, '1/2') == os.path.join(
+        library.path, 'a%2Fb', '1%2F2')
+
+
+def test_manifest_is_none_for_unstarted_chapter(library, filled_cache):
+    """Test that manifest gives None for a chapter not yet saved."""
+    assert library.manifest(filled_cache, '1') is None
+    assert library.is_complete(filled_cache, '1') is False
+
+
+def test_save_chapter_writes_pages_and_manifest(
+        library, filled_cache, dummy_source, fake_images):
+    """Test that save_chapter lays out each page and a manifest."""
+    manifest = library.save_chapter(filled_cache, dummy_source, '1')
+    folder = library.chapter_path(filled_cache, '1')
+
+    assert manifest['complete'] is True
+    assert sorted(manifest['pages']) == ['1', '2', '3', '4']
+    for n in range(4):
+        path = os.path.join(folder, f'{n + 1:03}.png')
+        assert open(path, 'rb').read() == f'http://f.co/{n}.png'.encode()
+
+    with open(os.path.join(folder, 'manifest.json')) as f:
+        assert json.load(f) == manifest
+    assert library.is_complete(filled_cache, '1')
+
+
+def test_save_chapter_skips_complete_chapter(
+        library, filled_cache, dummy_source, fake_images):
+    """Test that save_chapter makes no requests for a complete chapter."""
+    library.save_chapter(filled_cache, dummy_source, '1')
+    del fake_images[:]
+
+    library.save_chapter(filled_cache, dummy_source, '1')
+    assert fake_images == []
+
+
+def test_save_chapter_resumes_at_missing_pages(
+        library, filled_cache, dummy_source, fake_images):
+    """Test that save_chapter only downloads pages that are not saved."""
+    library.save_chapter(filled_cache, dummy_source, '1')
+    folder = library.chapter_path(filled_cache, '1')
+    manifest = library.manifest(filled_cache, '1')
+    manifest['complete'] = False
+    library._write_manifest(folder, manifest)
+    os.remove(os.path.join(folder, '003.png'))
+    open(os.path.join(folder, 'left.part'), 'w').close()
+    del fake_images[:]
+
+    library.save_chapter(filled_cache, dummy_source, '1')
+
+    assert [url for url in fake_images if 'f.co' in url] == [
+        'http://f.co/2.png']
+    assert os.path.exists(os.path.join(folder, '003.png'))
+    assert not os.path.exists(os.path.join(folder, 'left.part'))
+    assert library.is_complete(filled_cache, '1')
+
+
+def test_save_chapter_leaves_chapter_incomplete_on_error(
+        library, filled_cache, dummy_source, fake_images, monkeypatch):
+    """Test that an interrupted chapter keeps the pages saved so far."""
+    from .context import scraper
+
+    def stream_image(img_link, source, target):
+        if img_link.endswith('2.png'):
+            raise IOError('Connection dropped.')
+        return original(img_link, source, target)
+
+    original = scraper.Scraper._stream_image
+    monkeypatch.setattr(scraper.Scraper, '_stream_image', stream_image)
+
+    with pytest.raises(IOError):
+        library.save_chapter(filled_cache, dummy_source, '1')
+
+    manifest = library.manifest(filled_cache, '1')
+    assert manifest['complete'] is False
+    assert sorted(manifest['pages']) == ['1', '2']
+
+
+def test_sync_saves_only_incomplete_chapters(
+        library, filled_cache, dummy_source, fake_images):
+    """Test that sync skips chapters already complete on disk."""
+    assert list(library.sync(filled_cache, dummy_source)) == ['1']
+    assert library.sync(filled_cache, dummy_source) == {}
+
+
+def test_constructor_raises_type_error_for_bad_store(tmpdir):
+    """Test that constructor raises a TypeError for a non-PageStore."""
+    with pytest.raises(TypeError):
+        lib.Library(str(tmpdir), store=str(tmpdir))
+
+
+def test_save_chapter_with_store_keeps_shared_pages_once(
+        tmpdir, filled_cache, dummy_source, fake_images):
+    """Test that chapters in a store refer to the same page by hash."""
+    from .context import pagestore
+    store = pagestore.PageStore(str(tmpdir.join('pages')))
+    library = lib.Library(str(tmpdir.join('library')), store=store)
+    filled_cache._chapter_lists[repr(dummy_source)]['2'] = 'http://t.co/2'
+
+    first = library.save_chapter(filled_cache, dummy_source, '1')
+    del fake_images[:]
+    second = library.save_chapter(filled_cache, dummy_source, '2')
+
+    assert first['pages'] == second['pages']
+    assert 'file' not in first['pages']['1']
+    assert [url for url in fake_images if 'f.co' in url] == []
+    assert library.page_paths(filled_cache, '2') == [
+        store.blob_path(first['pages'][str(n)]['hash']) for n in range(1, 5)]
+    assert os.listdir(library.chapter_path(filled_cache, '2')) == [
+        'manifest.json']
+
+
+def test_page_paths_lists_chapter_files_in_order(
+        library, filled_cache, dummy_source, fake_images):
+    """Test that page_paths gives the saved page files in page order."""
+    assert library.page_paths(filled_cache, '1') == []
+    library.save_chapter(filled_cache, dummy_source, '1')
+    folder = library.chapter_path(filled_cache, '1')
+    assert library.page_paths(filled_cache, '1') == [
+        os.path.join(folder, f'{n:03}.png') for n in range(1, 5)]
+
+
+def test_save_chapter_resumes_multipage_chapter_from_checkpoint(
+        library, filled_cache, dummy_source, monkeypatch):
+    """Test that an interrupted multipage chapter is not crawled again."""
+    from .context import transport
+    failures = {3: 10}
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        n = int(url.rsplit('/', 1)[1].split('.')[0])
+        if url.startswith('http://t.co') and failures.get(n):
+            failures[n] -= 1
+            raise requests.exceptions.ConnectionError
+
+        class Response(object):
+            status_code = 200
+            text = f'''<a href="http://t.co/1/{n + 1}">
+            <img src="http://f.co/{n}.png"></a>''' if n < 4 else ''
+
+            def iter_content(self, chunk_size):
+                return iter([url.encode()])
+
+            def close(self):
+                pass
+        return Response()
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    monkeypatch.setattr(scraper.Scraper, 'retry_backoff', 0)
+    filled_cache._chapter_lists[repr(dummy_source)]['1'] = 'http://t.co/1/1'
+
+    with pytest.raises(scraper.PageRequestError):
+        library.save_chapter(filled_cache, dummy_source, '1')
+    assert sorted(library.manifest(filled_cache, '1')['pages']) == ['1', '2']
+
+    failures.clear()
+    del requested[:]
+    manifest = library.save_chapter(filled_cache, dummy_source, '1')
+
+    assert manifest['complete'] is True
+    assert sorted(manifest['pages']) == ['1', '2', '3']
+    assert requested[0] == 'http://t.co/1/3'
+
+
+def test_save_chapter_ignores_checkpoint_past_manifest(
+        library, filled_cache, dummy_source, monkeypatch):
+    """Test that a checkpoint ahead of the saved pages is not used."""
+    from .context import transport
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        n = int(url.rsplit('/', 1)[1].split('.')[0])
+
+        class Response(object):
+            status_code = 200
+            text = f'''<a href="http://t.co/1/{n + 1}">
+            <img src="http://f.co/{n}.png"></a>''' if n < 4 else ''
+
+            def iter_content(self, chunk_size):
+                return iter([url.encode()])
+
+            def close(self):
+                pass
+        return Response()
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    filled_cache._chapter_lists[repr(dummy_source)]['1'] = 'http://t.co/1/1'
+    filled_cache.set_checkpoint(dummy_source, '1', 'http://t.co/1/3', 3)
+
+    manifest = library.save_chapter(filled_cache, dummy_source, '1')
+
+    assert sorted(manifest['pages']) == ['1', '2', '3']
+    assert requested[0] == 'http://t.co/1/1'
+    assert filled_cache.get_checkpoint(dummy_source, '1') is None
+
+
+def test_save_chapter_does_not_record_failed_image(
+        library, filled_cache, dummy_source, monkeypatch):
+    """Test that an error response is not saved as a page."""
+    from .context import transport
+    dummy_source.is_multipage = False
+
+    def get(url, **kwargs):
+        failed = url.endswith('/2.png')
+
+        class Response(object):
+            status_code = 404 if failed else 200
+            text = PAGE_TEXT
+
+            def iter_content(self, chunk_size):
+                return iter([b'<html>Not Found</html>' if failed
+                             else url.encode()])
+
+            def close(self):
+                pass
+
+        return Response()
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    with pytest.raises(ValueError):
+        library.save_chapter(filled_cache, dummy_source, '1')
+
+    manifest = library.manifest(filled_cache, '1')
+    assert sorted(manifest['pages']) == ['1', '2']
+    assert manifest['complete'] is False
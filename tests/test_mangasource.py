@@ -1,4 +1,5 @@
 """Tests for the manga_source module."""
+from .conftest import requests_patch
 from .context import mangasource as ms
 
 import pytest
@@ -152,14 +153,223 @@ def test_index_url_joins_root_url_to_slug_of_title(dummy_source):
 def test_ping_gives_false_for_offline_site(dummy_source, fail_response,
                                            monkeypatch):
     """Test that ping returns False for a site that is off-line."""
-    import requests
-    monkeypatch.setattr(requests, 'head', fail_response)
+    from .context import transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', fail_response)
     assert dummy_source.ping() is False
 
 
 def test_ping_gives_true_for_online_site(dummy_source, conn_response,
                                          monkeypatch):
     """Test that ping returns True for a site that is on-line."""
-    import requests
-    monkeypatch.setattr(requests, 'head', conn_response)
+    from .context import transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', conn_response)
     assert dummy_source.ping() is True
+
+
+@pytest.mark.parametrize('value', [500, [], {}])
+def test_constructor_raises_type_error_for_non_string_parser(value):
+    """Test that constructor raises a TypeError for non-string parser."""
+    with pytest.raises(TypeError):
+        ms.MangaSource('test', 'http://www.source.com/', '-', parser=value)
+
+
+def test_constructor_raises_value_error_for_missing_parser():
+    """Test that constructor raises a ValueError for unknown parsers."""
+    with pytest.raises(ValueError):
+        ms.MangaSource('test', 'http://www.source.com/', '-',
+                       parser='not-a-parser')
+
+
+def test_constructor_sets_parser():
+    """Test that constructor keeps the chosen parser."""
+    source = ms.MangaSource('test', 'http://www.source.com/', '-',
+                            parser='html.parser')
+    assert source.parser == 'html.parser'
+
+
+@pytest.mark.parametrize('value', [500, 'fast', [], {}])
+def test_constructor_raises_type_error_for_bad_fast_path(value):
+    """Test that constructor raises a TypeError for a non-FastPath."""
+    with pytest.raises(TypeError):
+        ms.MangaSource('test', 'http://www.source.com/', '-',
+                       fast_path=value)
+
+
+def test_constructor_does_not_ping(monkeypatch):
+    """Test that constructor makes no requests to the source."""
+    from .context import transport
+
+    def head(url, **options):
+        raise AssertionError('pinged')
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    source = ms.MangaSource('test', 'http://www.source.com/', '-')
+    assert source.health() is None
+
+
+def test_is_online_pings_once_within_ttl(dummy_source, monkeypatch):
+    """Test that is_online keeps the result of a ping for the ttl."""
+    from .context import transport
+    calls = []
+
+    def head(url, **options):
+        calls.append(url)
+        return requests_patch(status_code=200)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    assert dummy_source.is_online() is True
+    assert dummy_source._verified is True
+    assert len(calls) == 1
+
+
+def test_is_online_pings_again_after_ttl(dummy_source, monkeypatch):
+    """Test that is_online pings again once the result is stale."""
+    from .context import transport
+    calls = []
+
+    def head(url, **options):
+        calls.append(url)
+        return requests_patch(status_code=200)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    dummy_source.is_online()
+    dummy_source.is_online(max_age=0)
+    assert len(calls) == 2
+
+
+def test_ping_records_health(dummy_source, fail_response, monkeypatch):
+    """Test that ping keeps its result as the health of the source."""
+    from .context import transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', fail_response)
+    dummy_source.ping()
+    assert dummy_source.health() is False
+
+
+def test_ping_passes_timeout_to_transport(dummy_source, monkeypatch):
+    """Test that ping waits on the source for the given timeout."""
+    from .context import transport
+    options = {}
+
+    def head(url, **kwargs):
+        options.update(kwargs)
+        return requests_patch(status_code=200)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    dummy_source.ping(timeout=2)
+    assert options['timeout'] == 2
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'sources': [1]}, {'timeout': '5'}, {'max_workers': 2.5},
+    {'max_age': '1'}
+])
+def test_ping_sources_raises_type_error(dummy_source, kwargs):
+    """Test that ping_sources raises a TypeError for bad arguments."""
+    kwargs.setdefault('sources', [dummy_source])
+    with pytest.raises(TypeError):
+        ms.ping_sources(**kwargs)
+
+
+@pytest.mark.parametrize('kwargs', [{'timeout': 0}, {'max_workers': 0}])
+def test_ping_sources_raises_value_error(dummy_source, kwargs):
+    """Test that ping_sources raises a ValueError for bad limits."""
+    with pytest.raises(ValueError):
+        ms.ping_sources([dummy_source], **kwargs)
+
+
+def test_ping_sources_pings_concurrently(monkeypatch):
+    """Test that ping_sources pings sources at the same time."""
+    import threading
+    from .context import transport
+    barrier = threading.Barrier(4, timeout=5)
+
+    def head(url, **options):
+        barrier.wait()
+        return requests_patch(status_code=200)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    sources = [ms.MangaSource(f'test {i}', f'http://www.source{i}.com/', '-')
+               for i in range(4)]
+    assert ms.ping_sources(sources, max_workers=4) == dict.fromkeys(
+        sources, True)
+
+
+def test_ping_sources_gives_false_for_offline_sources(monkeypatch):
+    """Test that ping_sources marks failing sources as offline."""
+    from .context import transport
+
+    def head(url, **options):
+        status = 404 if 'down' in url else 200
+        return requests_patch(status_code=status)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    up = ms.MangaSource('up', 'http://www.up.com/', '-')
+    down = ms.MangaSource('down', 'http://www.down.com/', '-')
+    assert ms.ping_sources([up, down]) == {up: True, down: False}
+
+
+def test_ping_sources_skips_recent_results(dummy_source, monkeypatch):
+    """Test that ping_sources uses the health of recently pinged sources."""
+    from .context import transport
+    dummy_source.ping()
+
+    def head(url, **options):
+        raise AssertionError('pinged')
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    assert ms.ping_sources([dummy_source]) == {dummy_source: True}
+
+
+def test_ping_sources_does_not_wait_on_hung_source(monkeypatch):
+    """Test that ping_sources gives up on a source that never answers."""
+    import threading
+    import time
+    from .context import transport
+    release = threading.Event()
+
+    def head(url, **options):
+        release.wait(5)
+        return requests_patch(status_code=200)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    source = ms.MangaSource('hung', 'http://www.hung.com/', '-')
+    start = time.monotonic()
+    try:
+        assert ms.ping_sources([source], timeout=0.1) == {source: False}
+        assert time.monotonic() - start < 2
+    finally:
+        release.set()
+
+
+def test_ping_sources_pings_without_retries(dummy_source, monkeypatch):
+    """Test that ping_sources sends each ping only once."""
+    from .context import transport
+    options = {}
+
+    def head(url, **kwargs):
+        options.update(kwargs)
+        return requests_patch(status_code=200)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    ms.ping_sources([dummy_source], timeout=3)
+    assert options == {'retry': False, 'timeout': 3}
+
+
+def test_ping_sources_gives_none_for_sources_never_pinged(monkeypatch):
+    """Test that a source queued behind a hung one is not called offline."""
+    import threading
+    from .context import transport
+    release = threading.Event()
+
+    def head(url, **options):
+        release.wait(5)
+        return requests_patch(status_code=200)(url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', head)
+    hung = ms.MangaSource('hung', 'http://www.hung.com/', '-')
+    queued = ms.MangaSource('queued', 'http://www.queued.com/', '-')
+    try:
+        assert ms.ping_sources([hung, queued], timeout=0.05,
+                               max_workers=1) == {hung: False, queued: None}
+    finally:
+        release.set()
@@ -0,0 +1,436 @@
+"""Tests for the mirrors module."""
+import time
+
+from .context import mangasource
+from .context import mirrors
+from .context import scraper as scr
+from .context import sinks
+
+import pytest
+import requests
+
+
+def make_source(name):
+    """Create a source with its own host."""
+    return mangasource.MangaSource(name, f'http://www.{name}.com/', '-')
+
+
+def mirrored(series, *sources, chapters=('1',)):
+    """Give each source a chapter list with the chapters in the series."""
+    for source in sources:
+        series.set_index(source, f'<p>{source.name}</p>')
+        series.set_chapter_list(source, {
+            chapter: f'{source.root_url}series/{chapter}/page/1'
+            for chapter in chapters
+        })
+    return mirrors.MirrorSet(series, sources)
+
+
+def fake_pages(plans, calls=None):
+    """Patch for stream_chapter_pages that follows a plan for each source.
+
+    Each plan is a list with the data for each page, an exception to
+    raise for that page, or a tuple of the data and seconds to wait.
+    """
+    def stream(chapter, series, source, sink, downloader=None,
+               resume=False):
+        for number, step in enumerate(plans[source.name], 1):
+            if calls is not None:
+                calls.append((source.name, number))
+            if isinstance(step, Exception):
+                raise step
+            if isinstance(step, tuple):
+                step, delay = step
+                time.sleep(delay)
+
+            url = f'{source.root_url}{number}.png'
+            target = sink(number, 'png')
+            if target is None:
+                yield sinks.PageRecord(number, url, 'png', None, None)
+                continue
+
+            size, name = sinks.write_chunks([step], target)
+            yield sinks.PageRecord(number, url, 'png', size, name)
+
+    return stream
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'series': 'series'}, {'sources': [1]}, {'max_error_rate': '1'},
+    {'failover_factor': None}
+])
+def test_constructor_raises_type_error(empty_cache, dummy_source, kwargs):
+    """Test that constructor raises a TypeError for bad arguments."""
+    kwargs.setdefault('series', empty_cache)
+    kwargs.setdefault('sources', [dummy_source])
+    with pytest.raises(TypeError):
+        mirrors.MirrorSet(**kwargs)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'sources': []}, {'max_error_rate': 1.5}, {'failover_factor': 1}
+])
+def test_constructor_raises_value_error(empty_cache, dummy_source, kwargs):
+    """Test that constructor raises a ValueError for bad limits."""
+    kwargs.setdefault('sources', [dummy_source])
+    with pytest.raises(ValueError):
+        mirrors.MirrorSet(empty_cache, **kwargs)
+
+
+def test_record_tracks_latency_throughput_and_errors(empty_cache):
+    """Test that record keeps averages for each source."""
+    source = make_source('one')
+    mirror_set = mirrors.MirrorSet(empty_cache, [source])
+    mirror_set.record(source, 0.5, 1000)
+    mirror_set.record(source, 1.0, error=True)
+
+    stats = mirror_set.stats(source)
+    assert stats.latency == 0.5
+    assert stats.throughput == 2000
+    assert stats.pages == 1 and stats.errors == 1
+    assert 0 < stats.error_rate < 1
+
+
+def test_is_healthy_is_false_for_failing_source(empty_cache):
+    """Test that a source failing most requests is not healthy."""
+    source = make_source('one')
+    mirror_set = mirrors.MirrorSet(empty_cache, [source],
+                                   max_error_rate=0.3)
+    assert mirror_set.is_healthy(source)
+    for _ in range(3):
+        mirror_set.record(source, 1.0, error=True)
+    assert not mirror_set.is_healthy(source)
+
+
+def test_is_healthy_is_false_for_source_that_failed_ping(empty_cache,
+                                                          fail_response,
+                                                          monkeypatch):
+    """Test that a source that was last offline is not healthy."""
+    from .context import transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'head', fail_response)
+    source = make_source('one')
+    source.ping()
+    assert not mirrors.MirrorSet(empty_cache, [source]).is_healthy(source)
+
+
+def test_sources_for_ranks_fastest_healthy_source_first(empty_cache):
+    """Test that sources_for puts faster and healthy sources first."""
+    slow, fast, broken = (make_source(name) for name in
+                          ('slow', 'fast', 'broken'))
+    mirror_set = mirrored(empty_cache, slow, fast, broken)
+    mirror_set.record(slow, 2.0)
+    mirror_set.record(fast, 0.5)
+    mirror_set.record(broken, 0.1)
+    for _ in range(5):
+        mirror_set.record(broken, 1.0, error=True)
+
+    assert mirror_set.sources_for('1') == [fast, slow, broken]
+
+
+def test_sources_for_ranks_failed_unmeasured_source_last(empty_cache):
+    """Test that a source with only failures is not taken as fastest."""
+    failing, working, untried = (make_source(name) for name in
+                                 ('failing', 'working', 'untried'))
+    mirror_set = mirrored(empty_cache, failing, working, untried)
+    for _ in range(3):
+        mirror_set.record(failing, 1.0, error=True)
+    mirror_set.record(working, 0.2)
+
+    assert mirror_set.is_healthy(failing)
+    assert mirror_set.sources_for('1') == [untried, working, failing]
+
+
+def test_sources_for_leaves_out_sources_without_chapter(empty_cache):
+    """Test that sources_for only gives sources with the chapter."""
+    one, two = make_source('one'), make_source('two')
+    mirror_set = mirrored(empty_cache, one)
+    mirrored(empty_cache, two, chapters=('2',))
+    mirror_set.sources.append(two)
+    mirror_set._stats[two] = mirrors.SourceStats()
+    assert mirror_set.sources_for('1') == [one]
+
+
+def test_sources_for_ranks_equal_latency_by_throughput(empty_cache):
+    """Test that sources_for breaks latency ties with throughput."""
+    small, large = make_source('small'), make_source('large')
+    mirror_set = mirrored(empty_cache, small, large)
+    mirror_set.record(small, 0.5, 1000)
+    mirror_set.record(large, 0.5, 4000)
+    assert mirror_set.sources_for('1') == [large, small]
+
+
+def test_sources_for_does_not_request_unreadable_source_again(monkeypatch):
+    """Test that a source whose index failed is not requested each call."""
+    from .context import seriescache
+    from .context import transport
+    up, down = make_source('up'), make_source('down')
+    series = seriescache.SeriesCache('test series')
+    active = []
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', index_get({
+        'up': ['1'], 'down': requests.exceptions.ConnectionError()},
+        active=active))
+
+    mirror_set = mirrors.MirrorSet(series, [up, down])
+    for _ in range(3):
+        assert mirror_set.sources_for('1') == [up]
+    assert active.count('down') == 1
+    assert mirror_set.stats(down).errors == 1
+
+
+def test_sources_for_does_not_parse_index_without_chapters_again(
+        empty_cache, monkeypatch):
+    """Test that an index missing its chapter table is parsed only once."""
+    one, bad = make_source('one'), make_source('bad')
+    mirror_set = mirrored(empty_cache, one)
+    empty_cache.set_index(bad, '<p>nothing here</p>')
+    mirror_set.sources.append(bad)
+    mirror_set._stats[bad] = mirrors.SourceStats()
+
+    parsed = []
+    parse = scr.Scraper._parse_chapter_list.__func__
+
+    def counted(cls, index_html, series, source):
+        parsed.append(source.name)
+        return parse(cls, index_html, series, source)
+
+    monkeypatch.setattr(scr.Scraper, '_parse_chapter_list',
+                        classmethod(counted))
+    for _ in range(3):
+        assert mirror_set.sources_for('1') == [one]
+    assert parsed == ['bad']
+
+
+def test_chapter_pages_gets_chapter_lists_once(empty_cache, monkeypatch):
+    """Test that chapter_pages does not read chapter lists for each page."""
+    one, two = make_source('one'), make_source('two')
+    mirror_set = mirrored(empty_cache, one, two)
+    monkeypatch.setattr(scr.Scraper, 'stream_chapter_pages', fake_pages({
+        'one': [b'a', b'b', b'c'], 'two': [b'x', b'y', b'z']}))
+
+    lists = []
+    chapter_list = mirror_set._chapter_list
+
+    def counted(source, update=False):
+        lists.append(source.name)
+        return chapter_list(source, update)
+
+    monkeypatch.setattr(mirror_set, '_chapter_list', counted)
+    assert len(list(mirror_set.chapter_pages('1'))) == 3
+    assert sorted(lists) == ['one', 'two']
+
+
+def test_chapter_pages_raises_key_error_for_missing_chapter(empty_cache):
+    """Test that chapter_pages raises a KeyError if no source has it."""
+    mirror_set = mirrored(empty_cache, make_source('one'))
+    with pytest.raises(KeyError):
+        next(mirror_set.chapter_pages('2'))
+
+
+def test_chapter_pages_yields_pages_from_best_source(empty_cache,
+                                                     monkeypatch):
+    """Test that chapter_pages takes the chapter from the best source."""
+    slow, fast = make_source('slow'), make_source('fast')
+    mirror_set = mirrored(empty_cache, slow, fast)
+    mirror_set.record(slow, 2.0)
+    mirror_set.record(fast, 0.5)
+    monkeypatch.setattr(scr.Scraper, 'stream_chapter_pages', fake_pages({
+        'slow': [b'slow'] * 3, 'fast': [b'a', b'b', b'c']}))
+
+    pages = list(mirror_set.chapter_pages('1'))
+    assert pages == [(b'a', 'png'), (b'b', 'png'), (b'c', 'png')]
+    assert mirror_set.stats(fast).pages == 4
+
+
+def test_chapter_pages_fails_over_mid_chapter(empty_cache, monkeypatch):
+    """Test that a failing source is left at the next page."""
+    one, two = make_source('one'), make_source('two')
+    mirror_set = mirrored(empty_cache, one, two)
+    calls = []
+    monkeypatch.setattr(scr.Scraper, 'stream_chapter_pages', fake_pages({
+        'one': [b'a', b'b', requests.exceptions.ConnectionError()],
+        'two': [b'x', b'y', b'c', b'd']}, calls))
+
+    pages = [data for data, _ in mirror_set.chapter_pages('1')]
+    assert pages == [b'a', b'b', b'c', b'd']
+    assert mirror_set.stats(one).errors == 1
+    assert mirror_set.stats(two).pages == 2
+
+
+def test_chapter_pages_leaves_source_that_slows_down(empty_cache,
+                                                     monkeypatch):
+    """Test that a source much slower than another with the chapter is left."""
+    slow, fast = make_source('slow'), make_source('fast')
+    mirror_set = mirrored(empty_cache, slow, fast)
+    mirror_set.record(fast, 0.001)
+    monkeypatch.setattr(scr.Scraper, 'stream_chapter_pages', fake_pages({
+        'slow': [(b'a', 0.05)] * 3, 'fast': [b'x', b'b', b'c']}))
+
+    pages = [data for data, _ in mirror_set.chapter_pages('1')]
+    assert pages == [b'a', b'b', b'c']
+    assert mirror_set.stats(slow).pages == 1
+
+
+def test_chapter_pages_raises_last_error_when_every_source_fails(
+        empty_cache, monkeypatch):
+    """Test that chapter_pages raises once every source has failed."""
+    one, two = make_source('one'), make_source('two')
+    mirror_set = mirrored(empty_cache, one, two)
+    monkeypatch.setattr(scr.Scraper, 'stream_chapter_pages', fake_pages({
+        'one': [scr.PageRequestError('one')],
+        'two': [scr.PageRequestError('two')]}))
+
+    with pytest.raises(scr.PageRequestError):
+        list(mirror_set.chapter_pages('1'))
+
+
+def test_chapter_pages_matches_scraper_for_one_source(filled_cache,
+                                                      dummy_source,
+                                                      monkeypatch):
+    """Test that a single source gives the same pages as the Scraper."""
+    from .context import transport
+    dummy_source.is_multipage = False
+
+    def get(url, **kwargs):
+        class Response(object):
+            status_code = 200
+            text = ''.join(f'<img src="http://f.co/{n}.jpg">'
+                           for n in range(5))
+            content = url.encode()
+
+            def iter_content(self, chunk_size):
+                return iter([self.content])
+
+            def close(self):
+                pass
+
+        return Response()
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    mirror_set = mirrors.MirrorSet(filled_cache, [dummy_source])
+    expected = list(scr.Scraper.chapter_pages('1', filled_cache,
+                                              dummy_source))
+    assert len(expected) == 5
+    assert list(mirror_set.chapter_pages('1')) == expected
+
+
+def index_get(pages, delay=0, active=None):
+    """Patch for index requests that gives a chapter table for each host."""
+    import threading
+    lock = threading.Lock()
+
+    def get(url, **options):
+        host = url.split('//')[1].split('.')[1]
+        if active is not None:
+            with lock:
+                active.append(host)
+        time.sleep(delay)
+        if isinstance(pages[host], Exception):
+            raise pages[host]
+
+        class Response(object):
+            status_code = 200
+            headers = {}
+            text = '<table>{}</table>'.format(''.join(
+                f'<a href="/test-series/{chapter}">Chapter {chapter}</a>'
+                for chapter in pages[host]))
+
+        return Response()
+
+    return get
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'update': 1}, {'max_workers': 2.0}
+])
+def test_refresh_raises_type_error(empty_cache, dummy_source, kwargs):
+    """Test that refresh raises a TypeError for bad arguments."""
+    mirror_set = mirrors.MirrorSet(empty_cache, [dummy_source])
+    with pytest.raises(TypeError):
+        mirror_set.refresh(**kwargs)
+
+
+def test_refresh_raises_value_error_for_no_workers(empty_cache,
+                                                   dummy_source):
+    """Test that refresh raises a ValueError for max_workers below 1."""
+    mirror_set = mirrors.MirrorSet(empty_cache, [dummy_source])
+    with pytest.raises(ValueError):
+        mirror_set.refresh(max_workers=0)
+
+
+def test_refresh_merges_chapters_from_every_source(monkeypatch):
+    """Test that refresh maps each chapter to the sources that have it."""
+    from .context import seriescache
+    from .context import transport
+    one, two, three = (make_source(name) for name in ('one', 'two', 'three'))
+    series = seriescache.SeriesCache('test series')
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', index_get({
+        'one': ['1', '2'], 'two': ['2', '3'], 'three': ['3']}))
+
+    mirror_set = mirrors.MirrorSet(series, [one, two, three])
+    mirror_set.record(three, 0.1)
+    mirror_set.record(two, 0.5)
+    assert mirror_set.refresh() == {
+        '1': [one], '2': [one, two], '3': [three, two]}
+
+
+def test_refresh_requests_sources_at_once(monkeypatch):
+    """Test that refresh requests the index of every source in parallel."""
+    from .context import seriescache
+    from .context import transport
+    names = [f'site{i}' for i in range(6)]
+    series = seriescache.SeriesCache('test series')
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', index_get(
+        dict.fromkeys(names, ['1']), delay=0.1))
+
+    mirror_set = mirrors.MirrorSet(series, map(make_source, names))
+    start = time.monotonic()
+    available = mirror_set.refresh()
+    assert time.monotonic() - start < 0.4
+    assert len(available['1']) == 6
+
+
+def test_refresh_leaves_out_failing_sources(monkeypatch):
+    """Test that a source whose index fails is left out and recorded."""
+    from .context import seriescache
+    from .context import transport
+    up, down = make_source('up'), make_source('down')
+    series = seriescache.SeriesCache('test series')
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', index_get({
+        'up': ['1'], 'down': requests.exceptions.ConnectionError()}))
+
+    mirror_set = mirrors.MirrorSet(series, [up, down])
+    assert mirror_set.refresh() == {'1': [up]}
+    assert mirror_set.stats(down).errors == 1
+
+
+def test_refresh_tries_unreadable_source_again(monkeypatch):
+    """Test that refresh requests a source that failed before."""
+    from .context import seriescache
+    from .context import transport
+    up, down = make_source('up'), make_source('down')
+    series = seriescache.SeriesCache('test series')
+    pages = {'up': ['1'], 'down': requests.exceptions.ConnectionError()}
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', index_get(pages))
+
+    mirror_set = mirrors.MirrorSet(series, [up, down])
+    assert mirror_set.sources_for('1') == [up]
+    pages['down'] = ['1']
+    assert mirror_set.refresh() == {'1': [up, down]}
+    assert mirror_set.sources_for('1') == [up, down]
+
+
+def test_refresh_uses_cached_chapter_lists(monkeypatch):
+    """Test that refresh only requests outdated sources without update."""
+    from .context import seriescache
+    from .context import transport
+    one = make_source('one')
+    series = seriescache.SeriesCache('test series')
+    mirror_set = mirrored(series, one)
+
+    active = []
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', index_get(
+        {'one': ['1', '2']}, active=active))
+    assert mirror_set.refresh() == {'1': [one]}
+    assert active == []
+    assert mirror_set.refresh(update=True) == {'1': [one], '2': [one]}
+    assert active == ['one']
@@ -0,0 +1,100 @@
+"""Tests for the pagestore module."""
+import hashlib
+import os
+
+import pytest
+
+from .context import pagestore as ps
+
+
+@pytest.fixture
+def store(tmpdir):
+    """Create a page store in a temporary directory."""
+    return ps.PageStore(str(tmpdir.join('pages')))
+
+
+@pytest.mark.parametrize('value', [None, 5, ['path']])
+def test_constructor_raises_type_error_for_non_string_path(value):
+    """Test that constructor raises a TypeError for non-string paths."""
+    with pytest.raises(TypeError):
+        ps.PageStore(value)
+
+
+def test_constructor_raises_value_error_for_empty_path():
+    """Test that constructor raises a ValueError for an empty path."""
+    with pytest.raises(ValueError):
+        ps.PageStore('')
+
+
+@pytest.mark.parametrize('value', ['urls', 5, [('a', 'b')]])
+def test_constructor_raises_type_error_for_bad_urls(value, tmpdir):
+    """Test that constructor raises a TypeError for a non-mapping."""
+    with pytest.raises(TypeError):
+        ps.PageStore(str(tmpdir), value)
+
+
+def test_add_names_blob_by_hash_of_data(store):
+    """Test that add writes the data under its SHA-256 hash."""
+    digest = store.add([b'page ', b'one'])
+    assert digest == hashlib.sha256(b'page one').hexdigest()
+    assert store.blob_path(digest) == os.path.join(
+        store.path, digest[:2], digest)
+    assert store.read(digest) == b'page one'
+    assert store.size(digest) == 8
+
+
+def test_add_keeps_same_data_once(store):
+    """Test that adding the same data twice keeps a single blob."""
+    first = store.add([b'credits'])
+    second = store.add([b'cred', b'its'])
+    assert first == second
+    assert os.listdir(os.path.join(store.path, first[:2])) == [first]
+    assert not [name for name in os.listdir(store.path)
+                if name.endswith('.part')]
+
+
+def test_add_leaves_nothing_behind_on_error(store):
+    """Test that a failed add does not leave a partial blob."""
+    def chunks():
+        yield b'half'
+        raise IOError('Connection dropped.')
+
+    with pytest.raises(IOError):
+        store.add(chunks())
+    assert os.listdir(store.path) == ['urls.db']
+
+
+def test_read_raises_key_error_for_unknown_hash(store):
+    """Test that read raises a KeyError for a hash it does not have."""
+    with pytest.raises(KeyError):
+        store.read('ab' * 32)
+
+
+def test_save_only_reads_chunks_for_new_urls(store):
+    """Test that save skips the data for an image URL it has saved."""
+    pulled = []
+
+    def chunks(data):
+        pulled.append(data)
+        yield data
+
+    first = store.save('http://f.co/1.png', chunks(b'one'))
+    again = store.save('http://f.co/1.png', chunks(b'other'))
+
+    assert first == again
+    assert pulled == [b'one']
+    assert store.lookup('http://f.co/1.png') == first
+
+
+def test_lookup_gives_none_for_missing_blob(store):
+    """Test that lookup ignores URLs whose blob has been removed."""
+    digest = store.save('http://f.co/1.png', [b'one'])
+    os.remove(store.blob_path(digest))
+    assert store.lookup('http://f.co/1.png') is None
+    assert store.lookup('http://f.co/2.png') is None
+
+
+def test_urls_are_remembered_between_runs(store):
+    """Test that a new store on the same path knows saved URLs."""
+    digest = store.save('http://f.co/1.png', [b'one'])
+    assert ps.PageStore(store.path).lookup('http://f.co/1.png') == digest
@@ -0,0 +1,96 @@
+"""Tests for the pdfexport module."""
+import io
+import os
+
+from PIL import Image
+import PyPDF2
+import pytest
+
+from .context import pdfexport as pdf
+
+
+def make_image(fmt, mode='RGB', size=(30, 40), color='red'):
+    """Make the data for a small image in the given format."""
+    out = io.BytesIO()
+    Image.new(mode, size, color).save(out, fmt)
+    return out.getvalue()
+
+
+def read_pdf(path):
+    """Read the PDF at the given path."""
+    return PyPDF2.PdfReader(path)
+
+
+@pytest.mark.parametrize('value', [None, 5, ['path']])
+def test_writer_raises_type_error_for_non_string_path(value):
+    """Test that PDFWriter raises a TypeError for non-string paths."""
+    with pytest.raises(TypeError):
+        pdf.PDFWriter(value)
+
+
+def test_writer_raises_value_error_for_bad_jpeg_mode(tmpdir):
+    """Test that add_jpeg raises a ValueError for a mode it cannot embed."""
+    with pytest.raises(ValueError):
+        with pdf.PDFWriter(str(tmpdir.join('ch.pdf'))) as writer:
+            writer.add_jpeg(b'', (1, 1), 'CMYK')
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_write_pdf_makes_a_page_for_each_image(tmpdir):
+    """Test that write_pdf writes a readable PDF with every page."""
+    path = str(tmpdir.join('ch.pdf'))
+    pages = [(make_image('JPEG', size=(30 + n, 40)), 'jpg')
+             for n in range(5)]
+
+    assert pdf.write_pdf(iter(pages), path, max_workers=1) == 5
+
+    reader = read_pdf(path)
+    assert len(reader.pages) == 5
+    assert [float(page.mediabox.width) for page in reader.pages] == [
+        30, 31, 32, 33, 34]
+
+
+def test_write_pdf_embeds_jpegs_without_re_encoding(tmpdir):
+    """Test that JPEG data is copied into the PDF as it is."""
+    path = str(tmpdir.join('ch.pdf'))
+    jpeg = make_image('JPEG', mode='L')
+
+    pdf.write_pdf([(jpeg, 'jpg')], path, max_workers=1)
+
+    with open(path, 'rb') as f:
+        assert jpeg in f.read()
+
+
+def test_write_pdf_converts_other_images_in_order(tmpdir):
+    """Test that PNG, GIF and JPEG pages are all kept in order."""
+    path = str(tmpdir.join('ch.pdf'))
+    pages = [
+        (make_image('PNG', 'RGBA', size=(10, 10)), 'png'),
+        (make_image('JPEG', size=(20, 10)), 'jpg'),
+        (make_image('GIF', 'P', size=(30, 10)), 'gif'),
+        (make_image('PNG', '1', size=(40, 10), color=1), 'png'),
+    ]
+
+    assert pdf.write_pdf(pages, path, max_workers=2) == 4
+
+    reader = read_pdf(path)
+    assert [float(page.mediabox.width) for page in reader.pages] == [
+        10, 20, 30, 40]
+
+
+def test_write_pdf_raises_value_error_for_non_image(tmpdir):
+    """Test that write_pdf fails without leaving a PDF behind."""
+    path = str(tmpdir.join('ch.pdf'))
+
+    with pytest.raises(ValueError):
+        pdf.write_pdf([(b'not an image', 'png')], path, max_workers=1)
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_write_volume_pdf_joins_chapters(tmpdir):
+    """Test that write_volume_pdf writes every chapter into one PDF."""
+    path = str(tmpdir.join('vol.pdf'))
+    chapters = [[(make_image('JPEG'), 'jpg')] * count for count in (2, 3)]
+
+    assert pdf.write_volume_pdf(chapters, path) == 5
+    assert len(read_pdf(path).pages) == 5
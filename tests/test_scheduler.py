@@ -0,0 +1,192 @@
+"""Tests for the scheduler module."""
+import threading
+import time
+
+import pytest
+
+from .context import scheduler as sch
+
+
+@pytest.fixture
+def chapter_cache(dummy_source):
+    """Create a cache with ten chapters of one page for dummy_source."""
+    from datetime import datetime
+    from .context import seriescache
+
+    cache = seriescache.SeriesCache('test series')
+    cache._index_pages = {repr(dummy_source): ''}
+    cache._last_updated = {repr(dummy_source): datetime.utcnow().timestamp()}
+    cache._chapter_lists = {repr(dummy_source): {
+        str(n): f'http://www.source.com/test_series/{n}/page/1'
+        for n in range(1, 11)
+    }}
+    return cache
+
+
+@pytest.fixture
+def one_page_chapters(monkeypatch):
+    """Make every chapter a single page with the chapter URL as data."""
+    from .context import scraper
+
+    def chapter_pages(chapter, series, source, downloader=None):
+        return iter([(chapter.encode(), 'png')])
+
+    monkeypatch.setattr(scraper.Scraper, 'chapter_pages', chapter_pages)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'max_chapters': '2'}, {'per_source': 1.5}, {'downloader': 'pool'}
+])
+def test_constructor_raises_type_error_for_bad_arguments(kwargs):
+    """Test that ChapterScheduler raises a TypeError for bad arguments."""
+    with pytest.raises(TypeError):
+        sch.ChapterScheduler(**kwargs)
+
+
+@pytest.mark.parametrize('kwargs', [{'max_chapters': 0}, {'per_source': -1}])
+def test_constructor_raises_value_error_for_limits_below_one(kwargs):
+    """Test that ChapterScheduler raises a ValueError for bad limits."""
+    with pytest.raises(ValueError):
+        sch.ChapterScheduler(**kwargs)
+
+
+def test_select_chapters_sorts_newest_first():
+    """Test that select_chapters orders chapters newest first."""
+    result = sch.ChapterScheduler().select_chapters(
+        ['2', '10', '9.5', '1'])
+    assert result == ['10', '9.5', '2', '1']
+
+
+def test_select_chapters_keeps_range_and_leaves_out_skipped():
+    """Test that select_chapters keeps only missing chapters in range."""
+    chapters = [str(n) for n in range(1, 11)]
+    result = sch.ChapterScheduler().select_chapters(
+        chapters, first=3, last='8', skip=['5', 6])
+    assert result == ['8', '7', '4', '3']
+
+
+def test_select_chapters_raises_error_for_bad_range():
+    """Test that select_chapters raises a TypeError for a bad range."""
+    with pytest.raises(TypeError):
+        sch.ChapterScheduler().select_chapters(['1'], first=[1])
+
+
+def test_download_raises_error_for_non_callable_on_page(
+        chapter_cache, dummy_source):
+    """Test that download raises a TypeError for a bad on_page."""
+    with pytest.raises(TypeError):
+        sch.ChapterScheduler().download(chapter_cache, dummy_source, None)
+
+
+def test_download_gets_every_missing_chapter(
+        chapter_cache, dummy_source, one_page_chapters):
+    """Test that download gets every chapter that was not skipped."""
+    pages = []
+    result = sch.ChapterScheduler().download(
+        chapter_cache, dummy_source,
+        lambda *page: pages.append(page), skip=['1', '2'])
+    assert result == {str(n): 1 for n in range(3, 11)}
+    assert sorted(pages) == sorted(
+        (str(n), 1, str(n).encode(), 'png') for n in range(3, 11))
+
+
+def test_download_starts_newest_chapters_first(
+        chapter_cache, dummy_source, one_page_chapters):
+    """Test that download with one worker runs chapters newest first."""
+    order = []
+    sch.ChapterScheduler(max_chapters=1).download(
+        chapter_cache, dummy_source, lambda ch, *_: order.append(ch))
+    assert order == [str(n) for n in range(10, 0, -1)]
+
+
+def test_download_reports_progress_and_failures(
+        chapter_cache, dummy_source, monkeypatch):
+    """Test that download reports each chapter and skips failed ones."""
+    from .context import scraper
+
+    def chapter_pages(chapter, series, source, downloader=None):
+        if chapter == '4':
+            raise KeyError(chapter)
+        return iter([(b'', 'png'), (b'', 'png')])
+
+    monkeypatch.setattr(scraper.Scraper, 'chapter_pages', chapter_pages)
+
+    reports = []
+    result = sch.ChapterScheduler().download(
+        chapter_cache, dummy_source, lambda *_: None, first=3, last=5,
+        progress=lambda *report: reports.append(report))
+
+    assert result == {'3': 2, '5': 2}
+    assert [done for _, _, done, _ in reports] == [1, 2, 3]
+    assert all(total == 3 for *_, total in reports)
+    assert [type(err) for ch, err, *_ in reports if ch == '4'] == [KeyError]
+
+
+def test_download_limits_chapters_per_source(
+        chapter_cache, dummy_source, monkeypatch):
+    """Test that download never runs more chapters than per_source."""
+    from .context import scraper
+
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+
+    def chapter_pages(chapter, series, source, downloader=None):
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        time.sleep(0.01)
+        with lock:
+            running['now'] -= 1
+        return iter([])
+
+    monkeypatch.setattr(scraper.Scraper, 'chapter_pages', chapter_pages)
+
+    sch.ChapterScheduler(max_chapters=6, per_source=2).download(
+        chapter_cache, dummy_source, lambda *_: None)
+    assert running['max'] == 2
+
+
+def test_download_with_nothing_to_get_returns_empty_dict(
+        chapter_cache, dummy_source):
+    """Test that download returns right away when nothing is missing."""
+    result = sch.ChapterScheduler().download(
+        chapter_cache, dummy_source, lambda *_: None, first=50)
+    assert result == {}
+
+
+def test_download_finishes_then_raises_progress_error(
+        chapter_cache, dummy_source, one_page_chapters):
+    """Test that download gets every chapter before a progress error."""
+    pages = []
+
+    def progress(*report):
+        raise RuntimeError('callback failed')
+
+    scheduler = sch.ChapterScheduler(max_chapters=2)
+    with pytest.raises(RuntimeError):
+        scheduler.download(chapter_cache, dummy_source,
+                           lambda *page: pages.append(page),
+                           progress=progress)
+    assert len(pages) == 10
+
+
+def test_idle_worker_leaves_workers_before_releasing_lock():
+    """Test that a worker with no jobs is removed under the same lock."""
+    scheduler = sch.ChapterScheduler(max_chapters=1)
+    cond = scheduler._cond
+    seen = []
+
+    class Watched(object):
+        def __enter__(self):
+            return cond.__enter__()
+
+        def __exit__(self, *exc_info):
+            seen.append(list(scheduler._workers))
+            return cond.__exit__(*exc_info)
+
+    scheduler._cond = Watched()
+    scheduler._workers.append(threading.current_thread())
+    scheduler._work()
+
+    assert seen and not any(workers for workers in seen)
+
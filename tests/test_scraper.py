@@ -1,6 +1,9 @@
 """Tests for the scraper module."""
+import os
+
 from bs4 import BeautifulSoup
 import pytest
+import requests
 
 from .conftest import requests_patch
 from .context import scraper as scr
@@ -110,10 +113,10 @@ def test_get_page_removes_image_link_from_html(dummy_source):
 def test_get_page_has_empty_string_for_next_page_without_a_tag(
         dummy_source, monkeypatch):
     """Test _get_page returns an empty string for next page URL on img tag."""
-    import requests
+    from .context import transport
     req = requests_patch(text='<img src="https://file.co/img.png">',
                          content=b'\x00\x00\x00\x00\x00\x00')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
     result = scr.Scraper._get_page('http://www.test.com/001/page/1',
                                    dummy_source)
     assert result[2] == ''
@@ -121,11 +124,11 @@ def test_get_page_has_empty_string_for_next_page_without_a_tag(
 
 def test_get_page_gets_next_url_with_relative_path(dummy_source, monkeypatch):
     """Test _get_page returns next page url with relative path."""
-    import requests
+    from .context import transport
     req = requests_patch(text='''<a href="./2">
         <img src="https://file.co/img.png">
         </a>''', content=b'\x00\x00\x00\x00\x00\x00')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
     result = scr.Scraper._get_page('http://www.test.com/001/page/1',
                                    dummy_source)
     assert result[2] == 'http://www.test.com/001/page/2'
@@ -173,7 +176,7 @@ def test_generate_multipage_chapter_yields_image_and_extension(dummy_source):
 def test_generate_multipage_chapter_yields_all_images_in_chapter(
         dummy_source, monkeypatch):
     """Test _generate_multipage_chapter yeilds image data and extention."""
-    import requests
+    from .context import transport
 
     def page_txt(ch_len):
         n = 2
@@ -191,7 +194,7 @@ def test_generate_multipage_chapter_yields_all_images_in_chapter(
             n += 1
 
     req = requests_patch(text=page_txt(4), content=content())
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     pages = scr.Scraper._generate_multipage_chapter(
         'http://t.com/2/page/1', dummy_source)
@@ -203,7 +206,7 @@ def test_generate_multipage_chapter_yields_all_images_in_chapter(
 def test_generate_multipage_chapter_works_for_last_chapter(
         dummy_source, monkeypatch):
     """Test _generate_multipage_chapter still works for final chapter."""
-    import requests
+    from .context import transport
 
     def page_txt(ch, ch_len):
         for n in range(2, ch_len * 2):
@@ -224,7 +227,7 @@ def test_generate_multipage_chapter_works_for_last_chapter(
             n += 1
 
     req = requests_patch(text=page_txt(2, 4), content=content())
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     pages = scr.Scraper._generate_multipage_chapter(
         'http://t.com/2/page/1', dummy_source)
@@ -235,7 +238,7 @@ def test_generate_multipage_chapter_works_for_last_chapter(
 def test_generate_multipage_chapter_works_dashed_url(
         dummy_source, monkeypatch):
     """Test _generate_multipage_chapter still works for dashed chapter url."""
-    import requests
+    from .context import transport
 
     def page_txt(ch_len):
         for n in range(2, ch_len * 2 + 1):
@@ -248,7 +251,7 @@ def test_generate_multipage_chapter_works_dashed_url(
         </a>'''
 
     req = requests_patch(text=page_txt(4), content='')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     pages = scr.Scraper._generate_multipage_chapter(
         'https://foo.co/chap/437217-1', dummy_source)
@@ -298,7 +301,7 @@ def test_generate_singlepage_chapter_yields_image_and_extension(dummy_source):
 def test_generate_singlepage_chapter_yields_all_images_in_chapter(
         dummy_source, monkeypatch):
     """Test _generate_singlepage_chapter yeilds image data and extention."""
-    import requests
+    from .context import transport
 
     page_txt = '''
     <img src="http://files.co/test.png" id="1">
@@ -314,7 +317,7 @@ def test_generate_singlepage_chapter_yields_all_images_in_chapter(
             n += 1
 
     req = requests_patch(text=page_txt, content=content())
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     pages = scr.Scraper._generate_singlepage_chapter(
         'http://t.com/1', dummy_source)
@@ -420,14 +423,14 @@ def test_chapter_list_uses_cache_list_if_available(filled_cache, dummy_source):
 
 def test_chapter_list_builds_list_if_cache_outdated(filled_cache, monkeypatch):
     """Test chapter_list creates a chapter list when outdated."""
-    import requests
+    from .context import transport
     from .context import mangasource
 
     req = requests_patch(text='''<table>
         <a href="/test-series/5">Chapter link 5</a>
         <a href="/test-series/4">Chapter link 4</a>
     </table>''')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     source = mangasource.MangaSource('old-source', 'http://old.net/', '')
     chapters = filled_cache._chapter_lists[repr(source)]
@@ -439,10 +442,10 @@ def test_chapter_list_builds_list_if_cache_outdated(filled_cache, monkeypatch):
 def test_chapter_list_builds_list_if_no_cache_available(
         empty_cache, dummy_source, monkeypatch):
     """Test chapter_list creates a chapter list when outdated."""
-    import requests
+    from .context import transport
 
     req = requests_patch(text='<table><a href="/ch/5">5</a></table>')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     new_chapters = scr.Scraper.chapter_list(empty_cache, dummy_source)
     assert type(new_chapters) is dict
@@ -489,10 +492,10 @@ def test_chapter_list_gets_url_for_each_chapter(various_indexes):
 def test_chapter_list_adds_chapter_list_to_cache_missing_chapters(
         empty_cache, dummy_source, monkeypatch):
     """Test chapter_list adds chapter list to the cache."""
-    import requests
+    from .context import transport
 
     req = requests_patch(text='<table><a href="/ch/5">5</a></table>')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     new_chapters = scr.Scraper.chapter_list(empty_cache, dummy_source)
     assert repr(dummy_source) in empty_cache._chapter_lists
@@ -502,13 +505,13 @@ def test_chapter_list_adds_chapter_list_to_cache_missing_chapters(
 def test_chapter_list_updates_chapter_list_for_old_cache(
         filled_cache, monkeypatch):
     """Test chapter_list updates chapter list for an outdated cache."""
-    import requests
+    from .context import transport
 
     from .context import mangasource
     source = mangasource.MangaSource('old-source', 'http://old.net/', '')
 
     req = requests_patch(text='<table><a href="/ch/5">5</a></table>')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     chapters = filled_cache._chapter_lists[repr(source)]
 
@@ -555,10 +558,10 @@ def test_chapter_pages_raises_error_for_empty_chap(empty_cache, dummy_source):
 def test_chapter_pages_raises_error_for_chapter_not_in_chapter_list(
         empty_cache, dummy_source, monkeypatch):
     """Test chapter_pages raises a KeyError for chapter not in chapter list."""
-    import requests
+    from .context import transport
 
     req = requests_patch(text='<table><a href="/10">Chapter 10</a></table>')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     with pytest.raises(KeyError):
         scr.Scraper.chapter_pages('1', empty_cache, dummy_source)
@@ -567,10 +570,10 @@ def test_chapter_pages_raises_error_for_chapter_not_in_chapter_list(
 def test_chapter_pages_uses_cached_chapter_url_when_available(
         filled_cache, dummy_source, monkeypatch):
     """Test chapter_pages uses cached chapter URL from chapter list cache."""
-    import requests
+    from .context import transport
 
     req = requests_patch(text='<table><a href="/10">Chapter 10</a></table>')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     chapters = filled_cache.get_chapter_list(dummy_source)
 
@@ -586,10 +589,10 @@ def test_chapter_pages_uses_cached_chapter_url_when_available(
 def test_chapter_pages_gets_new_chapter_url_when_not_available(
         empty_cache, dummy_source, monkeypatch):
     """Test chapter_pages retrieves new chapter list when not available."""
-    import requests
+    from .context import transport
 
     req = requests_patch(text='<table><a href="/10">Chapter 10</a></table>')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     pages = scr.Scraper.chapter_pages('10', empty_cache, dummy_source)
     assert pages is not None
@@ -598,10 +601,10 @@ def test_chapter_pages_gets_new_chapter_url_when_not_available(
 def test_chapter_pages_updates_chapter_list_cache_when_not_available(
         empty_cache, dummy_source, monkeypatch):
     """Test chapter_pages retrieves new chapter list when not available."""
-    import requests
+    from .context import transport
 
     req = requests_patch(text='<table><a href="/10">Chapter 10</a></table>')
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     assert empty_cache.get_chapter_list(dummy_source) is None
 
@@ -613,7 +616,7 @@ def test_chapter_pages_updates_chapter_list_cache_when_not_available(
 def test_chapter_pages_yields_all_images_in_multipage_chapter(
         filled_cache, dummy_source, monkeypatch):
     """Test chapter_pages yeilds all images in multipage source."""
-    import requests
+    from .context import transport
 
     def page_txt(ch_len):
         n = 2
@@ -632,7 +635,7 @@ def test_chapter_pages_yields_all_images_in_multipage_chapter(
             n += 1
 
     req = requests_patch(text=page_txt(4), content=content())
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     pages = scr.Scraper.chapter_pages('1', filled_cache, dummy_source)
     imgs = [pg for pg in pages]
@@ -643,7 +646,7 @@ def test_chapter_pages_yields_all_images_in_multipage_chapter(
 def test_chapter_pages_yields_all_images_in_singlepage_chapter(
         filled_cache, dummy_source, monkeypatch):
     """Test chapter_pages yeilds all images in singlepage source."""
-    import requests
+    from .context import transport
     dummy_source.is_multipage = False
 
     page_txt = '''
@@ -660,9 +663,735 @@ def test_chapter_pages_yields_all_images_in_singlepage_chapter(
             n += 1
 
     req = requests_patch(text=page_txt, content=content())
-    monkeypatch.setattr(requests, 'get', req)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
 
     pages = scr.Scraper.chapter_pages('1', filled_cache, dummy_source)
     imgs = [pg for pg in pages]
     assert len(imgs) == 4
     assert imgs[0] != imgs[1] != imgs[2] != imgs[3]
+
+
+@pytest.mark.parametrize('value', [500, 'downloader', {}])
+def test_chapter_pages_raises_error_for_bad_downloader(
+        value, dummy_source, filled_cache):
+    """Test chapter_pages raises a TypeError for non-ImageDownloader."""
+    with pytest.raises(TypeError):
+        scr.Scraper.chapter_pages('1', filled_cache, dummy_source, value)
+
+
+def test_generate_multipage_chapter_with_downloader_matches_serial(
+        dummy_source, monkeypatch):
+    """Test the concurrent multipage chapter yields the same pages."""
+    from .context import downloader, transport
+
+    def req(url, **kwargs):
+        class Response(object):
+            status_code = 200
+            n = int(url.rsplit('/', 1)[1].split('.')[0])
+            text = f'''<a href="http://t.co/1/{n + 1}">
+            <img src="http://f.co/{n}.png"></a>''' if n < 12 else ''
+            content = url.encode()
+        return Response
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
+
+    serial = list(scr.Scraper._generate_multipage_chapter(
+        'http://t.co/1/1', dummy_source))
+    with downloader.ImageDownloader(max_workers=4) as pool:
+        concurrent = list(scr.Scraper._generate_multipage_chapter(
+            'http://t.co/1/1', dummy_source, pool))
+    assert len(serial) == 11
+    assert concurrent == serial
+
+
+def test_generate_singlepage_chapter_with_downloader_matches_serial(
+        dummy_source, monkeypatch):
+    """Test the concurrent singlepage chapter yields the same pages."""
+    from .context import downloader, transport
+
+    page_txt = ''.join(f'<img src="http://f.co/{n}.jpg">' for n in range(9))
+    req = requests_patch(text=page_txt, content=lambda url: url.encode())
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
+
+    serial = list(scr.Scraper._generate_singlepage_chapter(
+        'http://t.co/1', dummy_source))
+    with downloader.ImageDownloader(max_workers=4) as pool:
+        concurrent = list(scr.Scraper._generate_singlepage_chapter(
+            'http://t.co/1', dummy_source, pool))
+    assert serial == [(f'http://f.co/{n}.jpg'.encode(), 'jpg')
+                      for n in range(9)]
+    assert concurrent == serial
+
+
+def test_generate_multipage_chapter_with_downloader_prefetches_next_page(
+        dummy_source, monkeypatch):
+    """Test the next page is requested while a page image downloads."""
+    import threading
+    from .context import downloader, transport
+
+    third_page = threading.Event()
+
+    def req(url, **kwargs):
+        n = int(url.rsplit('/', 1)[1].split('.')[0])
+
+        class Response(object):
+            status_code = 200
+            text = f'''<a href="http://t.co/1/{n + 1}">
+            <img src="http://f.co/{n}.png"></a>''' if n < 4 else ''
+            content = b''
+
+        if url.startswith('http://t.co') and n == 3:
+            third_page.set()
+        if url == 'http://f.co/1.png':
+            assert third_page.wait(2)
+        return Response
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
+
+    with downloader.ImageDownloader(max_workers=1) as pool:
+        pages = list(scr.Scraper._generate_multipage_chapter(
+            'http://t.co/1/1', dummy_source, pool))
+    assert len(pages) == 3
+
+
+def test_make_soup_uses_scraper_parser_by_default(dummy_source, monkeypatch):
+    """Test that _make_soup uses the Scraper parser without a source one."""
+    parsers = []
+
+    def soup(markup, parser, **kwargs):
+        parsers.append(parser)
+
+    monkeypatch.setattr(scr, 'BeautifulSoup', soup)
+    scr.Scraper._make_soup('<p></p>', dummy_source)
+    monkeypatch.setattr(scr.Scraper, 'parser', 'html5lib')
+    scr.Scraper._make_soup('<p></p>', dummy_source)
+    assert parsers == ['html.parser', 'html5lib']
+
+
+def test_make_soup_prefers_source_parser(dummy_source, monkeypatch):
+    """Test that _make_soup uses the parser chosen for the source."""
+    parsers = []
+
+    def soup(markup, parser, **kwargs):
+        parsers.append(parser)
+
+    monkeypatch.setattr(scr, 'BeautifulSoup', soup)
+    dummy_source.parser = 'lxml'
+    scr.Scraper._make_soup('<p></p>', dummy_source)
+    assert parsers == ['lxml']
+
+
+def test_chapter_list_with_lxml_matches_html_parser(various_indexes):
+    """Test that the lxml parser finds the same chapters."""
+    pytest.importorskip('lxml')
+    cache, source = various_indexes
+    expected = scr.Scraper.chapter_list(cache, source)
+
+    cache._chapter_lists = {}
+    source.parser = 'lxml'
+    assert scr.Scraper.chapter_list(cache, source) == expected
+
+
+def test_parse_page_uses_fast_path_without_soup(dummy_source, monkeypatch):
+    """Test that a page read by the fast path is never parsed."""
+    from .context import extraction
+    dummy_source.fast_path = extraction.FastPath(
+        r'<img src="([^"]+)"', r'<a href="([^"]+)"><img')
+    monkeypatch.setattr(scr, 'BeautifulSoup', None)
+
+    page = '<a href="2"><img src="http://f.co/1.jpg"></a>'
+    assert scr.Scraper._parse_page('http://a.co/ch/1', page, dummy_source) == (
+        'http://f.co/1.jpg', 'jpg', 'http://a.co/ch/2', None)
+
+
+def test_parse_page_falls_back_to_soup_when_fast_path_misses(dummy_source):
+    """Test that the page is parsed when the fast path cannot read it."""
+    from .context import extraction
+    dummy_source.fast_path = extraction.FastPath(
+        r'<img data-src="([^"]+)"', r'<a href="([^"]+)"><img')
+
+    page = '<a href="2"><img src="http://f.co/1.jpg"></a>'
+    img_link, ext, next_page, html = scr.Scraper._parse_page(
+        'http://a.co/ch/1', page, dummy_source)
+    assert (img_link, ext, next_page) == (
+        'http://f.co/1.jpg', 'jpg', 'http://a.co/ch/2')
+    assert html is not None
+
+
+def streaming_get(url, **kwargs):
+    """Fake a streamed response for singlepage chapters of five images."""
+    class Response(object):
+        status_code = 200
+        text = ''.join(f'<img src="http://f.co/{n}.jpg">' for n in range(5))
+
+        def iter_content(self, chunk_size):
+            assert kwargs.get('stream')
+            return iter([url.encode(), b'-end'])
+
+        def close(self):
+            pass
+
+    return Response()
+
+
+@pytest.mark.parametrize('value', [None, 'path', 5])
+def test_stream_chapter_pages_raises_error_for_bad_sink(
+        value, dummy_source, filled_cache):
+    """Test stream_chapter_pages raises a TypeError for a non-callable."""
+    with pytest.raises(TypeError):
+        scr.Scraper.stream_chapter_pages(
+            '1', filled_cache, dummy_source, value)
+
+
+def test_stream_chapter_pages_writes_pages_to_sink(
+        dummy_source, filled_cache, monkeypatch, tmpdir):
+    """Test stream_chapter_pages writes each page and yields records."""
+    from .context import transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', streaming_get)
+    dummy_source.is_multipage = False
+
+    def sink(number, ext):
+        return str(tmpdir.join(f'{number:03}.{ext}'))
+
+    records = list(scr.Scraper.stream_chapter_pages(
+        '1', filled_cache, dummy_source, sink))
+
+    assert [record.number for record in records] == [1, 2, 3, 4, 5]
+    for n, record in enumerate(records):
+        data = f'http://f.co/{n}.jpg-end'.encode()
+        assert record.url == f'http://f.co/{n}.jpg'
+        assert record.ext == 'jpg'
+        assert record.size == len(data)
+        assert open(record.target, 'rb').read() == data
+
+
+def test_stream_chapter_pages_with_downloader_matches_serial(
+        dummy_source, filled_cache, monkeypatch, tmpdir):
+    """Test the concurrent stream yields the same records in order."""
+    from .context import downloader, transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', streaming_get)
+    dummy_source.is_multipage = False
+
+    def sink(number, ext):
+        return str(tmpdir.join(f'{number:03}.{ext}'))
+
+    serial = list(scr.Scraper.stream_chapter_pages(
+        '1', filled_cache, dummy_source, sink))
+    with downloader.ImageDownloader(max_workers=3) as pool:
+        concurrent = list(scr.Scraper.stream_chapter_pages(
+            '1', filled_cache, dummy_source, sink, pool))
+    assert concurrent == serial
+
+
+def test_stream_chapter_pages_skips_pages_without_a_target(
+        dummy_source, filled_cache, monkeypatch, tmpdir):
+    """Test that pages the sink skips are never requested."""
+    from .context import transport
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        return streaming_get(url, **kwargs)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    dummy_source.is_multipage = False
+
+    def sink(number, ext):
+        if number % 2:
+            return None
+        return str(tmpdir.join(f'{number:03}.{ext}'))
+
+    records = list(scr.Scraper.stream_chapter_pages(
+        '1', filled_cache, dummy_source, sink))
+
+    assert [record.size is None for record in records] == [
+        True, False, True, False, True]
+    assert [url for url in requested if 'f.co' in url] == [
+        'http://f.co/1.jpg', 'http://f.co/3.jpg']
+
+
+def test_download_image_uses_page_store(dummy_source, monkeypatch, tmpdir):
+    """Test that images saved in the page store are not downloaded again."""
+    from .context import pagestore, transport
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        return streaming_get(url, **kwargs)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    monkeypatch.setattr(scr.Scraper, 'page_store',
+                        pagestore.PageStore(str(tmpdir)))
+
+    link = 'http://f.co/1.png'
+    first = scr.Scraper._download_image(link, dummy_source)
+    again = scr.Scraper._download_image(link, dummy_source)
+
+    assert first == again == b'http://f.co/1.png-end'
+    assert requested == [link]
+
+
+def test_stream_chapter_pages_keeps_pages_in_page_store(
+        dummy_source, filled_cache, monkeypatch, tmpdir):
+    """Test that a sink can keep pages in a PageStore by their hash."""
+    import hashlib
+    from .context import pagestore, transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', streaming_get)
+    dummy_source.is_multipage = False
+    store = pagestore.PageStore(str(tmpdir))
+
+    records = list(scr.Scraper.stream_chapter_pages(
+        '1', filled_cache, dummy_source, lambda number, ext: store))
+
+    data = b'http://f.co/0.jpg-end'
+    assert records[0].target == hashlib.sha256(data).hexdigest()
+    assert records[0].size == len(data)
+    assert store.read(records[0].target) == data
+
+
+def flaky_chapter(monkeypatch, failures=None, length=6):
+    """Serve a multipage chapter, failing pages as many times as asked."""
+    from .context import transport
+    failures = failures if failures is not None else {}
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        n = int(url.rsplit('/', 1)[1].split('.')[0])
+
+        if url.startswith('http://t.co') and failures.get(n):
+            failures[n] -= 1
+            raise requests.exceptions.ConnectionError
+
+        class Response(object):
+            status_code = 200
+            text = f'''<a href="http://t.co/1/{n + 1}">
+            <img src="http://f.co/{n}.png"></a>''' if n < length else ''
+            content = url.encode()
+        return Response
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    monkeypatch.setattr(scr.Scraper, 'retry_backoff', 0)
+    return requested
+
+
+def test_find_page_raises_page_request_error_for_unreachable_page(
+        dummy_source, monkeypatch):
+    """Test that _find_page marks a failed connection as retryable."""
+    flaky_chapter(monkeypatch, {1: 1})
+    with pytest.raises(scr.PageRequestError):
+        scr.Scraper._find_page('http://t.co/1/1', dummy_source)
+
+
+@pytest.mark.parametrize('status_code', [429, 500, 503])
+def test_find_page_raises_page_request_error_for_unavailable_page(
+        status_code, dummy_source, monkeypatch):
+    """Test that _find_page marks a busy or failing server as retryable."""
+    from .context import transport
+    req = requests_patch(status_code=status_code, text='')
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', req)
+    with pytest.raises(scr.PageRequestError):
+        scr.Scraper._find_page('http://t.co/1/1', dummy_source)
+
+
+def test_generate_multipage_chapter_retries_failed_pages(
+        dummy_source, monkeypatch):
+    """Test that a page that fails for a while is retried, not skipped."""
+    flaky_chapter(monkeypatch, {3: 2})
+    pages = list(scr.Scraper._generate_multipage_chapter(
+        'http://t.co/1/1', dummy_source))
+    assert len(pages) == 5
+
+
+def test_generate_multipage_chapter_waits_for_retry_after(
+        dummy_source, monkeypatch):
+    """Test that a page is retried no sooner than its Retry-After."""
+    from .context import transport
+    flaky_chapter(monkeypatch)
+    get = transport.DEFAULT_TRANSPORT.get
+    busy = {3: 1}
+
+    def busy_get(url, **kwargs):
+        n = int(url.rsplit('/', 1)[1].split('.')[0])
+        if 't.co' in url and busy.get(n):
+            busy[n] -= 1
+            return requests_patch(status_code=503, text='',
+                                  headers={'Retry-After': '2'})(url)
+        return get(url, **kwargs)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', busy_get)
+    slept = []
+    monkeypatch.setattr(scr.time, 'sleep', slept.append)
+
+    pages = list(scr.Scraper._generate_multipage_chapter(
+        'http://t.co/1/1', dummy_source))
+    assert len(pages) == 5
+    assert slept == [2]
+
+
+def test_generate_multipage_chapter_raises_error_once_out_of_retries(
+        dummy_source, monkeypatch):
+    """Test that a page that keeps failing does not end the chapter."""
+    flaky_chapter(monkeypatch, {3: 4})
+    pages = scr.Scraper._generate_multipage_chapter(
+        'http://t.co/1/1', dummy_source)
+    assert len([next(pages), next(pages)]) == 2
+    with pytest.raises(scr.PageRequestError):
+        next(pages)
+
+
+def test_chapter_pages_checkpoints_each_page_taken(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that chapter_pages keeps where the chapter is up to."""
+    flaky_chapter(monkeypatch)
+    filled_cache._chapter_lists[repr(dummy_source)]['1'] = 'http://t.co/1/1'
+
+    pages = scr.Scraper.chapter_pages('1', filled_cache, dummy_source,
+                                      resume=True)
+    next(pages)
+    next(pages)
+    next(pages)
+    assert filled_cache.get_checkpoint(dummy_source, '1') == (
+        'http://t.co/1/3', 3)
+
+    list(pages)
+    assert filled_cache.get_checkpoint(dummy_source, '1') is None
+
+
+def test_chapter_pages_without_resume_leaves_checkpoint_alone(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that a plain chapter_pages neither writes nor clears one."""
+    flaky_chapter(monkeypatch)
+    filled_cache._chapter_lists[repr(dummy_source)]['1'] = 'http://t.co/1/1'
+
+    pages = scr.Scraper.chapter_pages('1', filled_cache, dummy_source)
+    next(pages)
+    next(pages)
+    pages.close()
+    assert filled_cache.get_checkpoint(dummy_source, '1') is None
+
+    filled_cache.set_checkpoint(dummy_source, '1', 'http://t.co/1/3', 3)
+    list(scr.Scraper.chapter_pages('1', filled_cache, dummy_source))
+    assert filled_cache.get_checkpoint(dummy_source, '1') == (
+        'http://t.co/1/3', 3)
+
+
+def test_chapter_pages_resumes_from_checkpoint(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that a resumed chapter starts after the last page taken."""
+    requested = flaky_chapter(monkeypatch, {4: 4})
+    filled_cache._chapter_lists[repr(dummy_source)]['1'] = 'http://t.co/1/1'
+
+    pages = scr.Scraper.chapter_pages('1', filled_cache, dummy_source,
+                                      resume=True)
+    with pytest.raises(scr.PageRequestError):
+        list(pages)
+    del requested[:]
+
+    pages = list(scr.Scraper.chapter_pages(
+        '1', filled_cache, dummy_source, resume=True))
+
+    assert pages == [(f'http://f.co/{n}.png'.encode(), 'png')
+                     for n in (4, 5)]
+    assert requested[0] == 'http://t.co/1/4'
+
+
+def test_stream_chapter_pages_numbers_resumed_pages_from_checkpoint(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that a resumed stream numbers pages from the checkpoint."""
+    import io
+    flaky_chapter(monkeypatch)
+    filled_cache._chapter_lists[repr(dummy_source)]['1'] = 'http://t.co/1/1'
+    filled_cache.set_checkpoint(dummy_source, '1', 'http://t.co/1/4', 4)
+    monkeypatch.setattr(scr.Scraper, '_image_chunks',
+                        classmethod(lambda cls, link, source: [b'x']))
+
+    records = scr.Scraper.stream_chapter_pages(
+        '1', filled_cache, dummy_source, lambda n, ext: io.BytesIO(),
+        resume=True)
+    assert [record.number for record in records] == [4, 5]
+
+
+def test_chapter_pages_ignores_checkpoint_from_other_chapter_url(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that a checkpoint outside of the chapter is not used."""
+    flaky_chapter(monkeypatch)
+    filled_cache._chapter_lists[repr(dummy_source)]['1'] = 'http://t.co/1/1'
+    filled_cache.set_checkpoint(dummy_source, '1', 'http://old.co/1/4', 4)
+
+    pages = list(scr.Scraper.chapter_pages(
+        '1', filled_cache, dummy_source, resume=True))
+    assert len(pages) == 5
+
+
+def slow_first_get(delay):
+    """Patch for GET that answers the first request for a URL slowly."""
+    import threading
+    import time
+    seen = {}
+    lock = threading.Lock()
+
+    def get(url, **kwargs):
+        with lock:
+            count = seen[url] = seen.get(url, 0) + 1
+        if count == 1:
+            time.sleep(delay)
+        return requests_patch(content=f'{url} {count}'.encode())(url)
+
+    return get
+
+
+def test_download_image_hedges_slow_image(dummy_source, monkeypatch):
+    """Test that a slow image download is raced by a second request."""
+    from .context import hedging, transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        slow_first_get(0.5))
+
+    with hedging.HedgePolicy(min_samples=1, max_extra=1) as policy:
+        policy.record(0.01)
+        monkeypatch.setattr(scr.Scraper, 'hedging', policy)
+        data = scr.Scraper._download_image('http://f.co/1.png', dummy_source)
+
+    assert data == b'http://f.co/1.png 2'
+    assert policy.hedged == 1
+
+
+def test_download_image_hedges_into_page_store(dummy_source, monkeypatch,
+                                               tmpdir):
+    """Test that a hedged image is kept in the page store."""
+    from .context import hedging, pagestore, transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        slow_first_get(0.5))
+    store = pagestore.PageStore(str(tmpdir))
+    monkeypatch.setattr(scr.Scraper, 'page_store', store)
+
+    with hedging.HedgePolicy(min_samples=1, max_extra=1) as policy:
+        policy.record(0.01)
+        monkeypatch.setattr(scr.Scraper, 'hedging', policy)
+        data = scr.Scraper._download_image('http://f.co/1.png', dummy_source)
+
+    assert data == b'http://f.co/1.png 2'
+    assert store.lookup('http://f.co/1.png') is not None
+
+
+def test_download_image_does_not_hedge_retry_wait(dummy_source,
+                                                  monkeypatch):
+    """Test that waiting on Retry-After is not taken as a slow request."""
+    import time
+    from .context import hedging, transport
+    get, requested = status_get([429, 200], {'Retry-After': '1'})
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    real_sleep = time.sleep
+    slept = []
+
+    def sleep(delay):
+        slept.append(delay)
+        real_sleep(0.1)
+
+    monkeypatch.setattr(scr.time, 'sleep', sleep)
+
+    with hedging.HedgePolicy(min_samples=1, max_extra=1) as policy:
+        policy.record(0.01)
+        monkeypatch.setattr(scr.Scraper, 'hedging', policy)
+        data = scr.Scraper._download_image('http://f.co/1.png', dummy_source)
+
+    assert data == b'image'
+    assert len(requested) == 2
+    assert slept == [1]
+    assert policy.hedged == 0
+    assert max(policy._latencies) < 0.1
+
+
+def long_strip_get(count):
+    """Patch for GET that gives a singlepage chapter of many images."""
+    text = ''.join(f'<img src="//f.co/{n}.jpg">' for n in range(count))
+    return requests_patch(text=text, content=lambda url: url.encode())
+
+
+def test_generate_singlepage_chapter_finds_images_in_one_pass(
+        dummy_source, monkeypatch):
+    """Test that every page image is found with a single search."""
+    from .context import transport
+    dummy_source.is_multipage = False
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        long_strip_get(200))
+
+    searches = []
+    page_images = scr.Scraper._page_images
+
+    def counted(html, source):
+        searches.append(html)
+        return page_images(html, source)
+
+    monkeypatch.setattr(scr.Scraper, '_page_images', counted)
+    pages = list(scr.Scraper._generate_singlepage_chapter(
+        'http://www.source.com/chapter', dummy_source))
+
+    assert len(searches) == 1
+    assert [data for data, _ in pages] == [
+        f'http://f.co/{n}.jpg'.encode() for n in range(200)]
+
+
+def test_generate_singlepage_chapter_leaves_soup_unchanged(
+        dummy_source, monkeypatch):
+    """Test that page images are not removed from the page soup."""
+    from .context import transport
+    dummy_source.is_multipage = False
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', long_strip_get(5))
+
+    soups = []
+    make_soup = scr.Scraper._make_soup
+
+    def kept(markup, source, parse_only=None):
+        soups.append(make_soup(markup, source, parse_only))
+        return soups[-1]
+
+    monkeypatch.setattr(scr.Scraper, '_make_soup', kept)
+    list(scr.Scraper._generate_singlepage_chapter(
+        'http://www.source.com/chapter', dummy_source))
+
+    assert len(soups[0].find_all('img')) == 5
+
+
+def status_get(statuses, error_headers=None):
+    """Patch for GET that answers with each status in turn."""
+    statuses = iter(statuses)
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        status = next(statuses)
+
+        class Response(object):
+            status_code = status
+            headers = dict(error_headers or {}) if status >= 400 else {}
+            content = b'<html>Error</html>' if status >= 400 else b'image'
+
+            def iter_content(self, chunk_size):
+                return iter([self.content])
+
+            def close(self):
+                pass
+
+        return Response()
+
+    return get, requested
+
+
+def test_stream_pages_closes_target_when_image_fails(dummy_source,
+                                                     monkeypatch):
+    """Test that a target opened for a failed image is not left open."""
+    import io
+    from .context import transport
+    get, _ = status_get([404])
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    target = io.BytesIO()
+
+    records = scr.Scraper._stream_pages(
+        [('http://f.co/1.png', 'png')], dummy_source, lambda *_: target)
+    with pytest.raises(ValueError):
+        next(records)
+    assert target.closed
+
+
+@pytest.mark.parametrize('status, error', [
+    (404, ValueError), (429, scr.PageRequestError),
+    (503, scr.PageRequestError)
+])
+def test_download_image_raises_for_error_status(dummy_source, monkeypatch,
+                                                status, error):
+    """Test that an error response is never taken as the image."""
+    from .context import transport
+    get, _ = status_get([status])
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    monkeypatch.setattr(scr.Scraper, 'page_retries', 0)
+    with pytest.raises(error):
+        scr.Scraper._download_image('http://f.co/1.png', dummy_source)
+
+
+def test_download_image_does_not_store_error_response(dummy_source,
+                                                      monkeypatch, tmpdir):
+    """Test that a failed image is not kept in the page store."""
+    from .context import pagestore, transport
+    get, requested = status_get([503, 200])
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    store = pagestore.PageStore(str(tmpdir))
+    monkeypatch.setattr(scr.Scraper, 'page_store', store)
+    monkeypatch.setattr(scr.Scraper, 'page_retries', 0)
+
+    link = 'http://f.co/1.png'
+    with pytest.raises(scr.PageRequestError):
+        scr.Scraper._download_image(link, dummy_source)
+    assert store.lookup(link) is None
+
+    assert scr.Scraper._download_image(link, dummy_source) == b'image'
+    assert len(requested) == 2
+
+
+def test_stream_image_does_not_write_error_response(dummy_source,
+                                                    monkeypatch, tmpdir):
+    """Test that a failed image leaves no file at the target."""
+    from .context import transport
+    get, _ = status_get([404])
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    target = str(tmpdir.join('1.png'))
+
+    with pytest.raises(ValueError):
+        scr.Scraper._stream_image('http://f.co/1.png', dummy_source, target)
+    assert not os.path.exists(target)
+
+
+@pytest.mark.parametrize('stored', [False, True])
+def test_download_image_retries_overloaded_image(dummy_source, monkeypatch,
+                                                 tmpdir, stored):
+    """Test that an image is retried once its Retry-After has passed."""
+    from .context import pagestore, transport
+    get, requested = status_get([429, 503, 200], {'Retry-After': '0'})
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    monkeypatch.setattr(scr.Scraper, 'retry_backoff', 0)
+    if stored:
+        monkeypatch.setattr(scr.Scraper, 'page_store',
+                            pagestore.PageStore(str(tmpdir)))
+
+    assert scr.Scraper._download_image(
+        'http://f.co/1.png', dummy_source) == b'image'
+    assert len(requested) == 3
+
+
+def test_download_image_waits_out_retry_after(dummy_source, monkeypatch):
+    """Test that a longer Retry-After is waited out before retrying."""
+    from .context import transport
+    get, _ = status_get([503, 200], {'Retry-After': '7'})
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    monkeypatch.setattr(scr.Scraper, 'retry_backoff', 0.5)
+    sleeps = []
+    monkeypatch.setattr(scr.time, 'sleep', sleeps.append)
+
+    scr.Scraper._download_image('http://f.co/1.png', dummy_source)
+    assert sleeps == [7.0]
+
+
+def test_download_image_does_not_retry_missing_image(dummy_source,
+                                                     monkeypatch):
+    """Test that an image that is not found is not requested again."""
+    from .context import transport
+    get, requested = status_get([404, 200])
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    with pytest.raises(ValueError):
+        scr.Scraper._download_image('http://f.co/1.png', dummy_source)
+    assert len(requested) == 1
+
+
+def test_download_image_with_limiter_gives_image_after_overload(
+        dummy_source, monkeypatch):
+    """Test that the limiter backs off and the image is still returned."""
+    from .context import throttle, transport
+    get, _ = status_get([503, 200], {'Retry-After': '0'})
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    monkeypatch.setattr(scr.Scraper, 'retry_backoff', 0)
+    limiter = throttle.AdaptiveLimiter(initial=4)
+    monkeypatch.setattr(scr.Scraper, 'limiter', limiter)
+
+    link = 'http://f.co/1.png'
+    assert scr.Scraper._download_image(link, dummy_source) == b'image'
+    assert limiter.limit(link) < 4
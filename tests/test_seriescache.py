@@ -247,9 +247,10 @@ def test_get_index_for_source_not_in_cache_adds_to_cache(
 def test_get_index_for_source_not_in_cache_returns_new_index(
         empty_cache, dummy_source, monkeypatch):
     """Test that get_index for source not in cache gets its index page."""
-    import requests
+    from .context import transport
     index = '<p>chap</p>'
-    monkeypatch.setattr(requests, 'get', requests_patch(text=index))
+    monkeypatch.setattr(
+        transport.DEFAULT_TRANSPORT, 'get', requests_patch(text=index))
     result = empty_cache.get_index(dummy_source)
     assert result == index
 
@@ -308,6 +309,26 @@ def test_get_index_old_source_updates_url_when_given(filled_cache):
     assert filled_cache._custom_urls[repr(source)] == 'http://o.co/testseries'
 
 
+def test_stored_index_never_requests_page(filled_cache, dummy_source,
+                                          monkeypatch):
+    """Test that stored_index gives the stored html of an outdated index."""
+    from .context import transport
+
+    def get(url, **kwargs):
+        raise AssertionError('requested ' + url)
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get', get)
+    filled_cache._last_updated[repr(dummy_source)] = 0
+    assert filled_cache.stored_index(dummy_source) == (
+        filled_cache._index_pages[repr(dummy_source)])
+
+
+def test_stored_index_is_none_for_source_not_in_cache(empty_cache,
+                                                      dummy_source):
+    """Test that stored_index gives None for a source without an index."""
+    assert empty_cache.stored_index(dummy_source) is None
+
+
 def test_set_chapter_list_raises_error_for_bad_source(empty_cache):
     """Test set_chapter_list raises a TypeError for non MangaSource source."""
     with pytest.raises(TypeError):
@@ -452,3 +473,306 @@ def test_get_chapter_list_returns_none_for_source_without_chaps(filled_cache):
     from .context import mangasource
     source = mangasource.MangaSource('source2', 'http://www.another.com', '')
     assert filled_cache.get_chapter_list(source) is None
+
+
+def test_needs_update_for_new_source_is_true(empty_cache, dummy_source):
+    """Test that needs_update is True for a source not in the cache."""
+    assert empty_cache.needs_update(dummy_source) is True
+
+
+def test_needs_update_for_recent_source_is_false(filled_cache, dummy_source):
+    """Test that needs_update is False for a recently updated source."""
+    assert filled_cache.needs_update(dummy_source) is False
+
+
+def test_needs_update_for_new_custom_url_is_true(filled_cache, dummy_source):
+    """Test that needs_update is True when given a new custom URL."""
+    assert filled_cache.needs_update(dummy_source, 'http://new.co/') is True
+
+
+def test_index_url_for_prefers_custom_url(filled_cache):
+    """Test that index_url_for uses the custom URL of a source."""
+    from .context import mangasource
+    source = mangasource.MangaSource('source2', 'http://www.another.com', '')
+    result = filled_cache.index_url_for(source)
+    assert result == 'http://another.net/TestSeries'
+
+
+def test_index_url_for_generates_url_without_custom_url(
+        filled_cache, dummy_source):
+    """Test that index_url_for builds the URL from the source."""
+    result = filled_cache.index_url_for(dummy_source)
+    assert result == 'http://www.source.com/test_series'
+
+
+@pytest.mark.parametrize('value', [500, None, b'<p></p>'])
+def test_set_index_raises_error_for_non_string_html(
+        empty_cache, dummy_source, value):
+    """Test that set_index only takes string html."""
+    with pytest.raises(TypeError):
+        empty_cache.set_index(dummy_source, value)
+
+
+def test_set_index_stores_html_and_custom_url(empty_cache, dummy_source):
+    """Test that set_index stores the html, update time and custom URL."""
+    empty_cache.set_index(dummy_source, '<p>new</p>', 'http://new.co/')
+    assert dummy_source in empty_cache
+    assert empty_cache.needs_update(dummy_source) is False
+    assert empty_cache.get_index(dummy_source) == '<p>new</p>'
+    assert empty_cache.index_url_for(dummy_source) == 'http://new.co/'
+
+
+def revalidating_get(requests_made, status_code=304, text=''):
+    """Make a transport get that records headers and gives a response."""
+    def get(url, **kwargs):
+        requests_made.append((url, kwargs.get('headers', {})))
+
+        class Response(object):
+            headers = {'ETag': '"v2"', 'Last-Modified': 'Tue, 1 May 2018'}
+        Response.status_code = status_code
+        Response.text = text
+        return Response
+
+    return get
+
+
+def test_update_index_stores_validators(
+        empty_cache, dummy_source, monkeypatch):
+    """Test that update_index keeps the ETag and Last-Modified headers."""
+    from .context import transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        revalidating_get([], 200, '<p>index</p>'))
+    empty_cache.update_index(dummy_source)
+    assert empty_cache._validators[repr(dummy_source)] == {
+        'etag': '"v2"', 'last_modified': 'Tue, 1 May 2018'}
+
+
+def test_update_index_sends_conditional_request(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that update_index sends the stored validators."""
+    from .context import transport
+    requests_made = []
+    filled_cache._validators[repr(dummy_source)] = {
+        'etag': '"v1"', 'last_modified': 'Mon, 30 Apr 2018'}
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        revalidating_get(requests_made))
+    filled_cache.update_index(dummy_source)
+    assert requests_made == [('http://www.source.com/test_series', {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 30 Apr 2018'})]
+
+
+def test_update_index_not_modified_keeps_index_and_chapter_list(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that a 304 response only refreshes the update time."""
+    from .context import transport
+    src_name = repr(dummy_source)
+    index = filled_cache._index_pages[src_name]
+    chapters = filled_cache._chapter_lists[src_name]
+    filled_cache._last_updated[src_name] = 0
+    filled_cache._validators[src_name] = {'etag': '"v1"'}
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        revalidating_get([]))
+
+    filled_cache.update_index(dummy_source)
+    assert filled_cache._index_pages[src_name] == index
+    assert filled_cache.get_chapter_list(dummy_source) is chapters
+    assert filled_cache._validators[src_name] == {'etag': '"v1"'}
+
+
+def test_update_index_with_new_page_drops_chapter_list(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that a changed index page drops the old chapter list."""
+    from .context import transport
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        revalidating_get([], 200, '<p>new</p>'))
+    filled_cache.update_index(dummy_source)
+    assert filled_cache._index_pages[repr(dummy_source)] == '<p>new</p>'
+    assert filled_cache.get_chapter_list(dummy_source) is None
+
+
+def test_update_index_new_custom_url_is_not_conditional(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that validators for the old URL are not sent to a new one."""
+    from .context import transport
+    requests_made = []
+    filled_cache._validators[repr(dummy_source)] = {'etag': '"v1"'}
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        revalidating_get(requests_made, 200, '<p></p>'))
+    filled_cache.update_index(dummy_source, 'http://new.co/series')
+    assert requests_made == [('http://new.co/series', {})]
+
+
+def test_chapter_list_is_not_reparsed_after_not_modified(
+        filled_cache, dummy_source, monkeypatch):
+    """Test that Scraper.chapter_list reuses the list after a 304."""
+    from .context import scraper, transport
+    src_name = repr(dummy_source)
+    chapters = filled_cache._chapter_lists[src_name]
+    filled_cache._last_updated[src_name] = 0
+    filled_cache._validators[src_name] = {'etag': '"v1"'}
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        revalidating_get([]))
+    monkeypatch.setattr(scraper.Scraper, '_parse_chapter_list', None)
+
+    assert scraper.Scraper.chapter_list(
+        filled_cache, dummy_source) is chapters
+
+
+def test_set_index_with_same_html_keeps_chapter_list(empty_cache,
+                                                     dummy_source):
+    """Test that storing an unchanged index page keeps the chapter list."""
+    chapters = {'1': 'http://www.source.com/test_series/1'}
+    empty_cache.set_index(dummy_source, '<p>index</p>')
+    empty_cache.set_chapter_list(dummy_source, chapters)
+    empty_cache._last_updated[repr(dummy_source)] = 0
+
+    empty_cache.set_index(dummy_source, '<p>index</p>')
+    assert empty_cache.get_chapter_list(dummy_source) is chapters
+
+
+def test_set_index_with_changed_html_drops_chapter_list(empty_cache,
+                                                        dummy_source):
+    """Test that storing a changed index page drops the chapter list."""
+    chapters = {'1': 'http://www.source.com/test_series/1'}
+    empty_cache.set_index(dummy_source, '<p>index</p>')
+    empty_cache.set_chapter_list(dummy_source, chapters)
+
+    empty_cache.set_index(dummy_source, '<p>index 2</p>')
+    assert empty_cache.get_chapter_list(dummy_source) is None
+
+
+def test_chapter_list_is_not_reparsed_for_unchanged_index(
+        empty_cache, dummy_source, monkeypatch):
+    """Test that Scraper.chapter_list reuses the list for the same page."""
+    from .context import scraper, transport
+    index = '<table><a href="/test/5">Chapter 5</a></table>'
+    empty_cache.set_index(dummy_source, index)
+    chapters = scraper.Scraper.chapter_list(empty_cache, dummy_source)
+    empty_cache._last_updated[repr(dummy_source)] = 0
+
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        requests_patch(text=index))
+    monkeypatch.setattr(scraper.Scraper, '_parse_chapter_list', None)
+    assert scraper.Scraper.chapter_list(
+        empty_cache, dummy_source) is chapters
+
+
+def chapter_urls(*numbers, host='http://www.source.com/'):
+    """Make a chapter list for the given chapter numbers."""
+    return {str(num): f'{host}test_series/{num}' for num in numbers}
+
+
+def test_get_chapter_changes_first_list_adds_every_chapter(
+        empty_cache, dummy_source):
+    """Test that the first chapter list for a source is all added."""
+    empty_cache.set_index(dummy_source, '')
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1, 2))
+
+    changes = empty_cache.get_chapter_changes(dummy_source)
+    assert len(changes) == 1
+    assert changes[0]['added'] == chapter_urls(1, 2)
+    assert changes[0]['removed'] == changes[0]['changed'] == {}
+
+
+def test_get_chapter_changes_finds_added_removed_and_changed(
+        empty_cache, dummy_source):
+    """Test that a new chapter list is compared with the last one."""
+    empty_cache.set_index(dummy_source, '')
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1, 2, 3))
+    new_list = chapter_urls(2, 4)
+    new_list.update(chapter_urls(3, host='http://mirror.co/'))
+    empty_cache.set_chapter_list(dummy_source, new_list)
+
+    change = empty_cache.get_chapter_changes(dummy_source)[-1]
+    assert change['added'] == chapter_urls(4)
+    assert change['removed'] == chapter_urls(1)
+    assert change['changed'] == chapter_urls(3, host='http://mirror.co/')
+
+
+def test_get_chapter_changes_skips_unchanged_and_failed_lists(
+        empty_cache, dummy_source):
+    """Test that identical or missing chapter lists record no change."""
+    empty_cache.set_index(dummy_source, '')
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1))
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1))
+    empty_cache.set_chapter_list(dummy_source, None)
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1))
+    assert len(empty_cache.get_chapter_changes(dummy_source)) == 1
+
+
+def test_get_chapter_changes_since_leaves_out_older_changes(
+        empty_cache, dummy_source):
+    """Test that get_chapter_changes only gives changes after since."""
+    empty_cache.set_index(dummy_source, '')
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1))
+    since = empty_cache.get_chapter_changes(dummy_source)[-1]['updated']
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1, 2))
+
+    changes = empty_cache.get_chapter_changes(dummy_source, since)
+    assert [change['added'] for change in changes] == [chapter_urls(2)]
+
+
+def test_get_chapter_changes_raises_error_for_bad_since(
+        empty_cache, dummy_source):
+    """Test that get_chapter_changes takes only a numeric since."""
+    with pytest.raises(TypeError):
+        empty_cache.get_chapter_changes(dummy_source, '2018')
+
+
+def test_get_chapter_changes_keeps_only_recent_changes(
+        empty_cache, dummy_source):
+    """Test that only the most recent chapter changes are kept."""
+    empty_cache.set_index(dummy_source, '')
+    for num in range(1, 106):
+        empty_cache.set_chapter_list(dummy_source, chapter_urls(num))
+
+    changes = empty_cache.get_chapter_changes(dummy_source)
+    assert len(changes) == 100
+    assert changes[-1]['added'] == chapter_urls(105)
+
+
+def test_new_chapters_gives_added_chapters_still_available(
+        empty_cache, dummy_source):
+    """Test that new_chapters leaves out chapters removed again."""
+    empty_cache.set_index(dummy_source, '')
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1))
+    since = empty_cache.get_chapter_changes(dummy_source)[-1]['updated']
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1, 2, 3))
+    empty_cache.set_chapter_list(dummy_source, chapter_urls(1, 3))
+
+    assert empty_cache.new_chapters(dummy_source, since) == chapter_urls(3)
+
+
+def test_checkpoint_is_none_until_set(empty_cache, dummy_source):
+    """Test that get_checkpoint gives None for a chapter without one."""
+    assert empty_cache.get_checkpoint(dummy_source, '1') is None
+
+
+def test_checkpoint_is_kept_per_chapter(empty_cache, dummy_source):
+    """Test that set_checkpoint keeps the next page for a chapter."""
+    empty_cache.set_checkpoint(dummy_source, '1', 'http://t.co/1/3', 3)
+    assert empty_cache.get_checkpoint(dummy_source, '1') == (
+        'http://t.co/1/3', 3)
+    assert empty_cache.get_checkpoint(dummy_source, '2') is None
+
+
+def test_clear_checkpoint_forgets_checkpoint(empty_cache, dummy_source):
+    """Test that clear_checkpoint removes the checkpoint for a chapter."""
+    empty_cache.set_checkpoint(dummy_source, '1', 'http://t.co/1/3', 3)
+    empty_cache.clear_checkpoint(dummy_source, '1')
+    empty_cache.clear_checkpoint(dummy_source, '1')
+    assert empty_cache.get_checkpoint(dummy_source, '1') is None
+
+
+@pytest.mark.parametrize('args', [
+    ('source', '1', 'http://t.co/1/3', 3),
+    (None, 1, 'http://t.co/1/3', 3),
+    (None, '1', None, 3),
+    (None, '1', 'http://t.co/1/3', '3'),
+])
+def test_set_checkpoint_raises_type_error_for_bad_args(
+        args, empty_cache, dummy_source):
+    """Test that set_checkpoint raises a TypeError for bad arguments."""
+    source, *rest = args
+    with pytest.raises(TypeError):
+        empty_cache.set_checkpoint(source or dummy_source, *rest)
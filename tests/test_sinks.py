@@ -0,0 +1,48 @@
+"""Tests for the sinks module."""
+import io
+
+import pytest
+
+from .context import sinks
+
+
+class ClosingBytesIO(io.BytesIO):
+    """BytesIO that keeps its value after being closed."""
+
+    def close(self):
+        self.closed_value = self.getvalue()
+        super().close()
+
+
+@pytest.mark.parametrize('value', [None, 5, ['path']])
+def test_write_chunks_raises_type_error_for_bad_target(value):
+    """Test that write_chunks raises a TypeError for non-file targets."""
+    with pytest.raises(TypeError):
+        sinks.write_chunks([b'a'], value)
+
+
+def test_write_chunks_writes_to_path(tmpdir):
+    """Test that write_chunks writes every chunk to a file path."""
+    path = str(tmpdir.join('001.png'))
+    assert sinks.write_chunks([b'ab', b'', b'cde'], path) == (5, path)
+    assert open(path, 'rb').read() == b'abcde'
+
+
+def test_write_chunks_writes_to_and_closes_file_object():
+    """Test that write_chunks writes to a file object, then closes it."""
+    out = ClosingBytesIO()
+    assert sinks.write_chunks(iter([b'ab', b'c']), out) == (3, None)
+    assert out.closed
+    assert out.closed_value == b'abc'
+
+
+def test_write_chunks_finishes_archive_member(tmpdir):
+    """Test that write_chunks can write a page straight into a zip."""
+    import zipfile
+    path = str(tmpdir.join('chapter.zip'))
+
+    with zipfile.ZipFile(path, 'w') as archive:
+        sinks.write_chunks([b'page', b' one'], archive.open('001.png', 'w'))
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.read('001.png') == b'page one'
@@ -0,0 +1,120 @@
+"""Tests for the storage module."""
+import os
+
+import pytest
+
+from .context import storage as st
+
+
+@pytest.fixture(params=['sqlite', 'directory'])
+def make_storage(request, tmpdir):
+    """Make a function that opens the same storage of each kind."""
+    def make():
+        if request.param == 'sqlite':
+            return st.SQLiteStorage(str(tmpdir.join('cache.db')))
+        return st.DirectoryStorage(str(tmpdir.join('cache')))
+    return make
+
+
+@pytest.mark.parametrize('cls', [st.SQLiteStorage, st.DirectoryStorage])
+@pytest.mark.parametrize('value', [500, None, b'path'])
+def test_constructor_raises_type_error_for_non_string_path(cls, value):
+    """Test that storage constructors only take a string path."""
+    with pytest.raises(TypeError):
+        cls(value)
+
+
+@pytest.mark.parametrize('cls', [st.SQLiteStorage, st.DirectoryStorage])
+def test_constructor_raises_value_error_for_empty_path(cls):
+    """Test that storage constructors do not take an empty path."""
+    with pytest.raises(ValueError):
+        cls('')
+
+
+def test_base_storage_cannot_be_constructed():
+    """Test that the abstract Storage cannot be used as a backend."""
+    with pytest.raises(TypeError):
+        st.Storage()
+
+
+def test_table_stores_and_loads_values(make_storage):
+    """Test that a table gets back the values it stores."""
+    table = make_storage().table('test series', 'chapter_lists')
+    table['<MangaSource: a @ http://a.co/>'] = {'1': 'http://a.co/1'}
+    table['<MangaSource: b @ http://b.co/>'] = None
+
+    assert table['<MangaSource: a @ http://a.co/>'] == {'1': 'http://a.co/1'}
+    assert table['<MangaSource: b @ http://b.co/>'] is None
+    assert len(table) == 2
+    assert sorted(table) == ['<MangaSource: a @ http://a.co/>',
+                             '<MangaSource: b @ http://b.co/>']
+
+
+def test_table_raises_key_error_for_missing_key(make_storage):
+    """Test that a table raises a KeyError for missing keys."""
+    table = make_storage().table('test series', 'index_pages')
+    assert 'missing' not in table
+    with pytest.raises(KeyError):
+        table['missing']
+    with pytest.raises(KeyError):
+        del table['missing']
+
+
+def test_table_deletes_values(make_storage):
+    """Test that a table forgets deleted values."""
+    table = make_storage().table('test series', 'index_pages')
+    table['key'] = '<p></p>'
+    del table['key']
+    assert 'key' not in table
+    assert len(table) == 0
+
+
+def test_tables_are_kept_apart_by_series_and_name(make_storage):
+    """Test that tables for other series or names do not share keys."""
+    storage = make_storage()
+    storage.table('one', 'index_pages')['key'] = 'one'
+    storage.table('two', 'index_pages')['key'] = 'two'
+    storage.table('one', 'custom_urls')['key'] = 'url'
+
+    assert storage.table('one', 'index_pages')['key'] == 'one'
+    assert storage.table('two', 'index_pages')['key'] == 'two'
+    assert storage.table('one', 'custom_urls')['key'] == 'url'
+
+
+def test_table_values_last_between_storages(make_storage):
+    """Test that values stored by one storage are loaded by a later one."""
+    make_storage().table('test/series', 'last_updated')['key'] = 12.5
+    assert make_storage().table('test/series', 'last_updated')['key'] == 12.5
+
+
+def test_directory_storage_leaves_no_temp_files(tmpdir):
+    """Test that DirectoryStorage writes each value to a single file."""
+    storage = st.DirectoryStorage(str(tmpdir))
+    table = storage.table('series', 'index_pages')
+    table['a'] = 'first'
+    table['a'] = 'second'
+    assert os.listdir(str(tmpdir.join('series', 'index_pages'))) == ['a.json']
+
+
+def test_series_cache_raises_error_for_non_storage():
+    """Test that SeriesCache only takes a Storage."""
+    from .context import seriescache
+    with pytest.raises(TypeError):
+        seriescache.SeriesCache('title', storage='cache.db')
+
+
+def test_series_cache_keeps_index_and_chapters_between_runs(
+        make_storage, dummy_source):
+    """Test that a SeriesCache with storage starts from the last run."""
+    from .context import scraper, seriescache
+
+    cache = seriescache.SeriesCache('test series', storage=make_storage())
+    chapters = scraper.Scraper.chapter_list(cache, dummy_source)
+
+    restarted = seriescache.SeriesCache('test series',
+                                        storage=make_storage())
+    assert dummy_source in restarted
+    assert len(restarted) == 1
+    assert restarted.needs_update(dummy_source) is False
+    assert restarted.get_chapter_list(dummy_source) == chapters
+    assert restarted.get_index(dummy_source) == cache.get_index(dummy_source)
@@ -0,0 +1,221 @@
+"""Tests for the throttle module."""
+from email.utils import formatdate
+import threading
+import time
+
+import pytest
+import requests
+
+from .context import throttle as th
+
+
+URL = 'http://img.co/1.png'
+
+
+class FakeResponse(object):
+    """Response with just a status code and headers."""
+
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers if headers else {}
+
+
+def respond(limiter, response=None, latency=0.0, kind=None):
+    """Take a slot and record a response that took the given time."""
+    started = limiter._acquire('img.co') - latency
+    slot = th._Slot()
+    slot.record(response if response else FakeResponse())
+    limiter._release('img.co', started, slot.overloaded, slot.retry_after,
+                     kind)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'initial': '2'}, {'maximum': 2.0}, {'minimum': None},
+    {'latency_factor': '2'}, {'backoff': None},
+])
+def test_constructor_raises_type_error_for_bad_arguments(kwargs):
+    """Test that constructor raises a TypeError for bad arguments."""
+    with pytest.raises(TypeError):
+        th.AdaptiveLimiter(**kwargs)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'minimum': 0}, {'initial': 20}, {'minimum': 3, 'initial': 2},
+    {'latency_factor': 1}, {'backoff': 0}, {'backoff': 1},
+])
+def test_constructor_raises_value_error_for_bad_arguments(kwargs):
+    """Test that constructor raises a ValueError for bad limits."""
+    with pytest.raises(ValueError):
+        th.AdaptiveLimiter(**kwargs)
+
+
+@pytest.mark.parametrize('value, seconds', [
+    (None, None), ('', None), ('soon', None), ('5', 5.0), ('-3', 0.0),
+])
+def test_retry_after_seconds_reads_delay(value, seconds):
+    """Test that retry_after_seconds reads a delay in seconds."""
+    assert th.retry_after_seconds(value) == seconds
+
+
+def test_retry_after_seconds_reads_http_date():
+    """Test that retry_after_seconds reads a date to wait until."""
+    value = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < th.retry_after_seconds(value) <= 60
+
+
+def test_limit_starts_at_initial_for_each_host():
+    """Test that every host starts at the initial limit."""
+    limiter = th.AdaptiveLimiter(initial=3)
+    assert limiter.limit(URL) == 3
+    assert limiter.limit('http://other.co/') == 3
+
+
+def test_limit_grows_with_healthy_responses_up_to_maximum():
+    """Test that healthy responses raise the limit to the maximum."""
+    limiter = th.AdaptiveLimiter(initial=2, maximum=4)
+    respond(limiter)
+    assert limiter.limit(URL) == 2
+    for _ in range(6):
+        respond(limiter)
+    assert limiter.limit(URL) == 4
+
+    for _ in range(50):
+        respond(limiter)
+    assert limiter.limit(URL) == 4
+
+
+@pytest.mark.parametrize('status_code', [429, 503])
+def test_limit_backs_off_for_overloaded_status(status_code):
+    """Test that a 429 or 503 cuts the limit for the host."""
+    limiter = th.AdaptiveLimiter(initial=8)
+    respond(limiter, FakeResponse(status_code))
+    assert limiter.limit(URL) == 4
+    assert limiter.limit('http://other.co/') == 8
+
+
+def test_limit_backs_off_once_per_round_of_requests():
+    """Test that failures from requests already in flight cut it once."""
+    limiter = th.AdaptiveLimiter(initial=8)
+    started = [limiter._acquire('img.co') for _ in range(4)]
+    for start in started:
+        limiter._release('img.co', start, True)
+    assert limiter.limit(URL) == 4
+
+    respond(limiter, FakeResponse(429))
+    assert limiter.limit(URL) == 2
+
+
+def test_limit_backs_off_for_slow_responses():
+    """Test that a response much slower than usual cuts the limit."""
+    limiter = th.AdaptiveLimiter(initial=4, maximum=4)
+    for _ in range(5):
+        respond(limiter, latency=0.1)
+    respond(limiter, latency=0.2)
+    assert limiter.limit(URL) == 4
+
+    respond(limiter, latency=1.0)
+    assert limiter.limit(URL) == 2
+
+
+def test_limit_never_drops_below_minimum():
+    """Test that the limit stays at the minimum for a failing host."""
+    limiter = th.AdaptiveLimiter(initial=2, minimum=1)
+    for _ in range(5):
+        respond(limiter, FakeResponse(503))
+    assert limiter.limit(URL) == 1
+
+
+def test_slot_holds_back_requests_past_the_limit():
+    """Test that a request waits until a slot for its host is free."""
+    limiter = th.AdaptiveLimiter(initial=1, maximum=1)
+    entered = threading.Event()
+
+    def second():
+        with limiter.slot(URL):
+            entered.set()
+
+    with limiter.slot(URL):
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not entered.wait(0.2)
+    assert entered.wait(2)
+    thread.join()
+
+
+def test_slot_waits_for_retry_after():
+    """Test that requests to a host wait out its Retry-After header."""
+    limiter = th.AdaptiveLimiter(initial=4)
+    with limiter.slot(URL) as slot:
+        slot.record(FakeResponse(429, {'Retry-After': '0.3'}))
+
+    start = time.monotonic()
+    with limiter.slot(URL):
+        pass
+    assert time.monotonic() - start >= 0.25
+
+
+@pytest.mark.parametrize('error', [
+    ConnectionResetError('Connection reset.'),
+    requests.exceptions.ConnectionError('Connection refused.'),
+    requests.exceptions.ReadTimeout('Read timed out.')
+])
+def test_slot_counts_connection_errors_as_overloaded(error):
+    """Test that a connection error in the slot cuts the limit."""
+    limiter = th.AdaptiveLimiter(initial=4)
+    with pytest.raises(type(error)):
+        with limiter.slot(URL):
+            raise error
+    assert limiter.limit(URL) == 2
+
+
+@pytest.mark.parametrize('error', [
+    requests.exceptions.InvalidURL('Bad URL.'),
+    requests.exceptions.MissingSchema('No schema.'),
+    ValueError('Not a page.')
+])
+def test_slot_does_not_count_other_errors_as_overloaded(error):
+    """Test that an error that is not the host's fault keeps the limit."""
+    limiter = th.AdaptiveLimiter(initial=4)
+    with pytest.raises(type(error)):
+        with limiter.slot(URL):
+            raise error
+    assert limiter.limit(URL) == 4
+
+
+def test_scraper_requests_wait_on_limiter(dummy_source, monkeypatch):
+    """Test that the Scraper records page responses with its limiter."""
+    from .conftest import requests_patch
+    from .context import scraper, transport
+    limiter = th.AdaptiveLimiter(initial=4)
+    monkeypatch.setattr(scraper.Scraper, 'limiter', limiter)
+    monkeypatch.setattr(transport.DEFAULT_TRANSPORT, 'get',
+                        requests_patch(status_code=429, text=''))
+
+    with pytest.raises(scraper.PageRequestError):
+        scraper.Scraper._find_page('http://t.co/1/1', dummy_source)
+    assert limiter.limit('http://t.co/1/1') == 2
+
+
+def test_limit_compares_each_kind_of_request_to_its_own_latency():
+    """Test that slow images after fast pages do not cut the limit."""
+    limiter = th.AdaptiveLimiter(initial=4, maximum=4)
+    for _ in range(5):
+        respond(limiter, latency=0.01, kind='page')
+    respond(limiter, latency=1.0, kind='image')
+    respond(limiter, latency=1.1, kind='image')
+    assert limiter.limit(URL) == 4
+
+    respond(limiter, latency=1.0, kind='page')
+    assert limiter.limit(URL) == 2
+
+
+def test_slot_times_request_until_response_is_recorded():
+    """Test that reading a body after the response is not counted."""
+    limiter = th.AdaptiveLimiter(initial=4, maximum=4)
+    for _ in range(5):
+        respond(limiter, latency=0.01)
+
+    with limiter.slot(URL) as slot:
+        slot.record(FakeResponse())
+        time.sleep(0.2)
+    assert limiter.limit(URL) == 4
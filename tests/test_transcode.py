@@ -0,0 +1,113 @@
+"""Tests for the transcode module."""
+import io
+import threading
+
+from PIL import Image
+import pytest
+
+from .context import transcode as tc
+
+
+def make_image(fmt='PNG', mode='RGB', size=(200, 100), color='red'):
+    """Make the data for a small image in the given format."""
+    out = io.BytesIO()
+    Image.new(mode, size, color).save(out, fmt)
+    return out.getvalue()
+
+
+def open_image(data):
+    """Open image data with Pillow."""
+    return Image.open(io.BytesIO(data))
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'width': '600'}, {'height': 2.5}, {'grayscale': 1},
+    {'fmt': None}, {'quality': '80'},
+])
+def test_profile_raises_type_error_for_bad_arguments(kwargs):
+    """Test that DeviceProfile raises a TypeError for bad arguments."""
+    with pytest.raises(TypeError):
+        tc.DeviceProfile(**kwargs)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'width': 0}, {'height': -5}, {'fmt': 'BMP'}, {'quality': 0},
+    {'quality': 101},
+])
+def test_profile_raises_value_error_for_bad_arguments(kwargs):
+    """Test that DeviceProfile raises a ValueError for bad arguments."""
+    with pytest.raises(ValueError):
+        tc.DeviceProfile(**kwargs)
+
+
+@pytest.mark.parametrize('fmt, ext', [('jpeg', 'jpg'), ('WEBP', 'webp')])
+def test_profile_gives_extension_for_format(fmt, ext):
+    """Test that a profile knows the extension of its format."""
+    assert tc.DeviceProfile(fmt=fmt).ext == ext
+
+
+def test_transcode_shrinks_to_fit_keeping_proportions():
+    """Test that pages are shrunk to fit the profile width."""
+    profile = tc.DeviceProfile(width=50)
+    data, ext = tc._transcode(make_image(), profile)
+    img = open_image(data)
+    assert ext == 'jpg'
+    assert img.format == 'JPEG'
+    assert img.size == (50, 25)
+
+
+def test_transcode_never_grows_pages():
+    """Test that pages smaller than the profile keep their size."""
+    profile = tc.DeviceProfile(width=1000, height=1000)
+    data, _ = tc._transcode(make_image(), profile)
+    assert open_image(data).size == (200, 100)
+
+
+def test_transcode_converts_to_grayscale():
+    """Test that a grayscale profile converts transparent color pages."""
+    profile = tc.DeviceProfile(grayscale=True)
+    data, _ = tc._transcode(make_image(mode='RGBA'), profile)
+    assert open_image(data).mode == 'L'
+
+
+def test_transcode_raises_value_error_for_non_image():
+    """Test that _transcode raises a ValueError for non-image data."""
+    with pytest.raises(ValueError):
+        tc._transcode(b'not an image', tc.DeviceProfile())
+
+
+@pytest.mark.parametrize('value', [None, 'kindle', {}])
+def test_transcode_pages_raises_type_error_for_bad_profile(value):
+    """Test that transcode_pages raises a TypeError for bad profiles."""
+    with pytest.raises(TypeError):
+        tc.transcode_pages([], value)
+
+
+def test_transcode_pages_keeps_pages_in_order():
+    """Test that transcoded pages come out in the order they went in."""
+    pages = [(make_image(size=(100 + n, 100)), 'png') for n in range(8)]
+    profile = tc.DeviceProfile(height=50, fmt='PNG')
+
+    out = list(tc.transcode_pages(iter(pages), profile, max_workers=2))
+
+    assert [ext for _, ext in out] == ['png'] * 8
+    assert [open_image(data).width for data, _ in out] == [
+        (100 + n) // 2 for n in range(8)]
+
+
+def test_transcode_pages_keeps_pulling_pages_while_transcoding():
+    """Test that pages are pulled ahead of the transcoded pages taken."""
+    pulled = []
+    ahead = threading.Event()
+
+    def pages():
+        for n in range(6):
+            pulled.append(n)
+            if n == 3:
+                ahead.set()
+            yield make_image(), 'png'
+
+    out = tc.transcode_pages(pages(), tc.DeviceProfile(), max_workers=2)
+    next(out)
+    assert ahead.wait(5)
+    out.close()
@@ -0,0 +1,143 @@
+"""Tests for the transport module."""
+import pytest
+
+from .conftest import requests_patch
+from .context import transport as tr
+
+
+@pytest.mark.parametrize('value', ['5', [], 2.1, None])
+def test_constructor_raises_type_error_for_non_int_pool_size(value):
+    """Test that constructor raises a TypeError for non-int pool size."""
+    with pytest.raises(TypeError):
+        tr.Transport(pool_maxsize=value)
+
+
+@pytest.mark.parametrize('value', ['5', [], None])
+def test_constructor_raises_type_error_for_non_number_timeout(value):
+    """Test that constructor raises a TypeError for non-number timeout."""
+    with pytest.raises(TypeError):
+        tr.Transport(timeout=value)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'pool_connections': 0}, {'pool_maxsize': -1}, {'retries': -1},
+    {'backoff_factor': -0.5}, {'timeout': 0}
+])
+def test_constructor_raises_value_error_for_bad_sizes(kwargs):
+    """Test that constructor raises a ValueError for out of range values."""
+    with pytest.raises(ValueError):
+        tr.Transport(**kwargs)
+
+
+def test_constructor_mounts_pooled_adapter_for_both_protocols():
+    """Test that constructor mounts the same adapter for http and https."""
+    transport = tr.Transport(pool_maxsize=4, retries=2)
+    http = transport.session.get_adapter('http://foo.co')
+    https = transport.session.get_adapter('https://foo.co')
+    assert http is https
+    assert http._pool_maxsize == 4
+    assert http.max_retries.total == 2
+
+
+def test_get_uses_transport_timeout_by_default(monkeypatch):
+    """Test that get passes the transport timeout to the session."""
+    transport = tr.Transport(timeout=5)
+    calls = []
+    monkeypatch.setattr(transport.session, 'get',
+                        lambda url, **kwargs: calls.append(kwargs))
+    transport.get('http://foo.co')
+    transport.get('http://foo.co', timeout=1)
+    assert calls == [{'timeout': 5}, {'timeout': 1}]
+
+
+def test_head_uses_transport_timeout_by_default(monkeypatch):
+    """Test that head passes the transport timeout to the session."""
+    transport = tr.Transport(timeout=5)
+    calls = []
+    monkeypatch.setattr(transport.session, 'head',
+                        lambda url, **kwargs: calls.append(kwargs))
+    transport.head('http://foo.co')
+    assert calls == [{'timeout': 5}]
+
+
+def test_models_use_default_transport_when_none_given(dummy_source):
+    """Test that sources and caches share the default transport."""
+    from .context import seriescache
+    cache = seriescache.SeriesCache('test')
+    assert dummy_source.transport is tr.DEFAULT_TRANSPORT
+    assert cache.transport is tr.DEFAULT_TRANSPORT
+
+
+@pytest.mark.parametrize('value', [500, 'transport', {}])
+def test_models_raise_type_error_for_non_transport(value):
+    """Test that sources and caches only take a Transport."""
+    from .context import mangasource
+    from .context import seriescache
+    with pytest.raises(TypeError):
+        mangasource.MangaSource('test', 'http://www.source.com/', '_',
+                                transport=value)
+    with pytest.raises(TypeError):
+        seriescache.SeriesCache('test', transport=value)
+
+
+def test_source_pings_through_its_transport():
+    """Test that a MangaSource pings with the transport it is given."""
+    from .context import mangasource
+    transport = tr.Transport()
+    transport.head = requests_patch(status_code=404)
+    source = mangasource.MangaSource('test', 'http://www.source.com/', '_',
+                                     transport=transport)
+    assert source.transport is transport
+    assert source._verified is False
+
+
+def test_cache_gets_index_through_its_transport(dummy_source):
+    """Test that a SeriesCache gets index pages with its transport."""
+    from .context import seriescache
+    transport = tr.Transport()
+    transport.get = requests_patch(text='<p>custom</p>')
+    cache = seriescache.SeriesCache('test', transport=transport)
+    assert cache.get_index(dummy_source) == '<p>custom</p>'
+
+
+def test_scraper_uses_source_transport_for_pages():
+    """Test that the Scraper requests pages through the source transport."""
+    from .context import mangasource
+    from .context import scraper
+    transport = tr.Transport()
+    transport.head = requests_patch(status_code=200)
+    transport.get = requests_patch(text='<img src="http://f.co/a.jpg">',
+                                   content=b'\x01')
+    source = mangasource.MangaSource('test', 'http://www.source.com/', '_',
+                                     transport=transport)
+    data, ext, _, _ = scraper.Scraper._get_page('http://f.co/1', source)
+    assert (data, ext) == (b'\x01', 'jpg')
+
+
+def test_scraper_transport_overrides_source_transport(
+        dummy_source, monkeypatch):
+    """Test that a transport set on the Scraper is used over the source's."""
+    from .context import scraper
+    transport = tr.Transport()
+    transport.get = requests_patch(text='<img src="http://f.co/a.gif">',
+                                   content=b'\x02')
+    monkeypatch.setattr(scraper.Scraper, 'transport', transport)
+    data, ext, _, _ = scraper.Scraper._get_page('http://f.co/1', dummy_source)
+    assert (data, ext) == (b'\x02', 'gif')
+
+
+def test_head_without_retry_sends_request_once():
+    """Test that head without retry uses a session that never retries."""
+    transport = tr.Transport(retries=5)
+    sent = []
+
+    def head(url, **kwargs):
+        sent.append(url)
+        return requests_patch(status_code=200)(url)
+
+    transport._single_session.head = head
+    transport.head('http://www.source.com/', retry=False)
+    adapter = transport._single_session.get_adapter('http://www.source.com/')
+
+    assert sent == ['http://www.source.com/']
+    assert adapter.max_retries.total == 0